@@ -0,0 +1,252 @@
+"""Allocation and garbage collection profiling, frame by frame.
+
+    python main.py --profile-alloc                 # report when the game exits
+    python main.py --gc-threshold 5000 20 20       # collect the young generation less often
+    python main.py --gc-freeze                     # keep startup objects out of collections
+
+With --profile-alloc, tracemalloc traces every allocation.  Each frame
+the profiler records two things per subsystem:
+
+  kept       what the frame allocated that is still alive at its end, from
+             a tracemalloc snapshot, down to the source line
+  transient  how far traced memory rose above where it started and ended
+             while the subsystem's update or draw ran - the temporary Rects,
+             list copies and tuples it made and threw away
+
+It also records every garbage collection that ran (from gc.callbacks),
+with its pause and the subsystem that was running when it started.  The
+exit report ranks subsystems by both kinds of allocation, lists the
+source lines that keep most, and shows the slowest frames with the
+allocations and pauses behind them.
+
+Transient figures are high-water marks, not totals: a loop that makes and
+frees one Rect per enemy counts one Rect, but it also shows up as young
+collections started in its subsystem.  Small tuples and floats freed into
+CPython's free lists still count as kept.  Subsystems are measured one at
+a time, so the figures only mean something without --threaded.  Tracing
+makes frames ten or more times slower, so compare frames with each other,
+not with normal play.
+"""
+import gc
+import os
+import time
+import heapq
+import tracemalloc
+
+TRACE_FRAMES = 3  # Stack depth kept per allocation: enough to see past shared helpers, and each level costs
+TOP_LINES = 5  # Source lines kept for each frame
+REPORTED_FRAMES = 5  # Slowest frames shown in the report
+REPORTED_LINES = 10  # Source lines shown in the report
+
+# Source file -> subsystem its allocations count towards.  Shared helpers
+# like render.py and slotmap.py are left out, so their allocations count
+# towards whichever subsystem called them.
+SUBSYSTEM_FILES = {
+    "enemy.py": "enemy",
+    "tower.py": "tower",
+    "coverage.py": "tower",
+    "heatmap.py": "tower",
+    "projectile.py": "projectile",
+    "particle.py": "particle",
+    "snowfall.py": "particle",
+    "ui.py": "ui",
+    "quiz.py": "quiz",
+}
+SUBSYSTEMS = ("enemy", "tower", "projectile", "particle", "ui", "quiz", "other")
+
+
+def get_subsystem(traceback):
+    """Subsystem of the innermost game module in an allocation's traceback"""
+    for frame in reversed(traceback):  # Oldest frame first, so start from the end
+        subsystem = SUBSYSTEM_FILES.get(os.path.basename(frame.filename))
+        if subsystem:
+            return subsystem
+    return "other"
+
+
+def tune_gc(thresholds=None, freeze=False):
+    """Set the collector's thresholds, and with freeze move everything allocated
+    so far - sprites, tables, the path - out of its reach for good"""
+    if thresholds:
+        gc.set_threshold(*thresholds)
+        print(f"GC thresholds set to {gc.get_threshold()}")
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        print(f"Froze {gc.get_freeze_count()} objects out of garbage collection")
+
+
+class FrameRecord:
+    """What one frame allocated and collected"""
+
+    def __init__(self, frame_id):
+        self.frame_id = frame_id
+        self.seconds = 0.0
+        self.peak = 0  # Most traced memory allocated during the frame at one time
+        self.sizes = dict.fromkeys(SUBSYSTEMS, 0)  # Bytes still alive at the end of the frame
+        self.blocks = dict.fromkeys(SUBSYSTEMS, 0)
+        self.transient = dict.fromkeys(SUBSYSTEMS, 0)  # Bytes allocated and freed again while measured
+        self.lines = []  # (size, blocks, "file:line") of the frame's biggest allocators
+        self.collections = []  # (generation, pause seconds, objects collected, subsystem)
+
+    def describe(self):
+        size = sum(self.sizes.values())
+        text = (f"frame {self.frame_id}: {self.seconds * 1000:.1f} ms, "
+                f"{size / 1024:.1f} KiB kept, peak {self.peak / 1024:.1f} KiB")
+        churn = max(SUBSYSTEMS, key=self.transient.get)
+        if self.transient[churn]:
+            text += f", most transient {churn} {self.transient[churn] / 1024:.1f} KiB"
+        for generation, pause, collected, subsystem in self.collections:
+            text += f", gen{generation} GC in {subsystem} {pause * 1000:.2f} ms ({collected} freed)"
+        for size, blocks, line in self.lines:
+            text += f"\n      {line}: {size / 1024:.1f} KiB in {blocks} blocks"
+        return text
+
+
+class AllocationProfiler:
+    def __init__(self):
+        self.frame_id = 0
+        self.record = FrameRecord(0)  # The frame in progress
+        self.slowest = []  # Heap of (seconds, frame id, FrameRecord)
+        self.sizes = dict.fromkeys(SUBSYSTEMS, 0)  # Totals over all frames
+        self.blocks = dict.fromkeys(SUBSYSTEMS, 0)
+        self.transient = dict.fromkeys(SUBSYSTEMS, 0)
+        self.young_collections = dict.fromkeys(SUBSYSTEMS, 0)  # Started while each subsystem ran
+        self.lines = {}  # "file:line" -> [size, blocks] over all frames
+        self.collections = {}  # generation -> [count, total pause, longest pause]
+        self.phase = None  # Subsystem being measured
+        self._gc_start = None
+        # Keep the profiler's own bookkeeping out of the figures
+        self.filters = [tracemalloc.Filter(False, __file__),
+                        tracemalloc.Filter(False, tracemalloc.__file__)]
+
+    def start(self):
+        tracemalloc.start(TRACE_FRAMES)
+        gc.callbacks.append(self._on_gc)
+        print("Profiling allocations - the game will run slower than normal")
+
+    def stop(self):
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        tracemalloc.stop()
+
+    def instrument(self, game):
+        """Measure the transient allocations of each subsystem's update and draw.
+        Call again whenever game.sim is replaced."""
+        sim = game.sim
+        methods = [
+            (sim.enemy_manager, "update", "enemy"),
+            (sim.tower_manager, "update", "tower"),
+            (sim.projectile_manager, "update", "projectile"),
+            (sim.particle_system, "update", "particle"),
+            (game.ui, "draw", "ui"),
+            (game.quiz, "update", "quiz"),
+            (game.quiz, "draw", "quiz"),
+        ]
+        for owner, name, subsystem in methods:
+            method = getattr(owner, name)
+            if getattr(method, "subsystem", None) is None:  # Not wrapped yet
+                setattr(owner, name, self._measured(method, subsystem))
+
+    def _measured(self, method, subsystem):
+        """method, wrapped to add what it allocates and frees to the frame's transient figures"""
+        def measured(*args, **kwargs):
+            if self.phase is not None:
+                return method(*args, **kwargs)  # Called from another measured method; counts there
+            start, peak = tracemalloc.get_traced_memory()
+            record = self.record
+            record.peak = max(record.peak, peak)  # Resetting below would lose the frame's peak so far
+            tracemalloc.reset_peak()
+            self.phase = subsystem
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.phase = None
+                end, peak = tracemalloc.get_traced_memory()
+                record.peak = max(record.peak, peak)
+                record.transient[subsystem] += peak - max(start, end)
+        measured.subsystem = subsystem
+        return measured
+
+    def _on_gc(self, phase, info):
+        # May run on the simulation thread; the pause goes to whichever frame is in progress
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+            if info["generation"] == 0:
+                self.young_collections[self.phase or "other"] += 1
+        elif self._gc_start is not None:
+            pause = time.perf_counter() - self._gc_start
+            self._gc_start = None
+            self.record.collections.append((info["generation"], pause, info["collected"],
+                                            self.phase or "other"))
+
+    def end_frame(self, frame_seconds):
+        """Record the frame that just finished and start the next.  frame_seconds
+        is how long it took, so the slowest frames can be found."""
+        record = self.record
+        record.seconds = frame_seconds
+        record.peak = max(record.peak, tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.filters)
+        tracemalloc.clear_traces()  # The next frame counts only its own allocations
+        tracemalloc.reset_peak()
+
+        for trace in snapshot.traces:
+            subsystem = get_subsystem(trace.traceback)
+            record.sizes[subsystem] += trace.size
+            record.blocks[subsystem] += 1
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            line = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+            if len(record.lines) < TOP_LINES:
+                record.lines.append((stat.size, stat.count, line))
+            totals = self.lines.setdefault(line, [0, 0])
+            totals[0] += stat.size
+            totals[1] += stat.count
+
+        for subsystem in SUBSYSTEMS:
+            self.sizes[subsystem] += record.sizes[subsystem]
+            self.blocks[subsystem] += record.blocks[subsystem]
+            self.transient[subsystem] += record.transient[subsystem]
+        for generation, pause, _, _ in record.collections:
+            totals = self.collections.setdefault(generation, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += pause
+            totals[2] = max(totals[2], pause)
+
+        entry = (record.seconds, record.frame_id, record)
+        if len(self.slowest) < REPORTED_FRAMES:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+        self.frame_id += 1
+        self.record = FrameRecord(self.frame_id)
+
+    def report(self):
+        """Totals per subsystem, the biggest allocators and the slowest frames, as text"""
+        frames = max(1, self.frame_id)
+        lines = [f"Allocations over {self.frame_id} frames (kept to the end of their frame):"]
+        for subsystem in sorted(SUBSYSTEMS, key=self.sizes.get, reverse=True):
+            lines.append(f"  {subsystem:<10} {self.sizes[subsystem] / frames / 1024:8.1f} KiB/frame "
+                         f"{self.blocks[subsystem] / frames:8.1f} blocks/frame")
+
+        lines.append("Transient allocations (allocated and freed within the frame, high-water):")
+        for subsystem in sorted(SUBSYSTEMS, key=self.transient.get, reverse=True):
+            lines.append(f"  {subsystem:<10} {self.transient[subsystem] / frames / 1024:8.1f} KiB/frame "
+                         f"{self.young_collections[subsystem]:8d} young collections started")
+
+        lines.append("Biggest allocators:")
+        top = sorted(self.lines.items(), key=lambda item: item[1][0], reverse=True)
+        for line, (size, blocks) in top[:REPORTED_LINES]:
+            lines.append(f"  {line:<24} {size / frames / 1024:8.1f} KiB/frame "
+                         f"{blocks / frames:8.1f} blocks/frame")
+
+        lines.append("Garbage collections:")
+        for generation, (count, total, longest) in sorted(self.collections.items()):
+            lines.append(f"  gen{generation}: {count} ({count / frames:.2f}/frame), "
+                         f"{total / count * 1000:.2f} ms mean, {longest * 1000:.2f} ms longest")
+
+        lines.append("Slowest frames:")
+        for _, _, record in sorted(self.slowest, reverse=True):
+            lines.append("  " + record.describe())
+        return "\n".join(lines)
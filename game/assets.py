@@ -0,0 +1,148 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from .constants import MAX_UPGRADE_LEVEL
+
+TOWER_SPRITES = {
+    "SNOWMAN": "snowman",
+    "IGLOO": "igloo",
+    "ICE": "ice",
+    "HOPE": "hope_tower",
+    "BRYCE": "bryce_tower",
+    "RIVERS": "rivers_tower",
+    "ANDRII": "andrii_helicopter"
+}
+
+ENEMY_SPRITES = {
+    "BASIC": "monster",
+    "TREASURE": "treasure_chest",
+    "SNOW_DRAGON": "snow_dragon"
+}
+
+AVATAR_SPRITES = {
+    "HOPE": "hope_tower",
+    "BRYCE": "bryce_tower"
+}
+
+_sprites = {}  # (name, size) -> Surface, or None if it could not be loaded
+_pending = {}  # (name, size) -> Future of a background load
+_lock = threading.Lock()
+_import_lock = threading.Lock()
+_svg2png = None
+_executor = None
+
+
+def has_cairosvg():
+    """Import CairoSVG on first use.  It takes longer to import than the
+    rest of the game, and nothing needs it until a sprite is rasterized."""
+    global _svg2png
+    with _import_lock:
+        if _svg2png is None:
+            try:
+                from cairosvg import svg2png
+                _svg2png = svg2png
+            except (ImportError, OSError):
+                _svg2png = False
+                print("CairoSVG not available - using fallback rendering")
+        return bool(_svg2png)
+
+
+def _rasterize(key):
+    name, size = key
+    sprite = None
+    if has_cairosvg():
+        try:
+            with open(f"assets/{name}.svg", "rb") as svg_file:
+                svg_data = svg_file.read()
+            png_data = _svg2png(bytestring=svg_data, output_width=size, output_height=size)
+            sprite = pygame.image.load(io.BytesIO(png_data))
+            print(f"Loaded sprite {name} at {size}px")
+        except Exception as e:
+            print(f"Error loading {name} sprite: {e}")
+
+    with _lock:
+        _pending.pop(key, None)
+        return _sprites.setdefault(key, sprite)
+
+
+def load_sprite(name, size):
+    """assets/<name>.svg rasterized to size x size, or None without CairoSVG.
+
+    Each (name, size) is rasterized once per process and shared by every
+    entity that draws it, so callers must not modify the returned surface.
+    If a background load of it has already started, waits for that load
+    rather than repeat it.  Safe to call from any thread.
+    """
+    key = (name, size)
+    with _lock:
+        if key in _sprites:
+            return _sprites[key]
+        future = _pending.get(key)
+    # A load still queued behind others is quicker to do here and now
+    if future is not None and not future.cancel():
+        return future.result()
+    return _rasterize(key)
+
+
+def _schedule(keys):
+    """Start background loads of any keys not loaded or loading.  Call with _lock held."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sprites")
+    for key in keys:
+        if key not in _sprites and key not in _pending:
+            _pending[key] = _executor.submit(_rasterize, key)
+
+
+def warm_sprites(keys):
+    """Rasterize (name, size) sprites on background threads, so the first
+    frames that draw them do not have to"""
+    with _lock:
+        _schedule(keys)
+
+
+def get_sprite_nowait(name, size):
+    """The sprite if it is ready, else None - and it will be loaded in the background"""
+    key = (name, size)
+    with _lock:
+        if key in _sprites:
+            return _sprites[key]
+        _schedule([key])
+    return None
+
+
+def get_startup_sprites():
+    """Every sprite the game draws, as (name, size) keys for warm_sprites"""
+    keys = [(name, 80) for name in AVATAR_SPRITES.values()]
+    keys += [(name, 30) for name in ENEMY_SPRITES.values()]
+    keys += [(name, get_tower_size(level)) for name in TOWER_SPRITES.values()
+             for level in range(MAX_UPGRADE_LEVEL)]
+    return keys
+
+
+def get_enemy_sprite(enemy_type):
+    return load_sprite(ENEMY_SPRITES.get(enemy_type, "monster"), 30)
+
+
+def get_tower_size(level):
+    # Towers grow 10% per level
+    return int(40 * (1.0 + level * 0.1))
+
+
+def get_tower_sprite(tower_type, level):
+    name = TOWER_SPRITES.get(tower_type, tower_type.lower())
+    return load_sprite(name, get_tower_size(level))
+
+
+def get_tower_glow(level):
+    """Yellow glow drawn behind upgraded tower sprites"""
+    size = get_tower_size(level)
+    key = ("glow", size)
+    with _lock:
+        glow = _sprites.get(key)
+        if glow is None:
+            glow = pygame.Surface((size+4, size+4), pygame.SRCALPHA)
+            pygame.draw.circle(glow, (255, 255, 200, 100), (size//2+2, size//2+2), size//2+2)
+            _sprites[key] = glow
+        return glow
@@ -0,0 +1,25 @@
+from .constants import *
+
+
+class SimClock:
+    """Simulation time, advanced one fixed step per update.
+
+    Gameplay timers (freezes, slows, fire rates, spawn delays, cooldowns) read
+    this instead of the wall clock, so a long frame or a pause never changes
+    how the simulation plays out.
+    """
+
+    def __init__(self, step=SIM_STEP):
+        self.step = step
+        self.tick = 0
+
+    @property
+    def now(self):
+        """Seconds of simulated time"""
+        return self.tick * self.step
+
+    def advance(self):
+        self.tick += 1
+
+    def reset(self):
+        self.tick = 0
@@ -1,13 +1,25 @@
 # Screen settings
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
+FPS = 144  # Render frame cap; the simulation runs at SIM_HZ regardless
+
+# Simulation timing.  Speeds are in pixels per tick at SIM_HZ.
+SIM_HZ = 60
+SIM_STEP = 1 / SIM_HZ
+# Most simulation steps run to catch up at once.  Past that the backlog is
+# dropped and the game slows down, rather than spiralling: steps spent
+# catching up make the next frame later still.
+MAX_SUBSTEPS = 5
+GAME_SPEEDS = [1, 2, 4, 8]  # Fast-forward multipliers (simulation ticks per real tick)
 
 # Colors
 BACKGROUND_COLOR = (235, 245, 255)  # Light blue for winter theme
 UI_COLOR = (200, 220, 255)
 TEXT_COLOR = (50, 50, 70)
 
+# Ambient snowfall (decoration only - see snowfall.py)
+SNOW_DENSITY = 1.0  # Flakes relative to the default amount; 0 turns the snow off
+
 # Game settings
 STARTING_MONEY = 300
 STARTING_LIVES = 25
@@ -25,6 +37,15 @@ TOWER_COSTS = {
     "ANDRII": 1000
 }
 
+# Tower targeting modes (cycled per tower with TAB when selected)
+TARGETING_MODES = ["CLOSE", "FIRST", "LAST", "STRONGEST"]
+
+# Tower placement and lookup
+TOWER_MIN_SPACING = 40  # Minimum distance between towers
+TOWER_CLICK_RADIUS = 20  # Click radius for selecting towers
+TOWER_GRID_CELL_SIZE = 80  # Cell size of the tower spatial grid
+TARGET_RETRY_DELAY = 0.1  # Seconds an idle tower waits before looking for targets again
+
 # Tower upgrade multipliers
 UPGRADE_COST_MULTIPLIER = 1.5
 MAX_UPGRADE_LEVEL = 4
@@ -84,6 +105,11 @@ TOWER_PROPERTIES = {
     }
 }
 
+# Fast projectiles bound to their target (ICE, HOPE, BRYCE).  Their impact tick
+# is solved at fire time and damage lands on that tick, so they never tunnel
+# past an enemy or need collision tests; the projectile itself is only visual.
+TIMED_IMPACT_PROJECTILES = ["ice_shard", "hope_beam", "lightning_bolt"]
+
 # Enemy properties
 ENEMY_TYPES = ["BASIC", "TREASURE", "SNOW_DRAGON"]
 ENEMY_PROPERTIES = {
@@ -129,6 +155,10 @@ POWERUP_PROPERTIES = {
 # Path settings
 TILE_SIZE = 40
 PATH_COLOR = (200, 200, 220)
+COVERAGE_BUCKET_SIZE = 5  # Path length per bucket of the tower coverage table
+HEATMAP_CELL_SIZE = 10  # Pixel size of the placement preview coverage raster
+HEATMAP_DPS_SCALE = 100  # DPS at which a heatmap cell is half as hot as the maximum
+HEATMAP_REPAINT_BATCH = 100  # Cells repainted per step of deferred work
 
 # Difficulty settings
 DIFFICULTY_LEVELS = ["EASY", "NORMAL", "HARD", "EXTRA_HARD", "IMPOSSIBLE"]
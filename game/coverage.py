@@ -0,0 +1,42 @@
+import math
+from .constants import *
+
+
+def get_tower_dps(tower):
+    return tower.damage * tower.fire_rate
+
+
+class PathCoverage:
+    """Combined tower DPS for every stretch of the path.
+
+    The path is cut into buckets of COVERAGE_BUCKET_SIZE pixels of distance
+    traveled.  Placing or upgrading a tower adds its DPS to the buckets its
+    range covers, so the table never needs a full rebuild.  Balance tooling
+    uses it to estimate a layout's strength without playing it.
+    """
+
+    def __init__(self, path, bucket_size=COVERAGE_BUCKET_SIZE):
+        self.path = path
+        self.bucket_size = bucket_size
+        self.dps = [0.0] * math.ceil(path.total_length / bucket_size)
+
+    def _buckets(self, pieces):
+        """Bucket indexes touched by a set of path pieces, each only once"""
+        touched = set()
+        for start, end, _ in pieces:
+            first = int(start // self.bucket_size)
+            last = min(int(end // self.bucket_size), len(self.dps) - 1)
+            touched.update(range(first, last + 1))
+        return touched
+
+    def add_tower(self, tower):
+        dps = get_tower_dps(tower)
+        for i in self._buckets(tower.path_coverage):
+            self.dps[i] += dps
+
+    def get_damage_to_cross(self, speed):
+        """Total damage an enemy moving speed pixels per tick takes walking the whole path"""
+        if speed <= 0:
+            return float('inf')
+        seconds_per_bucket = self.bucket_size / (speed * SIM_HZ)
+        return sum(self.dps) * seconds_per_bucket
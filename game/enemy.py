@@ -1,17 +1,48 @@
-import pygame
 import math
 import random
-import io
-try:
-    from cairosvg import svg2png
-    HAS_CAIROSVG = True
-except (ImportError, OSError):
-    HAS_CAIROSVG = False
+import itertools
 from .constants import *
+from .assets import get_enemy_sprite
+from .render import get_circle, get_health_bar
+from .spatial import EnemyPathIndex
+from .slotmap import SlotMap
+
+_next_uid = itertools.count(1)
+
+
+ENEMY_FALLBACK_COLORS = {
+    "BASIC": (255, 150, 150),
+    "TREASURE": (255, 215, 0),
+    "SNOW_DRAGON": (200, 255, 255)
+}
+
+
+def draw_enemy(queue, enemy_type, x, y, health_fraction, frozen=False, slowed=False):
+    """Queue an enemy's blits"""
+    sprite = get_enemy_sprite(enemy_type) if queue.quality.sprites else None
+    if sprite:
+        queue.add_centered("enemies", sprite, x, y)
+    else:
+        # Fallback rendering
+        color = ENEMY_FALLBACK_COLORS.get(enemy_type, (255, 150, 150))
+        queue.add("enemies", get_circle(color, 15), (int(x) - 15, int(y) - 15))
+
+    # Draw health bar
+    if queue.quality.health_bars:
+        queue.add("health_bars", get_health_bar(health_fraction), (x - 15, y - 20))
+
+    # Draw status effect indicators
+    if frozen:
+        queue.add("status", get_circle((100, 200, 255), 18, 2), (int(x) - 18, int(y) - 18))
+    elif slowed:
+        queue.add("status", get_circle((180, 220, 255), 18, 2), (int(x) - 18, int(y) - 18))
+
 
 class Enemy:
-    def __init__(self, path, enemy_type, difficulty_multipliers=None):
+    def __init__(self, path, enemy_type, difficulty_multipliers=None, clock=None):
+        self.uid = next(_next_uid)
         self.type = enemy_type
+        self.clock = clock
         self.properties = ENEMY_PROPERTIES[enemy_type].copy()
 
         # Apply difficulty multipliers if provided
@@ -24,51 +55,32 @@ class Enemy:
         self.base_speed = self.properties["speed"]  # Store original speed
         self.path = path
         self.path_index = 0
+        self.distance_traveled = 0  # Progress along the path, used for targeting order
+        self.index_slot = None  # Position in the EnemyPathIndex
+        self.handle = None  # In EnemyManager.enemies, while in play
+        self.pending_damage = 0  # Damage from shots already in flight
         self.pos = list(path.points[0])
+        self.prev_pos = tuple(self.pos)  # Position before the last tick, for interpolation
         self.reached_end = False
         self.frozen_until = 0  # Time until frozen effect wears off
         self.slowed_until = 0  # Time until slow effect wears off
         self.slow_factor = 1.0  # Current speed multiplier
         self.last_frost_breath = 0  # For snow dragon's ability
 
-        # Load correct sprite based on enemy type
-        if HAS_CAIROSVG:
-            sprite_name = {
-                "BASIC": "monster",
-                "TREASURE": "treasure_chest",
-                "SNOW_DRAGON": "snow_dragon"
-            }.get(enemy_type, "monster")
-
-            try:
-                with open(f"assets/{sprite_name}.svg", "rb") as svg_file:
-                    svg_data = svg_file.read()
-                png_data = svg2png(bytestring=svg_data, output_width=30, output_height=30)
-                png_file = io.BytesIO(png_data)
-                self.sprite = pygame.image.load(png_file)
-                print(f"Loaded sprite for {enemy_type}")
-            except Exception as e:
-                print(f"Error loading {enemy_type} sprite: {e}")
-                self.sprite = None
-        else:
-            self.sprite = None
-
-    def use_frost_breath(self, towers):
+    def use_frost_breath(self, tower_manager):
         if self.type != "SNOW_DRAGON":
             return
 
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         if current_time - self.last_frost_breath < 3:  # Use ability every 3 seconds
             return
 
         freeze_range = self.properties["freeze_range"]
         freeze_duration = self.properties["freeze_duration"]
 
-        for tower in towers:
-            distance = math.sqrt((tower.pos[0] - self.pos[0])**2 + 
-                               (tower.pos[1] - self.pos[1])**2)
-            if distance <= freeze_range:
-                tower.frozen_until = current_time + freeze_duration
-                print(f"Snow Dragon froze a tower at {tower.pos}")
+        for tower in tower_manager.get_towers_near(self.pos, freeze_range):
+            tower.frozen_until = current_time + freeze_duration
+            print(f"Snow Dragon froze a tower at {tower.pos}")
 
         self.last_frost_breath = current_time
 
@@ -77,18 +89,32 @@ class Enemy:
         print(f"Enemy took {damage} damage. Health remaining: {self.health}")
 
     def apply_freeze(self, duration):
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         self.frozen_until = current_time + duration
         print(f"Enemy frozen for {duration} seconds")
 
     def apply_slow(self, duration, slow_factor):
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         self.slowed_until = current_time + duration
         self.slow_factor = slow_factor
         print(f"Enemy slowed to {slow_factor*100}% speed for {duration} seconds")
 
+    def get_current_speed(self, current_time):
+        """Distance moved per tick right now, with freeze and slow applied"""
+        if current_time < self.frozen_until:
+            return 0
+        if current_time < self.slowed_until:
+            return self.base_speed * self.slow_factor
+        return self.base_speed
+
+    def predict_position(self, ticks_ahead):
+        """Where this enemy will be after ticks_ahead ticks at its current speed"""
+        distance = self.distance_traveled + self.get_current_speed(self.clock.now) * ticks_ahead
+        return self.path.get_position_at(distance)[1]
+
     def update(self):
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
+        self.prev_pos = (self.pos[0], self.pos[1])
 
         # Check status effects
         if current_time < self.frozen_until:
@@ -101,61 +127,30 @@ class Enemy:
             current_speed = self.base_speed
             self.slow_factor = 1.0
 
-        # Movement logic
-        if self.path_index < len(self.path.points) - 1:
-            target = self.path.points[self.path_index + 1]
-            dx = target[0] - self.pos[0]
-            dy = target[1] - self.pos[1]
-            distance = math.sqrt(dx**2 + dy**2)
-
-            if distance < current_speed:
-                self.path_index += 1
-            else:
-                self.pos[0] += (dx/distance) * current_speed
-                self.pos[1] += (dy/distance) * current_speed
+        # Movement logic - advance along the path by arc length
+        if self.distance_traveled < self.path.total_length:
+            self.distance_traveled = min(self.distance_traveled + current_speed,
+                                         self.path.total_length)
+            self.path_index, (self.pos[0], self.pos[1]) = self.path.get_position_at(
+                self.distance_traveled)
         else:
             self.reached_end = True
 
-    def draw(self, screen):
-        try:
-            if self.sprite:
-                screen.blit(self.sprite, 
-                          (self.pos[0] - self.sprite.get_width()//2,
-                           self.pos[1] - self.sprite.get_height()//2))
-            else:
-                # Fallback rendering
-                colors = {
-                    "BASIC": (255, 150, 150),
-                    "TREASURE": (255, 215, 0),
-                    "SNOW_DRAGON": (200, 255, 255)
-                }
-                color = colors.get(self.type, (255, 150, 150))
-                pygame.draw.circle(screen, color, 
-                                (int(self.pos[0]), int(self.pos[1])), 15)
-
-            # Draw health bar
-            health_width = 30 * (self.health / self.properties["health"])
-            pygame.draw.rect(screen, (255, 0, 0),
-                           (self.pos[0] - 15, self.pos[1] - 20, 30, 4))
-            pygame.draw.rect(screen, (0, 255, 0),
-                           (self.pos[0] - 15, self.pos[1] - 20, health_width, 4))
-
-            # Draw status effect indicators
-            current_time = pygame.time.get_ticks() / 1000
-            if current_time < self.frozen_until:
-                pygame.draw.circle(screen, (100, 200, 255),
-                                (int(self.pos[0]), int(self.pos[1])), 18, 2)
-            elif current_time < self.slowed_until:
-                pygame.draw.circle(screen, (180, 220, 255),
-                                (int(self.pos[0]), int(self.pos[1])), 18, 2)
-
-        except pygame.error as e:
-            print(f"Error drawing enemy: {e}")
+    def draw(self, queue, alpha=1.0):
+        # Interpolate between the last two ticks for smooth high refresh rates
+        x = self.prev_pos[0] + (self.pos[0] - self.prev_pos[0]) * alpha
+        y = self.prev_pos[1] + (self.pos[1] - self.prev_pos[1]) * alpha
+        current_time = self.clock.now
+        draw_enemy(queue, self.type, x, y, self.health / self.properties["health"],
+                   current_time < self.frozen_until, current_time < self.slowed_until)
 
 class EnemyManager:
-    def __init__(self, path, difficulty="NORMAL"):
+    def __init__(self, path, difficulty="NORMAL", clock=None, rng=None):
         self.path = path
-        self.enemies = []
+        self.clock = clock
+        self.rng = rng if rng is not None else random.Random()  # Seeded for reproducible waves
+        self.enemies = SlotMap()
+        self.index = EnemyPathIndex()  # Enemies ordered by path progress for targeting
         self.wave_number = 0
         self.spawn_timer = 0
         self.wave_complete = True  # Start with True so first wave doesn't auto-complete
@@ -191,7 +186,7 @@ class EnemyManager:
         print(f"Starting Wave {self.wave_number} with {self.enemies_to_spawn} enemies! Reward per kill: ${self.current_reward}")
 
         self.wave_complete = False
-        self.last_spawn_time = pygame.time.get_ticks() / 1000
+        self.last_spawn_time = self.clock.now
 
     def spawn_single_enemy(self):
         # Determine enemy type based on wave number
@@ -199,7 +194,7 @@ class EnemyManager:
             enemy_type = "BASIC"  # Wave 1 only has basic enemies
         else:
             # After wave 1, introduce other enemy types
-            roll = random.random()
+            roll = self.rng.random()
             if roll < 0.1 and self.wave_number >= 3:  # 10% chance for treasure chest after wave 3
                 enemy_type = "TREASURE"
             elif roll < 0.3 and self.wave_number >= 2:  # 20% chance for snow dragon after wave 2
@@ -214,20 +209,34 @@ class EnemyManager:
         }
 
         # Create enemy with difficulty scaling
-        enemy = Enemy(self.path, enemy_type, difficulty_multipliers)
+        enemy = Enemy(self.path, enemy_type, difficulty_multipliers, self.clock)
         if enemy_type != "TREASURE":  # Don't scale treasure chest health
             # Add 3 health points per wave
             health_increase = 3 * (self.wave_number - 1)  # Wave 1 has normal health
             enemy.health = enemy.health + health_increase
         enemy.properties["health"] = enemy.health  # Update max health for health bar
 
-        self.enemies.append(enemy)
+        self.add_enemy(enemy)
         print(f"Spawned {enemy_type} enemy with {enemy.health} health! Remaining: {self.enemies_to_spawn-1}")
         self.enemies_to_spawn -= 1
-        self.last_spawn_time = pygame.time.get_ticks() / 1000
+        self.last_spawn_time = self.clock.now
 
-    def update(self):
-        current_time = pygame.time.get_ticks() / 1000
+    def add_enemy(self, enemy):
+        enemy.handle = self.enemies.insert(enemy)
+        self.index.add(enemy)
+
+    def remove_enemy(self, enemy):
+        self.enemies.remove(enemy.handle)
+        self.index.remove(enemy)
+
+    def get_enemies_near(self, pos, radius):
+        """Enemies within radius of pos, found through the path-order index"""
+        return self.index.get_in_range(self.path.get_covered_intervals(pos, radius))
+
+    def update(self, tower_manager=None, events=None):
+        """Spawn and move enemies.  Enemies reaching the end of the path are
+        reported to events, a TickEvents, for the Simulation to resolve."""
+        current_time = self.clock.now
 
         # Start first wave immediately after game starts
         if not self.first_wave_started and self.wave_number == 0:
@@ -248,13 +257,16 @@ class EnemyManager:
             self.spawn_single_enemy()
 
         # Update existing enemies and their abilities
-        for enemy in self.enemies[:]:
+        for enemy in self.enemies:
             enemy.update()
-            if isinstance(enemy, Enemy) and enemy.type == "SNOW_DRAGON":
-                from .tower import TowerManager  # Avoid circular import
-                if isinstance(self.path, TowerManager):
-                    enemy.use_frost_breath(self.path.towers)
+            if enemy.reached_end and events is not None:
+                events.leaks.append(enemy)
+            if enemy.type == "SNOW_DRAGON" and tower_manager:
+                enemy.use_frost_breath(tower_manager)
+
+        # Enemies moved, so bring the path-order index up to date
+        self.index.refresh()
 
-    def draw(self, screen):
+    def draw(self, queue, alpha=1.0):
         for enemy in self.enemies:
-            enemy.draw(screen)
\ No newline at end of file
+            enemy.draw(queue, alpha)
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Gameplay events gathered during a tick and resolved together.
+
+Projectiles and enemies do not change the score or each other directly.
+They report what happened - a projectile hitting an enemy, an enemy
+reaching the end of the path - into a TickEvents buffer, and the
+Simulation resolves the whole tick in one pass: damage and on-hit
+effects, then kills and their rewards, then leaks.  Each event is applied
+exactly once, and finding what died takes no scan over every enemy.
+The tick's totals are added to the Simulation's running totals, which
+wave summaries are taken from.
+"""
+
+
+class TickEvents:
+    def __init__(self):
+        self.hits = []  # (enemy, projectile), in the order they landed
+        self.kills = []  # Enemies whose health reached 0 this tick
+        self.leaks = []  # Enemies that reached the end of the path this tick
+
+        # Totals for the tick, added up while resolving
+        self.damage = 0
+        self.reward = 0
+        self.lives_lost = 0
+
+    def clear(self):
+        self.hits.clear()
+        self.kills.clear()
+        self.leaks.clear()
+        self.damage = 0
+        self.reward = 0
+        self.lives_lost = 0
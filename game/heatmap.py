@@ -0,0 +1,166 @@
+import bisect
+import math
+import pygame
+from .constants import *
+from .coverage import get_tower_dps
+
+
+class CoverageHeatmap:
+    """Raster of combined tower DPS over the path, for the placement preview.
+
+    Only cells on the path are tracked.  Placing or upgrading a tower adds or
+    removes one disc of DPS.  This is simulation state; drawing it is left to
+    a HeatmapOverlay, which only sees copies made by get_dps, so in threaded
+    mode the two threads never share the table.
+    """
+
+    def __init__(self, path, cell_size=HEATMAP_CELL_SIZE):
+        self.path = path
+        self.cell_size = cell_size
+        self.dps = {}   # (col, row) -> combined DPS, path cells only
+        self.rows = {}  # row -> sorted cols of path cells in that row
+
+        # Cells whose centers fall in one of the path's rectangles
+        last_col = math.ceil(SCREEN_WIDTH / cell_size) - 1
+        last_row = math.ceil(SCREEN_HEIGHT / cell_size) - 1
+        for left, top, right, bottom in path.rects:
+            for row in range(max(0, math.ceil(top / cell_size - 0.5)),
+                             min(last_row, math.floor(bottom / cell_size - 0.5)) + 1):
+                for col in range(max(0, math.ceil(left / cell_size - 0.5)),
+                                 min(last_col, math.floor(right / cell_size - 0.5)) + 1):
+                    self.dps[(col, row)] = 0.0
+        for col, row in sorted(self.dps):
+            self.rows.setdefault(row, []).append(col)
+
+        self._copy = None  # Last copy handed out by get_dps, until the next change
+
+    def get_disc_cells(self, pos, radius):
+        """Path cells whose centers fall inside a circle.  Reads only the path
+        geometry, so it is safe to call from the drawing thread."""
+        cells = []
+        size = self.cell_size
+        first_row = max(0, int((pos[1] - radius) // size))
+        last_row = int((pos[1] + radius) // size)
+        for row in range(first_row, last_row + 1):
+            cols = self.rows.get(row)
+            if not cols:
+                continue
+            dy = (row + 0.5) * size - pos[1]
+            if abs(dy) > radius:
+                continue
+            half = math.sqrt(radius * radius - dy * dy)
+            lo = bisect.bisect_left(cols, math.ceil((pos[0] - half) / size - 0.5))
+            hi = bisect.bisect_right(cols, math.floor((pos[0] + half) / size - 0.5))
+            cells.extend((col, row) for col in cols[lo:hi])
+        return cells
+
+    def add_tower(self, tower):
+        self._apply(tower, get_tower_dps(tower))
+
+    def remove_tower(self, tower):
+        self._apply(tower, -get_tower_dps(tower))
+
+    def _apply(self, tower, dps):
+        for cell in self.get_disc_cells(tower.pos, tower.range):
+            self.dps[cell] = max(0.0, self.dps[cell] + dps)
+        self._copy = None
+
+    def get_dps(self):
+        """Copy of the DPS table for drawing.  The same copy is returned until a
+        tower changes, so the renderer can tell a change by identity."""
+        if self._copy is None:
+            self._copy = dict(self.dps)
+        return self._copy
+
+
+class HeatmapOverlay:
+    """Draws a CoverageHeatmap: the cached overlay surface and the hover preview.
+
+    Belongs to the drawing side.  It is fed copies of the DPS table with
+    set_dps - straight from the heatmap, or from the frame snapshot when the
+    simulation runs on its own thread - and only the cells that changed are
+    repainted on the overlay surface, as deferred work (see repaint).  The
+    hover preview rasterizes a single disc against the path rows, which is
+    cheap enough to redo on every mouse-motion event.
+    """
+
+    def __init__(self, heatmap):
+        self.heatmap = heatmap  # Only its path geometry is read
+        self.cell_size = heatmap.cell_size
+        self.dps = {}  # Copy of the heatmap's table that the surface shows
+        self.surface = None
+        self._dirty = set()  # Cells to repaint on the overlay surface
+        self.preview_cells = []
+        self.preview_pos = None
+        self.preview_range = 0
+        self.preview_dps = 0
+        self.preview_length = 0
+        self.font = None
+
+    def set_dps(self, dps):
+        """Show a new copy of the DPS table, repainting the cells that changed"""
+        if dps is self.dps:
+            return
+        old = self.dps
+        self._dirty.update(cell for cell, value in dps.items() if old.get(cell) != value)
+        self.dps = dps
+
+    def set_preview(self, pos, tower_type):
+        """Rasterize what a new tower of this type would cover at pos"""
+        props = TOWER_PROPERTIES[tower_type]
+        self.preview_pos = pos
+        self.preview_range = props["range"][0]
+        self.preview_dps = props["damage"][0] * props["fire_rate"][0]
+        self.preview_cells = self.heatmap.get_disc_cells(pos, self.preview_range)
+        pieces = self.heatmap.path.get_covered_intervals(pos, self.preview_range)
+        self.preview_length = sum(end - start for start, end, _ in pieces)
+
+    def clear_preview(self):
+        self.preview_pos = None
+        self.preview_cells = []
+
+    def _cell_color(self, dps):
+        if dps <= 0:
+            return (0, 0, 0, 0)
+        heat = dps / (dps + HEATMAP_DPS_SCALE)
+        return (255, int(200 - 150 * heat), 60, int(50 + 150 * heat))
+
+    def needs_repaint(self):
+        return bool(self._dirty)
+
+    def repaint(self):
+        """Generator repainting changed cells HEATMAP_REPAINT_BATCH at a time, for the scheduler"""
+        if self.surface is None:
+            self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        size = self.cell_size
+        while self._dirty:
+            # Swap the set out first - set_dps may add cells between steps
+            dirty, self._dirty = self._dirty, set()
+            for i, (col, row) in enumerate(dirty, 1):
+                self.surface.fill(self._cell_color(self.dps.get((col, row), 0.0)),
+                                  (col * size, row * size, size, size))
+                if i % HEATMAP_REPAINT_BATCH == 0:
+                    yield
+
+    def draw(self, screen):
+        if self.surface is not None:
+            screen.blit(self.surface, (0, 0))
+
+    def draw_preview(self, screen):
+        if self.preview_pos is None:
+            return
+        size = self.cell_size
+        for col, row in self.preview_cells:
+            screen.fill((0, 40, 80), (col * size, row * size, size, size),
+                        special_flags=pygame.BLEND_RGB_SUB)
+        pygame.draw.circle(screen, (100, 150, 220), self.preview_pos, self.preview_range, 1)
+
+        # Existing DPS under the cursor's coverage and what the new tower adds
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        existing = max((self.dps.get(cell, 0.0) for cell in self.preview_cells), default=0)
+        label = self.font.render(
+            f"+{self.preview_dps:.0f} DPS (now {existing:.0f}) over {self.preview_length:.0f}px of path",
+            True, TEXT_COLOR)
+        screen.blit(label, (self.preview_pos[0] - label.get_width()//2,
+                            self.preview_pos[1] + 20))
@@ -0,0 +1,236 @@
+"""Two-player co-op over a socket by deterministic lockstep.
+
+Both processes run the same seeded Simulation and exchange only their
+inputs.  Commands a player issues on tick t are scheduled for tick
+t + INPUT_DELAY and sent right away, so a tick can run as soon as the
+partner's inputs for it arrive - usually long before it is due.  A process
+that pauses (the quiz, the pause menu) stops sending, and its partner
+waits for it.  Every CHECKSUM_INTERVAL ticks the two sides swap a CRC of
+their simulation state to catch desyncs.
+
+    python main.py --coop-host 127.0.0.1:5556 --difficulty HARD
+    python main.py --coop-join 127.0.0.1:5556
+
+An idle tick costs 6 bytes each way.
+"""
+import os
+import struct
+from .constants import *
+from .net import make_socket, listen, set_nonblocking
+
+INPUT_DELAY = 4  # Ticks between issuing a command and running it
+CHECKSUM_INTERVAL = 60
+
+HELLO = struct.Struct("<BBQ")  # b"H", difficulty, seed
+INPUTS = struct.Struct("<BIB")  # b"I", tick, command count
+CHECKSUM = struct.Struct("<BII")  # b"C", tick, crc
+
+DIFFICULTIES = list(DIFFICULTY_SETTINGS)
+
+# Wire format of each command: code, struct of its arguments, and which
+# arguments are names sent as indexes into a table
+COMMANDS = {
+    "place": (0, struct.Struct("<hhB"), {2: TOWER_TYPES}),
+    "upgrade": (1, struct.Struct("<hh"), {}),
+    "target": (2, struct.Struct("<hh"), {}),
+    "powerup": (3, struct.Struct("<Bhh"), {0: POWERUP_TYPES}),
+    "treasure": (4, struct.Struct("<"), {}),
+    "bonus": (5, struct.Struct("<BB"), {}),
+}
+COMMANDS_BY_CODE = {code: (kind, fmt, names) for kind, (code, fmt, names) in COMMANDS.items()}
+
+
+def encode_command(command):
+    code, fmt, names = COMMANDS[command[0]]
+    args = [names[i].index(arg) if i in names else arg for i, arg in enumerate(command[1:])]
+    return bytes([code]) + fmt.pack(*args)
+
+
+def is_valid_command(command):
+    """Whether a decoded command is one the simulation can apply"""
+    if command[0] == "bonus":
+        _, correct, total = command
+        return 0 < total and correct <= total
+    return True
+
+
+def decode_command(data, offset):
+    """Returns (command, offset after it).  Raises struct.error or IndexError
+    if the command has not all arrived, and ValueError if it is not valid."""
+    code = data[offset]
+    if code not in COMMANDS_BY_CODE:
+        raise ValueError(f"unknown command code {code}")
+    kind, fmt, names = COMMANDS_BY_CODE[code]
+    args = fmt.unpack_from(data, offset + 1)
+    for i, table in names.items():
+        if args[i] >= len(table):
+            raise ValueError(f"{kind} names entry {args[i]} of {len(table)}")
+    command = (kind, *[names[i][arg] if i in names else arg for i, arg in enumerate(args)])
+    if not is_valid_command(command):
+        raise ValueError(f"invalid command {command}")
+    return command, offset + 1 + fmt.size
+
+
+class Lockstep:
+    """One side of a co-op connection.  Create with host() or join()."""
+
+    def __init__(self, sock, is_host, difficulty, seed):
+        self.sock = sock
+        self.is_host = is_host
+        self.difficulty = difficulty
+        self.seed = seed
+        self.buffer = bytearray()
+        self.outgoing = bytearray()  # Sent but not yet taken by the socket
+        self.pending = []  # Local commands not yet scheduled
+        self.local = {}  # tick -> our commands
+        self.remote = {}  # tick -> partner's commands
+        self.sent_through = INPUT_DELAY  # Ticks up to the delay are empty on both sides
+        self.local_checksums = {}
+        self.remote_checksums = {}
+        self.connected = True
+        self.desynced_at = None
+        self.waiting = False  # Stalled on the partner's inputs
+        self.bytes_sent = 0
+
+        set_nonblocking(sock)
+
+    @classmethod
+    def host(cls, address, difficulty="NORMAL", seed=None):
+        """Wait for a partner to connect, then tell it the difficulty and seed"""
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+        listener = listen(address, 1)
+        print(f"Waiting for co-op partner on {address}...")
+        sock, _ = listener.accept()
+        listener.close()
+        sock.sendall(HELLO.pack(ord("H"), DIFFICULTIES.index(difficulty), seed))
+        print("Co-op partner connected")
+        return cls(sock, True, difficulty, seed)
+
+    @classmethod
+    def join(cls, address):
+        sock, connect_address = make_socket(address)
+        sock.connect(connect_address)
+        data = b""
+        while len(data) < HELLO.size:
+            chunk = sock.recv(HELLO.size - len(data))
+            if not chunk:
+                raise ConnectionError("Co-op host closed the connection")
+            data += chunk
+        _, difficulty, seed = HELLO.unpack(data)
+        print(f"Joined co-op game on {DIFFICULTIES[difficulty]}")
+        return cls(sock, False, DIFFICULTIES[difficulty], seed)
+
+    def submit(self, command):
+        # Checked here too, so both sides apply exactly the same commands
+        if is_valid_command(command):
+            self.pending.append(command)
+        else:
+            print(f"Not sending invalid command {command}")
+
+    def _send(self, data):
+        self.outgoing += data
+        self.bytes_sent += len(data)
+        self._flush()
+
+    def _flush(self):
+        """Send what the socket takes now.  The rest stays queued for the next tick."""
+        try:
+            while self.outgoing:
+                del self.outgoing[:self.sock.send(self.outgoing)]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self.connected = False
+
+    def _send_inputs(self, tick):
+        """Schedule pending commands and send our inputs through tick + INPUT_DELAY"""
+        while self.sent_through < tick + INPUT_DELAY:
+            self.sent_through += 1
+            commands, self.pending = self.pending, []
+            self.local[self.sent_through] = commands
+            self._send(INPUTS.pack(ord("I"), self.sent_through, len(commands))
+                       + b"".join(encode_command(c) for c in commands))
+
+    def _receive(self):
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    self.connected = False
+                    break
+                self.buffer += data
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self.connected = False
+
+        buffer = self.buffer
+        offset = 0
+        while offset < len(buffer):
+            kind = buffer[offset]
+            if kind == ord("I"):
+                if len(buffer) - offset < INPUTS.size:
+                    break
+                _, tick, count = INPUTS.unpack_from(buffer, offset)
+                end = offset + INPUTS.size
+                commands = []
+                try:
+                    for _ in range(count):
+                        command, end = decode_command(buffer, end)
+                        commands.append(command)
+                except (struct.error, IndexError):
+                    break  # Rest of the message has not arrived
+                except ValueError as e:
+                    print(f"Co-op partner sent a bad command: {e}")
+                    self.connected = False
+                    break
+                self.remote[tick] = commands
+                offset = end
+            elif kind == ord("C"):
+                if len(buffer) - offset < CHECKSUM.size:
+                    break
+                _, tick, crc = CHECKSUM.unpack_from(buffer, offset)
+                self.remote_checksums[tick] = crc
+                offset += CHECKSUM.size
+            else:
+                print(f"Co-op stream corrupted (message type {kind})")
+                self.connected = False
+                break
+        del buffer[:offset]
+
+    def step(self, sim):
+        """Run the next tick if both players' inputs for it are in.  Returns True if it ran."""
+        tick = sim.clock.tick + 1
+        self._flush()
+        self._send_inputs(tick)
+        self._receive()
+        if tick > INPUT_DELAY and tick not in self.remote:
+            self.waiting = True
+            return False
+        self.waiting = False
+
+        # Host's commands first, so both sides apply them in the same order
+        ours = self.local.pop(tick, [])
+        theirs = self.remote.pop(tick, [])
+        for command in (ours + theirs if self.is_host else theirs + ours):
+            sim.apply_command(command)
+        sim.step()
+
+        if tick % CHECKSUM_INTERVAL == 0:
+            crc = sim.get_checksum()
+            self.local_checksums[tick] = crc
+            self._send(CHECKSUM.pack(ord("C"), tick, crc))
+        self._check_sync()
+        return True
+
+    def _check_sync(self):
+        for tick in [t for t in self.remote_checksums if t in self.local_checksums]:
+            if self.remote_checksums.pop(tick) != self.local_checksums.pop(tick):
+                if self.desynced_at is None:
+                    self.desynced_at = tick
+                    print(f"Co-op desync detected at tick {tick}")
+
+    def close(self):
+        self.sock.close()
+        self.connected = False
@@ -0,0 +1,35 @@
+"""Socket setup shared by the spectator stream, co-op and the session host.
+
+Addresses are "unix:/path/to/socket" or "host:port"; an empty host means
+127.0.0.1.
+"""
+import os
+import socket
+
+
+def make_socket(address):
+    """A new stream socket for address, and the address to bind or connect it to"""
+    if address.startswith("unix:"):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address[len("unix:"):]
+    host, port = address.rsplit(":", 1)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM), (host or "127.0.0.1", int(port))
+
+
+def listen(address, backlog=socket.SOMAXCONN):
+    """A socket listening on address.  A unix socket file left by an earlier run is replaced."""
+    listener, bind_address = make_socket(address)
+    if listener.family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.unlink(bind_address)
+    else:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(bind_address)
+    listener.listen(backlog)
+    return listener
+
+
+def set_nonblocking(sock):
+    """Make a connected socket non-blocking, and send small messages without delay"""
+    sock.setblocking(False)
+    if sock.family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
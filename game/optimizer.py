@@ -0,0 +1,297 @@
+"""Search for tower layouts that beat a difficulty, using headless games.
+
+A layout is an ordered tuple of builds (x, y, tower_type, level).  Builds are
+bought in order between waves as soon as they are affordable: place the
+tower, then upgrade it to its level.  Layouts are scored by playing whole
+games headless in a process pool.
+
+    python -m game.optimizer --difficulty HARD --generations 20
+    python -m game.optimizer --all
+"""
+import os
+import sys
+import math
+import random
+import argparse
+import contextlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from .constants import *
+from .path import Path
+from .tower import Tower, get_upgrade_cost
+from .coverage import PathCoverage
+from .simulation import Simulation
+
+SPOT_SPACING = 20  # Candidate tower positions are on a lattice this fine
+
+LayoutResult = namedtuple("LayoutResult", ["waves_cleared", "won", "lives", "money", "spent"])
+
+
+def get_layout_cost(builds):
+    cost = 0
+    for _, _, tower_type, level in builds:
+        cost += TOWER_COSTS[tower_type]
+        cost += sum(get_upgrade_cost(tower_type, l) for l in range(level))
+    return cost
+
+
+def get_fitness(result):
+    """Sort key - more waves, then more lives, then less money spent"""
+    return (result.waves_cleared, result.lives, -result.spent)
+
+
+def play_layout(job):
+    """Play one full game headless.  job is (difficulty, builds, seed, budget)."""
+    difficulty, builds, seed, budget = job
+    sim = Simulation(difficulty, seed)
+    sim.particles_enabled = False
+
+    # Expand builds into a purchase queue: place, then each upgrade in turn
+    purchases = []
+    for x, y, tower_type, level in builds:
+        purchases.append(((x, y), tower_type))
+        purchases.extend(((x, y), None) for _ in range(level))
+
+    spent = 0
+    towers = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        while not sim.is_lost():
+            # Spend during the break, in build order
+            while purchases:
+                pos, tower_type = purchases[0]
+                if tower_type is not None:
+                    cost = TOWER_COSTS[tower_type]
+                else:
+                    cost = towers[pos].get_upgrade_cost()
+                if sim.money < cost or (budget is not None and spent + cost > budget):
+                    break
+                if tower_type is not None:
+                    if not sim.place_tower(pos, tower_type):
+                        # Blocked spot - skip the build and its upgrades
+                        purchases.pop(0)
+                        while purchases and purchases[0] == (pos, None):
+                            purchases.pop(0)
+                        continue
+                    towers[pos] = sim.tower_manager.towers[-1]
+                else:
+                    sim.upgrade_tower(towers[pos])
+                spent += cost
+                purchases.pop(0)
+
+            sim.resolve_next_wave()
+            if sim.enemy_manager.wave_complete and sim.current_wave >= MAX_WAVE:
+                break
+
+    waves_cleared = sim.current_wave - (0 if sim.enemy_manager.wave_complete else 1)
+    won = not sim.is_lost() and waves_cleared >= MAX_WAVE
+    return LayoutResult(waves_cleared, won, max(0, sim.lives), sim.money, spent)
+
+
+class LayoutOptimizer:
+    """Evolutionary search over layouts for one difficulty.
+
+    Each generation breeds twice as many children as it keeps.  The cheap
+    estimate - damage an enemy takes walking the whole path, from the
+    PathCoverage table - discards the weaker half before any game is played.
+    Results are cached by layout, so survivors and repeat children are
+    never simulated twice.  Each layout is played on several seeds and
+    scored by its worst game, so a winner does not depend on lucky spawns.
+    """
+
+    def __init__(self, difficulty="NORMAL", budget=None, population=24, trials=3,
+                 workers=None, seed=0):
+        self.difficulty = difficulty
+        self.budget = budget
+        self.population = population
+        self.trials = trials
+        self.workers = workers or os.cpu_count() or 1
+        self.rng = random.Random(seed)
+        self.path = Path()
+        self.cache = {}  # builds -> worst LayoutResult over the trials
+        self.games_played = 0
+
+        settings = DIFFICULTY_SETTINGS[difficulty]
+        self.enemy_speed = ENEMY_PROPERTIES["BASIC"]["speed"] * settings["enemy_speed_multiplier"]
+        self.spots = self._find_spots()
+
+    def _find_spots(self):
+        """Lattice points off the path that are within the shortest tower range of it"""
+        shortest = min(TOWER_PROPERTIES[t]["range"][0] for t in TOWER_TYPES)
+        spots = []
+        for x in range(120 + SPOT_SPACING, SCREEN_WIDTH - 120, SPOT_SPACING):
+            for y in range(SPOT_SPACING, SCREEN_HEIGHT, SPOT_SPACING):
+                if self.path.is_on_path((x, y)):
+                    continue
+                if self.path.get_covered_intervals((x, y), shortest):
+                    spots.append((x, y))
+        return spots
+
+    def _fits(self, builds, x, y, skip=None):
+        for i, (bx, by, _, _) in enumerate(builds):
+            if i != skip and math.hypot(bx - x, by - y) < TOWER_MIN_SPACING:
+                return False
+        return True
+
+    def _random_build(self, builds):
+        for _ in range(20):
+            x, y = self.rng.choice(self.spots)
+            if self._fits(builds, x, y):
+                level = self.rng.randrange(MAX_UPGRADE_LEVEL)
+                return (x, y, self.rng.choice(TOWER_TYPES), level)
+        return None
+
+    def _within_budget(self, builds):
+        return self.budget is None or get_layout_cost(builds) <= self.budget
+
+    def random_layout(self):
+        builds = []
+        for _ in range(self.rng.randint(2, 8)):
+            build = self._random_build(builds)
+            if build and self._within_budget(builds + [build]):
+                builds.append(build)
+        return tuple(builds)
+
+    def mutate(self, builds):
+        builds = list(builds)
+        op = self.rng.choice(["move", "type", "level", "add", "remove", "swap"])
+        if not builds:
+            op = "add"
+        i = self.rng.randrange(len(builds)) if builds else 0
+
+        if op == "move":
+            x, y, tower_type, level = builds[i]
+            nx = x + self.rng.choice([-2, -1, 1, 2]) * SPOT_SPACING
+            ny = y + self.rng.choice([-2, -1, 1, 2]) * SPOT_SPACING
+            if (nx, ny) in self.spots and self._fits(builds, nx, ny, skip=i):
+                builds[i] = (nx, ny, tower_type, level)
+        elif op == "type":
+            x, y, _, level = builds[i]
+            builds[i] = (x, y, self.rng.choice(TOWER_TYPES), level)
+        elif op == "level":
+            x, y, tower_type, level = builds[i]
+            level = min(MAX_UPGRADE_LEVEL - 1, max(0, level + self.rng.choice([-1, 1])))
+            builds[i] = (x, y, tower_type, level)
+        elif op == "add":
+            build = self._random_build(builds)
+            if build:
+                builds.insert(self.rng.randint(0, len(builds)), build)
+        elif op == "remove":
+            builds.pop(i)
+        elif op == "swap" and len(builds) > 1:
+            j = self.rng.randrange(len(builds))
+            builds[i], builds[j] = builds[j], builds[i]
+
+        if not self._within_budget(builds):
+            return None
+        return tuple(builds)
+
+    def crossover(self, a, b):
+        """Opening builds of one parent, then whatever fits from the other"""
+        builds = list(a[:self.rng.randint(0, len(a))])
+        for build in b:
+            if self._fits(builds, build[0], build[1]):
+                builds.append(build)
+        while builds and not self._within_budget(builds):
+            builds.pop()
+        return tuple(builds)
+
+    def estimate(self, builds):
+        """Damage an enemy takes crossing the path once the whole layout is built"""
+        coverage = PathCoverage(self.path)
+        for x, y, tower_type, level in builds:
+            tower = Tower((x, y), tower_type)
+            for _ in range(level):
+                tower.upgrade()
+            tower.set_path_coverage(self.path.get_covered_intervals(tower.pos, tower.range))
+            coverage.add_tower(tower)
+        return coverage.get_damage_to_cross(self.enemy_speed)
+
+    def evaluate(self, pool, layouts):
+        """Play every uncached layout on every trial seed, in parallel"""
+        todo = [builds for builds in dict.fromkeys(layouts) if builds not in self.cache]
+        jobs = [(self.difficulty, builds, seed, self.budget)
+                for builds in todo for seed in range(self.trials)]
+        if jobs:
+            chunksize = max(1, len(jobs) // (self.workers * 4))
+            results = list(pool.map(play_layout, jobs, chunksize=chunksize))
+            self.games_played += len(jobs)
+            for i, builds in enumerate(todo):
+                trials = results[i * self.trials:(i + 1) * self.trials]
+                self.cache[builds] = min(trials, key=get_fitness)
+        return [self.cache[builds] for builds in layouts]
+
+    def _pick_parent(self, ranked):
+        # Tournament of two
+        a, b = self.rng.choice(ranked), self.rng.choice(ranked)
+        return a if get_fitness(self.cache[a]) >= get_fitness(self.cache[b]) else b
+
+    def run(self, generations=20, on_generation=None):
+        """Search and return (best builds, its LayoutResult)"""
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            ranked = [self.random_layout() for _ in range(self.population)]
+            self.evaluate(pool, ranked)
+            for generation in range(generations):
+                children = set()
+                for _ in range(self.population * 8):
+                    if len(children) >= self.population * 2:
+                        break
+                    if self.rng.random() < 0.3:
+                        child = self.crossover(self._pick_parent(ranked), self._pick_parent(ranked))
+                    else:
+                        child = self.mutate(self._pick_parent(ranked))
+                    if child and child not in self.cache:
+                        children.add(child)
+
+                # Only play the children whose coverage looks most promising
+                children = sorted(children, key=self.estimate, reverse=True)[:self.population]
+                self.evaluate(pool, children)
+
+                ranked = sorted(set(ranked) | set(children),
+                                key=lambda builds: get_fitness(self.cache[builds]),
+                                reverse=True)[:self.population]
+                if on_generation:
+                    on_generation(generation, ranked[0], self.cache[ranked[0]])
+
+        best = ranked[0]
+        return best, self.cache[best]
+
+
+def format_layout(builds):
+    return ", ".join(f"{tower_type} L{level + 1} at ({x}, {y})" for x, y, tower_type, level in builds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search for tower layouts with headless games")
+    parser.add_argument("--difficulty", default="NORMAL", choices=list(DIFFICULTY_SETTINGS))
+    parser.add_argument("--all", action="store_true", help="check every difficulty is beatable")
+    parser.add_argument("--budget", type=int, default=None, help="most money the layout may spend")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--population", type=int, default=24)
+    parser.add_argument("--trials", type=int, default=3, help="seeds each layout is played on")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    difficulties = list(DIFFICULTY_SETTINGS) if args.all else [args.difficulty]
+    unbeaten = []
+    for difficulty in difficulties:
+        optimizer = LayoutOptimizer(difficulty, args.budget, args.population, args.trials,
+                                    args.workers, args.seed)
+
+        def report(generation, builds, result):
+            print(f"{difficulty} generation {generation + 1}: cleared {result.waves_cleared}/{MAX_WAVE} "
+                  f"waves, {result.lives} lives left, ${result.spent} spent")
+
+        best, result = optimizer.run(args.generations, report)
+        print(f"{difficulty} best layout ({optimizer.games_played} games): {format_layout(best)}")
+        if not result.won:
+            unbeaten.append(difficulty)
+
+    if unbeaten:
+        print(f"No winning layout found for: {', '.join(unbeaten)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,53 @@ import pygame
 import random
 import math
 from .constants import *
+from .render import prepare_stamp
+from .slotmap import SlotMap
+
+ALPHA_STEPS = 16  # Fade levels particle alpha is rounded to, so fading particles share stamps
+
+_dot_stamps = {}  # (rgba, radius) -> premultiplied soft dot, or None when too faint to draw
+
+
+def _render_dot(color, radius, alpha):
+    """Disc with an antialiased edge, alpha premultiplied for BLEND_PREMULTIPLIED"""
+    side = radius*2 + 1
+    surface = pygame.Surface((side, side), pygame.SRCALPHA)
+    for y in range(side):
+        for x in range(side):
+            coverage = radius + 0.5 - math.hypot(x - radius, y - radius)
+            if coverage > 0:
+                surface.set_at((x, y), (*color, int(alpha * min(1.0, coverage))))
+    return prepare_stamp(surface).premul_alpha()
+
+
+def _get_dot(rgba, radius):
+    step = (rgba[3] * ALPHA_STEPS + 127) // 255
+    if step <= 0 or radius < 1:
+        stamp = None
+    else:
+        key = (rgba[:3], radius, step)
+        stamp = _dot_stamps.get(key)
+        if stamp is None:
+            stamp = _dot_stamps[key] = _render_dot(rgba[:3], radius, step * 255 // ALPHA_STEPS)
+    # Every alpha in the step shares the stamp
+    _dot_stamps[rgba, radius] = stamp
+    return stamp
+
+
+def draw_particle(queue, x, y, rgba, radius):
+    """Queue a particle's stamp"""
+    stamp = _dot_stamps.get((rgba, radius), False)
+    if stamp is False:
+        stamp = _get_dot(rgba, radius)
+    if stamp is not None:
+        queue.add_blended("particles", stamp, (int(x) - radius, int(y) - radius))
+
 
 class Particle:
     def __init__(self, pos, color, velocity, lifetime, size=2, particle_type="snow"):
         self.pos = list(pos)
+        self.prev_pos = (self.pos[0], self.pos[1])  # Position before the last tick, for interpolation
         self.color = color
         self.velocity = velocity
         self.lifetime = lifetime
@@ -14,8 +57,11 @@ class Particle:
         self.wobble = random.uniform(0, math.pi * 2)  # Random phase for snowflake wobble
         self.particle_type = particle_type
         self.alpha = 255
+        self.handle = None  # In ParticleSystem.particles
+        self.appearance = self.get_color_and_size()  # Changes once per tick, drawn every frame
 
     def update(self):
+        self.prev_pos = (self.pos[0], self.pos[1])
         self.pos[0] += self.velocity[0]
         self.pos[1] += self.velocity[1]
 
@@ -34,35 +80,42 @@ class Particle:
             self.pos[1] += math.sin(angle) * radius * 0.1
 
         self.age += 1
+        self.appearance = self.get_color_and_size()
 
     def is_alive(self):
         return self.age < self.lifetime
 
-    def draw(self, screen):
+    def get_color_and_size(self):
+        """RGBA color and radius to draw with at the current age"""
         if self.particle_type == "freeze":
-            color = (*self.color, self.alpha)
-            pygame.draw.circle(screen, color,
-                            (int(self.pos[0]), int(self.pos[1])), int(self.size))
-        elif self.particle_type == "blizzard":
-            alpha = int(255 * (1 - self.age/self.lifetime))
-            color = (*self.color, alpha)
-            size = int(self.size * (1 - self.age/self.lifetime * 0.5))
-            pygame.draw.circle(screen, color,
-                            (int(self.pos[0]), int(self.pos[1])), size)
-        else:  # Regular snow
-            alpha = int(255 * (1 - self.age/self.lifetime))
-            color = (*self.color, alpha)
-            pygame.draw.circle(screen, color,
-                            (int(self.pos[0]), int(self.pos[1])), self.size)
+            return (*self.color, self.alpha), int(self.size)
+        fade = int(255 * (1 - self.age/self.lifetime))
+        if self.particle_type == "blizzard":
+            return (*self.color, fade), int(self.size * (1 - self.age/self.lifetime * 0.5))
+        return (*self.color, fade), self.size  # Regular snow
+
+    def draw(self, queue, alpha=1.0):
+        x = self.prev_pos[0] + (self.pos[0] - self.prev_pos[0]) * alpha
+        y = self.prev_pos[1] + (self.pos[1] - self.prev_pos[1]) * alpha
+        draw_particle(queue, x, y, *self.appearance)
 
 class ParticleSystem:
-    def __init__(self):
-        self.particles = []
+    def __init__(self, clock):
+        self.clock = clock
+        self.particles = SlotMap()
+        self.emission_rate = 1.0  # Chance a gameplay effect is emitted; lowered when fast-forwarding
+        self.density = 1.0  # Scale on power-up effect particles, from the quality level
+        self.hit_particles = 12  # Particles per hit effect, from the quality level
         self.active_effects = {}  # Tracks active power-up effects
 
+    def _add(self, particle):
+        particle.handle = self.particles.insert(particle)
+
     def create_hit_effect(self, pos):
+        if self.emission_rate < 1.0 and random.random() >= self.emission_rate:
+            return
         # Create snowball explosion effect
-        for _ in range(12):
+        for _ in range(self.hit_particles):
             angle = random.uniform(0, 2 * math.pi)
             speed = random.uniform(2, 4)
             velocity = (math.cos(angle) * speed,
@@ -70,7 +123,7 @@ class ParticleSystem:
             color = (255, 255, 255)
             lifetime = random.randint(15, 25)
             size = random.randint(2, 4)
-            self.particles.append(Particle(pos, color, velocity, lifetime, size))
+            self._add(Particle(pos, color, velocity, lifetime, size))
 
     def create_freeze_ray_effect(self, start_pos, target_pos):
         # Create freeze ray beam effect with more particles
@@ -80,7 +133,7 @@ class ParticleSystem:
         direction = (dx/distance, dy/distance)
 
         # Create more particles for a more dramatic effect
-        num_particles = int(distance * 1.5)  # Increased particle density
+        num_particles = int(distance * 1.5 * self.density)  # Increased particle density
         for i in range(num_particles):
             pos = [start_pos[0] + direction[0] * i * (distance/num_particles),
                   start_pos[1] + direction[1] * i * (distance/num_particles)]
@@ -95,22 +148,22 @@ class ParticleSystem:
             lifetime = random.randint(30, 40)  # Longer lifetime
             size = random.randint(4, 6)  # Larger particles
 
-            self.particles.append(
+            self._add(
                 Particle(pos, color, velocity, lifetime, size, "freeze"))
 
         # Add sparkle effects at the target
-        for _ in range(10):
+        for _ in range(int(10 * self.density)):
             angle = random.uniform(0, 2 * math.pi)
             radius = random.uniform(0, 15)
             sparkle_pos = [target_pos[0] + math.cos(angle) * radius,
                           target_pos[1] + math.sin(angle) * radius]
             velocity = (random.uniform(-0.5, 0.5), random.uniform(-0.5, 0.5))
-            self.particles.append(
+            self._add(
                 Particle(sparkle_pos, (255, 255, 255), velocity, 20, 2, "freeze"))
 
     def create_blizzard_effect(self, center_pos, radius):
         # Create swirling blizzard effect
-        for _ in range(50):  # Create multiple particles per frame
+        for _ in range(int(50 * self.emission_rate * self.density)):  # Create multiple particles per frame
             angle = random.uniform(0, 2 * math.pi)
             distance = random.uniform(0, radius)
             pos = [center_pos[0] + math.cos(angle) * distance,
@@ -123,24 +176,12 @@ class ParticleSystem:
             color = (200, 230, 255)  # Light blue for blizzard
             lifetime = random.randint(40, 60)
             size = random.randint(2, 4)
-            self.particles.append(
+            self._add(
                 Particle(pos, color, velocity, lifetime, size, "blizzard"))
 
-    def create_snow_effect(self):
-        if random.random() < 0.2:  # Increased snow density
-            x = random.randint(0, SCREEN_WIDTH)
-            velocity = (random.uniform(-0.5, 0.5), random.uniform(1, 2))
-            color = (255, 255, 255)
-            lifetime = random.randint(200, 300)
-            size = random.randint(1, 3)  # Varied snowflake sizes
-            self.particles.append(
-                Particle((x, -5), color, velocity, lifetime, size, "snow"))
-
     def update(self):
-        self.create_snow_effect()
-
         # Update active effects
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         for effect_type, effect_data in list(self.active_effects.items()):
             if current_time > effect_data["end_time"]:
                 del self.active_effects[effect_type]
@@ -152,17 +193,27 @@ class ParticleSystem:
                     POWERUP_PROPERTIES["BLIZZARD"]["radius"])
 
         # Update existing particles
-        for particle in self.particles[:]:
+        for particle in self.particles.sweep():
             particle.update()
             if not particle.is_alive():
-                self.particles.remove(particle)
+                self.particles.remove(particle.handle)
 
-    def draw(self, screen):
+    def draw(self, queue, alpha=1.0):
+        # Particle.draw inlined - there can be thousands of particles
+        add = queue.add_blended
+        stamps = _dot_stamps
         for particle in self.particles:
-            particle.draw(screen)
+            prev, pos = particle.prev_pos, particle.pos
+            stamp = stamps.get(particle.appearance, False)
+            if stamp is False:
+                stamp = _get_dot(*particle.appearance)
+            if stamp is not None:
+                radius = particle.appearance[1]
+                add("particles", stamp, (int(prev[0] + (pos[0] - prev[0]) * alpha) - radius,
+                                         int(prev[1] + (pos[1] - prev[1]) * alpha) - radius))
 
     def start_effect(self, effect_type, position):
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         properties = POWERUP_PROPERTIES[effect_type]
 
         self.active_effects[effect_type] = {
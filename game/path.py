@@ -1,6 +1,10 @@
 import pygame
+import math
+import bisect
 from .constants import *
 
+PATH_MARGIN = 20  # How far from the center line still counts as on the path
+
 class Path:
     def __init__(self):
         self.points = [
@@ -14,6 +18,24 @@ class Path:
             (SCREEN_WIDTH, SCREEN_HEIGHT//2)
         ]
 
+        # Arc-length tables so positions can be expressed as distance traveled
+        self.segment_lengths = []
+        self.cumulative_lengths = [0]
+        for i in range(len(self.points) - 1):
+            p1 = self.points[i]
+            p2 = self.points[i + 1]
+            length = math.hypot(p2[0] - p1[0], p2[1] - p1[1])
+            self.segment_lengths.append(length)
+            self.cumulative_lengths.append(self.cumulative_lengths[-1] + length)
+        self.total_length = self.cumulative_lengths[-1]
+
+        # Segments are axis-aligned, so the path is a union of rectangles
+        # (left, top, right, bottom), edges included
+        self.rects = []
+        for p1, p2 in zip(self.points, self.points[1:]):
+            self.rects.append((min(p1[0], p2[0]) - PATH_MARGIN, min(p1[1], p2[1]) - PATH_MARGIN,
+                               max(p1[0], p2[0]) + PATH_MARGIN, max(p1[1], p2[1]) + PATH_MARGIN))
+
         # Initialize path tile as a simple surface instead of loading sprite
         self.tile_sprite = pygame.Surface((TILE_SIZE, TILE_SIZE))
         self.tile_sprite.fill((220, 220, 240))  # Light gray color for path
@@ -21,20 +43,51 @@ class Path:
                         (0, 0, TILE_SIZE, TILE_SIZE), 2)  # Add border
 
     def is_on_path(self, pos):
-        for i in range(len(self.points) - 1):
+        for left, top, right, bottom in self.rects:
+            if left <= pos[0] <= right and top <= pos[1] <= bottom:
+                return True
+        return False
+
+    def get_position_at(self, distance):
+        """Return (segment_index, (x, y)) for a distance traveled along the path"""
+        distance = max(0, min(distance, self.total_length))
+        i = bisect.bisect_right(self.cumulative_lengths, distance) - 1
+        i = min(i, len(self.segment_lengths) - 1)
+        p1 = self.points[i]
+        p2 = self.points[i + 1]
+        t = (distance - self.cumulative_lengths[i]) / self.segment_lengths[i]
+        return i, (p1[0] + (p2[0] - p1[0]) * t, p1[1] + (p2[1] - p1[1]) * t)
+
+    def get_covered_intervals(self, center, radius):
+        """Return the stretches of path inside a circle.
+
+        Each entry is (start, end, closest) in distance traveled, one per
+        straight segment, where closest is the point of that piece nearest to
+        the center.  Pieces come back in path order.
+        """
+        pieces = []
+        for i, length in enumerate(self.segment_lengths):
             p1 = self.points[i]
             p2 = self.points[i + 1]
+            ux = (p2[0] - p1[0]) / length
+            uy = (p2[1] - p1[1]) / length
+            rx = center[0] - p1[0]
+            ry = center[1] - p1[1]
 
-            # Check if point is near path segment
-            if p1[0] == p2[0]:  # Vertical segment
-                if (min(p1[1], p2[1]) - 20 <= pos[1] <= max(p1[1], p2[1]) + 20
-                    and abs(pos[0] - p1[0]) <= 20):
-                    return True
-            else:  # Horizontal segment
-                if (min(p1[0], p2[0]) - 20 <= pos[0] <= max(p1[0], p2[0]) + 20
-                    and abs(pos[1] - p1[1]) <= 20):
-                    return True
-        return False
+            # Project the center onto the segment's line
+            along = rx * ux + ry * uy
+            off_sq = rx * rx + ry * ry - along * along
+            if off_sq > radius * radius:
+                continue
+            half = math.sqrt(radius * radius - off_sq)
+            start = max(0, along - half)
+            end = min(length, along + half)
+            if start > end:
+                continue
+            closest = max(start, min(end, along))
+            offset = self.cumulative_lengths[i]
+            pieces.append((offset + start, offset + end, offset + closest))
+        return pieces
 
     def draw(self, screen):
         try:
@@ -1,46 +1,167 @@
 import pygame
 import math
+import heapq
+import itertools
 from .constants import *
+from .render import get_circle, new_stamp, prepare_stamp
+from .slotmap import SlotMap
+
+# Speed, size and color for each projectile type
+PROJECTILE_STYLES = {
+    "snowball": (8, 6, (255, 255, 255)),  # Pure white
+    "ice_block": (6, 8, (180, 220, 255)),  # Light blue
+    "ice_shard": (12, 4, (150, 200, 255)),  # Crystal blue
+    "hope_beam": (15, 10, (255, 223, 0)),  # Golden yellow
+    "lightning_bolt": (20, 3, (65, 105, 225)),  # Royal blue
+    "mud_blob": (5, 8, (139, 69, 19)),  # Brown
+    "missile": (10, 8, (169, 169, 169)),  # Gray for missile
+}
+
+ROTATING_PROJECTILES = ("ice_shard", "lightning_bolt")
+ROTATION_STEPS = 64  # Angles each rotating projectile is pre-rendered at
+
+_next_uid = itertools.count(1)
+_stamp_table = {}  # (type, size, color) -> [stamp for each angle step], one stamp if it never rotates
+
+
+def _render_projectile(projectile_type, size, color):
+    """Stamp of a projectile that looks the same at any angle, centered at (size + 4, size + 4)"""
+    half = size + 4  # Room for the hope beam's glow
+    surface = new_stamp(half*2 + 1, half*2 + 1)
+    x, y = half, half
+    if projectile_type == "hope_beam":
+        # Draw golden beam with glow effect
+        pygame.draw.circle(surface, (255, 255, 200), (x, y), size + 4)
+        pygame.draw.circle(surface, color, (x, y), size)
+    elif projectile_type == "mud_blob":
+        # Draw brown blob with ripple effect
+        pygame.draw.circle(surface, color, (x, y), size)
+        pygame.draw.circle(surface, (101, 67, 33), (x, y), size - 2)
+    elif projectile_type == "ice_block":
+        # Draw square ice block with crystal pattern
+        pygame.draw.rect(surface, color, (x - size, y - size, size * 2, size * 2))
+        # Add crystal detail
+        pygame.draw.line(surface, (255, 255, 255), (x - size, y - size), (x + size, y + size), 1)
+    elif projectile_type == "snowball":
+        # Draw snowball with highlight
+        pygame.draw.circle(surface, color, (x, y), size)
+        # Add highlight effect
+        pygame.draw.circle(surface, (220, 220, 220), (x - 2, y - 2), size // 2)
+    else:
+        pygame.draw.circle(surface, color, (x, y), size)
+    return surface
+
+
+def _render_rotated_projectile(projectile_type, size, color, rotation):
+    """Stamp of a rotating projectile at one angle, centered in its square"""
+    if projectile_type == "lightning_bolt":
+        half = size * 4 + 2  # The bolt reaches four sizes out
+        surface = new_stamp(half*2 + 1, half*2 + 1)
+        # Draw zigzag lightning effect
+        points = [
+            (half, half),
+            (half + math.cos(rotation + 0.2) * size * 2,
+             half + math.sin(rotation + 0.2) * size * 2),
+            (half + math.cos(rotation) * size * 4,
+             half + math.sin(rotation) * size * 4)
+        ]
+        pygame.draw.lines(surface, color, False,
+                          [(int(x), int(y)) for x, y in points], 2)
+    else:
+        half = size + 1
+        surface = new_stamp(half*2 + 1, half*2 + 1)
+        # Draw rotating diamond-shaped ice shard
+        points = [
+            (half + math.cos(rotation) * size,
+             half + math.sin(rotation) * size),
+            (half - math.sin(rotation) * size,
+             half + math.cos(rotation) * size),
+            (half - math.cos(rotation) * size,
+             half - math.sin(rotation) * size),
+            (half + math.sin(rotation) * size,
+             half - math.cos(rotation) * size)
+        ]
+        pygame.draw.polygon(surface, color,
+                            [(int(x), int(y)) for x, y in points])
+    return surface
+
+
+def _render_stamps(projectile_type, size, color):
+    """Generator of a projectile's stamps, one per angle step if it rotates"""
+    if projectile_type in ROTATING_PROJECTILES:
+        for step in range(ROTATION_STEPS):
+            yield prepare_stamp(_render_rotated_projectile(projectile_type, size, color,
+                                                           step * 2 * math.pi / ROTATION_STEPS))
+    else:
+        yield prepare_stamp(_render_projectile(projectile_type, size, color))
+
+
+def _build_stamps(projectile_type, size, color):
+    stamps = _stamp_table[projectile_type, size, color] = list(
+        _render_stamps(projectile_type, size, color))
+    return stamps
+
+
+def warm_projectile_stamps():
+    """Generator rendering the stamps for every tower's projectile at every
+    level ahead of the first shot, a few stamps per step"""
+    for props in TOWER_PROPERTIES.values():
+        projectile_type = props["projectile_type"]
+        color = PROJECTILE_STYLES[projectile_type][2]
+        for size in props["projectile_size"]:
+            key = (projectile_type, size, color)
+            if key in _stamp_table:
+                continue
+            stamps = []
+            for stamp in _render_stamps(projectile_type, size, color):
+                stamps.append(stamp)
+                if len(stamps) % 16 == 0:
+                    yield
+            # A projectile drawn in the meantime may have built them already
+            _stamp_table.setdefault(key, stamps)
+            yield
+
+
+def draw_projectile(queue, projectile_type, x, y, size, color, rotation=0):
+    """Queue a projectile's blit"""
+    if not queue.quality.projectile_stamps:
+        radius = max(1, size // 2)
+        queue.add("projectiles", get_circle(color, radius), (int(x) - radius, int(y) - radius))
+        return
+    stamps = _stamp_table.get((projectile_type, size, color))
+    if stamps is None:
+        stamps = _build_stamps(projectile_type, size, color)
+    if len(stamps) > 1:
+        stamp = stamps[round(rotation * ROTATION_STEPS / (2 * math.pi)) % ROTATION_STEPS]
+    else:
+        stamp = stamps[0]
+    half = stamp.get_width() // 2
+    queue.add("projectiles", stamp, (int(x) - half, int(y) - half))
+
 
 class Projectile:
-    def __init__(self, start_pos, target_pos, damage, projectile_type="snowball"):
+    def __init__(self, start_pos, target_pos, damage, projectile_type="snowball", target=None, size=None):
+        self.uid = next(_next_uid)
         self.pos = list(start_pos)
+        self.prev_pos = tuple(start_pos)  # Position before the last tick, for interpolation
         self.target_pos = target_pos
         self.damage = damage
         self.active = True
         self.has_hit = False
         self.projectile_type = projectile_type
         self.rotation = 0  # For rotating projectiles
+        # Enemies are held by handle, which stops resolving once the enemy is removed
+        self.target = None  # Handle of the enemy this projectile is bound to (timed impact only)
+        self.impact_tick = None
+        self.flight_ticks = 0
+        self.intended_target = None  # Handle of the enemy whose pending damage this shot counts toward
+        if target is not None:
+            self.intended_target = target.handle
+        self.handle = None  # In ProjectileManager.projectiles
 
-        # Set properties based on projectile type
-        if projectile_type == "snowball":
-            self.speed = 8
-            self.size = 6
-            self.color = (255, 255, 255)  # Pure white
-        elif projectile_type == "ice_block":
-            self.speed = 6
-            self.size = 8
-            self.color = (180, 220, 255)  # Light blue
-        elif projectile_type == "ice_shard":
-            self.speed = 12
-            self.size = 4
-            self.color = (150, 200, 255)  # Crystal blue
-        elif projectile_type == "hope_beam":
-            self.speed = 15
-            self.size = 10
-            self.color = (255, 223, 0)  # Golden yellow
-        elif projectile_type == "lightning_bolt":
-            self.speed = 20
-            self.size = 3
-            self.color = (65, 105, 225)  # Royal blue
-        elif projectile_type == "mud_blob":
-            self.speed = 5
-            self.size = 8
-            self.color = (139, 69, 19)  # Brown
-        elif projectile_type == "missile":
-            self.speed = 10
-            self.size = 8
-            self.color = (169, 169, 169)  # Gray for missile
+        self.speed, self.size, self.color = PROJECTILE_STYLES[projectile_type]
+        if size is not None:
+            self.size = size  # Grows with the firing tower's level
 
         # Calculate direction
         dx = target_pos[0] - start_pos[0]
@@ -48,84 +169,70 @@ class Projectile:
         distance = math.sqrt(dx**2 + dy**2)
         self.dx = (dx / distance) * self.speed
         self.dy = (dy / distance) * self.speed
+        # Ticks until a free-flying shot counts as a miss (a little past its aim point)
+        self.flight_ticks = math.ceil(distance / self.speed) + 2
+
+        # Bind fast projectiles to their target and aim at the impact point
+        if target is not None and projectile_type in TIMED_IMPACT_PROJECTILES:
+            self._aim_at_impact(start_pos, target)
+            dx = self.target_pos[0] - start_pos[0]
+            dy = self.target_pos[1] - start_pos[1]
 
         # Calculate rotation angle for special projectiles
-        if self.projectile_type in ["ice_shard", "lightning_bolt"]:
+        if self.projectile_type in ROTATING_PROJECTILES:
             self.rotation = math.atan2(dy, dx)
 
+    def _aim_at_impact(self, start_pos, target):
+        """Solve when the projectile meets the target, assuming the target keeps its current speed.
+
+        The enemy is much slower than the projectile, so a few fixed-point
+        iterations of "time = distance to predicted position / speed" converge.
+        """
+        impact_pos = target.pos
+        ticks = 0
+        for _ in range(3):
+            distance = math.hypot(impact_pos[0] - start_pos[0], impact_pos[1] - start_pos[1])
+            ticks = max(1, math.ceil(distance / self.speed))
+            impact_pos = target.predict_position(ticks)
+
+        self.target = target.handle
+        self.target_pos = impact_pos
+        self.flight_ticks = ticks
+        # Arrive exactly on the impact tick
+        self.dx = (impact_pos[0] - start_pos[0]) / ticks
+        self.dy = (impact_pos[1] - start_pos[1]) / ticks
+
     def update(self):
+        self.prev_pos = (self.pos[0], self.pos[1])
+        if self.target is not None:
+            # Visual only - stop at the impact point and wait for the scheduled hit
+            if self.flight_ticks > 0:
+                self.pos[0] += self.dx
+                self.pos[1] += self.dy
+                self.flight_ticks -= 1
+            if self.projectile_type in ROTATING_PROJECTILES:
+                self.rotation += 0.2
+            return
+
         if self.active and not self.has_hit:
             self.pos[0] += self.dx
             self.pos[1] += self.dy
+            self.flight_ticks -= 1
 
             # Rotate certain projectiles
-            if self.projectile_type in ["ice_shard", "lightning_bolt"]:
+            if self.projectile_type in ROTATING_PROJECTILES:
                 self.rotation += 0.2  # Spin while moving
 
             # Deactivate if too far
             if abs(self.pos[0]) > SCREEN_WIDTH or abs(self.pos[1]) > SCREEN_HEIGHT:
                 self.active = False
 
-    def draw(self, screen):
+    def draw(self, queue, alpha=1.0):
         if self.active and not self.has_hit:
-            if self.projectile_type == "hope_beam":
-                # Draw golden beam with glow effect
-                pygame.draw.circle(screen, (255, 255, 200, 128),
-                                (int(self.pos[0]), int(self.pos[1])), self.size + 4)
-                pygame.draw.circle(screen, self.color,
-                                (int(self.pos[0]), int(self.pos[1])), self.size)
-            elif self.projectile_type == "lightning_bolt":
-                # Draw zigzag lightning effect
-                points = [
-                    (self.pos[0], self.pos[1]),
-                    (self.pos[0] + math.cos(self.rotation + 0.2) * self.size * 2,
-                     self.pos[1] + math.sin(self.rotation + 0.2) * self.size * 2),
-                    (self.pos[0] + math.cos(self.rotation) * self.size * 4,
-                     self.pos[1] + math.sin(self.rotation) * self.size * 4)
-                ]
-                pygame.draw.lines(screen, self.color, False,
-                               [(int(x), int(y)) for x, y in points], 2)
-            elif self.projectile_type == "mud_blob":
-                # Draw brown blob with ripple effect
-                pygame.draw.circle(screen, self.color,
-                                (int(self.pos[0]), int(self.pos[1])), self.size)
-                pygame.draw.circle(screen, (101, 67, 33),
-                                (int(self.pos[0]), int(self.pos[1])), self.size - 2)
-            else:
-                # Default projectile drawing (snowball, ice_block, ice_shard)
-                if self.projectile_type == "snowball":
-                    # Draw snowball with highlight
-                    pygame.draw.circle(screen, self.color,
-                                        (int(self.pos[0]), int(self.pos[1])), self.size)
-                    # Add highlight effect
-                    pygame.draw.circle(screen, (220, 220, 220),
-                                        (int(self.pos[0] - 2), int(self.pos[1] - 2)),
-                                        self.size // 2)
-                elif self.projectile_type == "ice_block":
-                    # Draw square ice block with crystal pattern
-                    pygame.draw.rect(screen, self.color,
-                                      (int(self.pos[0] - self.size),
-                                       int(self.pos[1] - self.size),
-                                       self.size * 2, self.size * 2))
-                    # Add crystal detail
-                    pygame.draw.line(screen, (255, 255, 255),
-                                      (int(self.pos[0] - self.size), int(self.pos[1] - self.size)),
-                                      (int(self.pos[0] + self.size), int(self.pos[1] + self.size)), 1)
-                elif self.projectile_type == "ice_shard":
-                    # Draw rotating diamond-shaped ice shard
-                    points = [
-                        (self.pos[0] + math.cos(self.rotation) * self.size,
-                         self.pos[1] + math.sin(self.rotation) * self.size),
-                        (self.pos[0] - math.sin(self.rotation) * self.size,
-                         self.pos[1] + math.cos(self.rotation) * self.size),
-                        (self.pos[0] - math.cos(self.rotation) * self.size,
-                         self.pos[1] - math.sin(self.rotation) * self.size),
-                        (self.pos[0] + math.sin(self.rotation) * self.size,
-                         self.pos[1] - math.cos(self.rotation) * self.size)
-                    ]
-                    pygame.draw.polygon(screen, self.color,
-                                        [(int(x), int(y)) for x, y in points])
-
+            # Interpolate between the last two ticks
+            x = self.prev_pos[0] + (self.pos[0] - self.prev_pos[0]) * alpha
+            y = self.prev_pos[1] + (self.pos[1] - self.prev_pos[1]) * alpha
+            draw_projectile(queue, self.projectile_type, x, y, self.size, self.color, self.rotation)
 
     def apply_effects(self, enemy):
         if self.projectile_type == "mud_blob":
@@ -136,7 +243,7 @@ class Projectile:
         return False
 
     def collides_with(self, enemy):
-        if not self.active or self.has_hit:
+        if not self.active or self.has_hit or self.target is not None:
             return False
 
         # Create collision rectangles
@@ -162,26 +269,70 @@ class Projectile:
 
 class ProjectileManager:
     def __init__(self):
-        self.projectiles = []
+        self.projectiles = SlotMap()
+        self.tick = 0
+        self.scheduled_hits = []  # Heap of (impact_tick, sequence, projectile)
+        self._hit_sequence = 0
+
+    def create_projectile(self, start_pos, target_pos, damage, projectile_type="snowball", target=None,
+                          size=None):
+        projectile = Projectile(start_pos, target_pos, damage, projectile_type, target, size)
+        projectile.handle = self.projectiles.insert(projectile)
+        if target is not None:
+            # Count the shot against its target until it lands or misses
+            target.pending_damage += damage
+        if projectile.target is not None:
+            projectile.impact_tick = self.tick + projectile.flight_ticks
+            heapq.heappush(self.scheduled_hits,
+                           (projectile.impact_tick, self._hit_sequence, projectile))
+            self._hit_sequence += 1
+        return projectile
+
+    def _resolve_scheduled_hits(self, enemies, events):
+        while self.scheduled_hits and self.scheduled_hits[0][0] <= self.tick:
+            _, _, projectile = heapq.heappop(self.scheduled_hits)
+            enemy = enemies.get(projectile.target)
+            projectile.active = False
+            projectile.has_hit = True
+            self._release_pending(projectile, enemies)
+            if enemy is not None and not enemy.reached_end:
+                events.hits.append((enemy, projectile))
+
+    def _release_pending(self, projectile, enemies):
+        """Take a resolved or missed shot off its target's pending damage"""
+        enemy = enemies.get(projectile.intended_target)
+        if enemy is not None:
+            enemy.pending_damage = max(0, enemy.pending_damage - projectile.damage)
+        projectile.intended_target = None
 
-    def create_projectile(self, start_pos, target_pos, damage, projectile_type="snowball"):
-        self.projectiles.append(Projectile(start_pos, target_pos, damage, projectile_type))
+    def update(self, enemies, events):
+        """Move projectiles and report hits to events, a TickEvents.  enemies is
+        the EnemyManager's SlotMap.  Damage is left for the Simulation to resolve."""
+        self.tick += 1
 
-    def update(self, enemies):
-        for projectile in self.projectiles[:]:
+        for projectile in self.projectiles.sweep():
             projectile.update()
 
             if not projectile.active or projectile.has_hit:
-                self.projectiles.remove(projectile)
+                self._release_pending(projectile, enemies)
+                self.projectiles.remove(projectile.handle)
                 continue
 
+            if projectile.target is not None:
+                continue  # Resolved on its impact tick
+
+            if projectile.flight_ticks <= 0:
+                # Flew past where it was aimed - stop counting it against the target
+                self._release_pending(projectile, enemies)
+
             for enemy in enemies:
                 if projectile.collides_with(enemy):
-                    enemy.take_damage(projectile.damage)
-                    projectile.apply_effects(enemy)  # Apply any special effects
-                    print(f"Hit confirmed! Damage: {projectile.damage}")
+                    self._release_pending(projectile, enemies)
+                    events.hits.append((enemy, projectile))
                     break
 
-    def draw(self, screen):
+        self._resolve_scheduled_hits(enemies, events)
+
+    def draw(self, queue, alpha=1.0):
         for projectile in self.projectiles:
-            projectile.draw(screen)
\ No newline at end of file
+            projectile.draw(queue, alpha)
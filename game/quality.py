@@ -0,0 +1,83 @@
+"""Drawing quality that adapts to how fast the machine is.
+
+The governor watches how long frames take to make.  While they run over
+the frame budget it steps down through QUALITY_LEVELS, and when there is
+headroom it steps back up.  Stepping up takes a longer run of fast frames
+than stepping down takes slow ones, and a step up that is straight away
+too slow makes the next try wait twice as long, so the level settles
+rather than flapping between two.
+"""
+from collections import namedtuple
+
+QualityLevel = namedtuple("QualityLevel", [
+    "particle_density",  # Scale on power-up effect and ambient snow particles
+    "hit_particles",  # Particles in each hit effect
+    "projectile_stamps",  # Full projectile stamps, or plain dots
+    "sprites",  # Tower and enemy sprites, or their fallback shapes
+    "health_bars"])
+
+# Best first.  Cosmetic effects go before anything that helps the player.
+QUALITY_LEVELS = (
+    QualityLevel(1.0, 12, True, True, True),
+    QualityLevel(0.5, 8, True, True, True),
+    QualityLevel(0.25, 4, True, True, True),
+    QualityLevel(0.25, 4, False, True, True),
+    QualityLevel(0.0, 0, False, True, True),
+    QualityLevel(0.0, 0, False, False, True),
+    QualityLevel(0.0, 0, False, False, False),
+)
+FULL_QUALITY = QUALITY_LEVELS[0]
+
+FRAME_BUDGET = 1 / 60  # Seconds of work per frame, not counting the wait for the frame cap
+QUALITY_WINDOW = 30  # Frames per decision; the median is used, so one hitch does not count
+DOWNGRADE_LOAD = 1.0  # Step down after a window over this share of the budget
+UPGRADE_LOAD = 0.6  # Step up after UPGRADE_WINDOWS windows in a row under this share
+UPGRADE_WINDOWS = 4
+MAX_UPGRADE_WINDOWS = 64
+
+
+class QualityGovernor:
+    def __init__(self, budget=FRAME_BUDGET):
+        self.budget = budget
+        self.index = 0  # Into QUALITY_LEVELS
+        self.frame_times = []
+        self.quiet_windows = 0  # Windows in a row with headroom
+        self.upgrade_windows = UPGRADE_WINDOWS  # Quiet windows needed to step up
+        self.just_upgraded = False
+
+    @property
+    def level(self):
+        return QUALITY_LEVELS[self.index]
+
+    def record(self, frame_seconds):
+        """Add the time one frame took to make.  Returns True if the level changed."""
+        self.frame_times.append(frame_seconds)
+        if len(self.frame_times) < QUALITY_WINDOW:
+            return False
+        self.frame_times.sort()
+        load = self.frame_times[len(self.frame_times) // 2] / self.budget
+        self.frame_times.clear()
+        just_upgraded, self.just_upgraded = self.just_upgraded, False
+
+        if load > DOWNGRADE_LOAD:
+            self.quiet_windows = 0
+            if just_upgraded:
+                # The level just tried is too slow - wait longer before trying it again
+                self.upgrade_windows = min(MAX_UPGRADE_WINDOWS, self.upgrade_windows * 2)
+            if self.index < len(QUALITY_LEVELS) - 1:
+                self.index += 1
+                print(f"Frames over budget ({load:.0%}) - quality lowered to level {self.index}")
+                return True
+        elif load < UPGRADE_LOAD:
+            self.quiet_windows += 1
+            if self.index > 0 and self.quiet_windows >= self.upgrade_windows:
+                self.index -= 1
+                self.quiet_windows = 0
+                self.just_upgraded = True
+                print(f"Frames have headroom ({load:.0%}) - quality raised to level {self.index}")
+                return True
+        else:
+            self.quiet_windows = 0
+        if just_upgraded:
+            self.upgrade_windows = UPGRADE_WINDOWS  # The step up held
+        return False
@@ -191,6 +191,14 @@ class MathQuiz:
 
         return False
 
+    def update(self):
+        """Move on from the result screen once it has been shown for 1.5 seconds"""
+        if self.show_result and pygame.time.get_ticks() - self.result_timer >= 1500:
+            self.show_result = False
+            # If more questions remain, generate the next one
+            if not self.quiz_complete:
+                self.generate_next_question()
+
     def draw(self, screen):
         if not (self.active or self.show_result):
             return
@@ -231,34 +239,27 @@ class MathQuiz:
             screen.blit(instructions, inst_rect)
 
         elif self.show_result:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.result_timer < 1500:  # Show result for 1.5 seconds
-                if self.correct_answer:
-                    result_text = self.font.render("Correct!", True, (50, 255, 50))
-                else:
-                    # Display answer in appropriate format
-                    if self.quiz_type == "BRYCE" and self.answer_fraction:
-                        ans_num, ans_den = self.answer_fraction
-                        if ans_den == 1:
-                            answer_display = str(ans_num)
-                        else:
-                            answer_display = f"{ans_num}/{ans_den}"
-                    else:
-                        answer_display = str(int(self.answer)) if self.answer == int(self.answer) else str(self.answer)
-                    result_text = self.font.render(f"Incorrect! The answer was {answer_display}", True, (255, 50, 50))
-                result_rect = result_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-                screen.blit(result_text, result_rect)
-
-                # Show final summary if quiz is complete
-                if self.quiz_complete:
-                    summary_text = self.small_font.render(f"Quiz Complete: {self.correct_count}/{self.total_questions} correct!", True, (255, 255, 100))
-                    summary_rect = summary_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 50))
-                    screen.blit(summary_text, summary_rect)
+            if self.correct_answer:
+                result_text = self.font.render("Correct!", True, (50, 255, 50))
             else:
-                self.show_result = False
-                # If more questions remain, generate the next one
-                if not self.quiz_complete:
-                    self.generate_next_question()
+                # Display answer in appropriate format
+                if self.quiz_type == "BRYCE" and self.answer_fraction:
+                    ans_num, ans_den = self.answer_fraction
+                    if ans_den == 1:
+                        answer_display = str(ans_num)
+                    else:
+                        answer_display = f"{ans_num}/{ans_den}"
+                else:
+                    answer_display = str(int(self.answer)) if self.answer == int(self.answer) else str(self.answer)
+                result_text = self.font.render(f"Incorrect! The answer was {answer_display}", True, (255, 50, 50))
+            result_rect = result_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+            screen.blit(result_text, result_rect)
+
+            # Show final summary if quiz is complete
+            if self.quiz_complete:
+                summary_text = self.small_font.render(f"Quiz Complete: {self.correct_count}/{self.total_questions} correct!", True, (255, 255, 100))
+                summary_rect = summary_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 50))
+                screen.blit(summary_text, summary_rect)
 
     def is_active(self):
         return self.active or self.show_result
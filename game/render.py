@@ -0,0 +1,117 @@
+"""Batched drawing.
+
+Entities do not draw to the screen themselves: they queue blits into a
+RenderQueue by layer, and each layer goes to the screen in one
+Surface.blits call.  Shapes that used to be drawn with pygame.draw every
+frame - health bars, status rings, fallback sprites, labels - are rendered
+once into cached stamps, so every entity becomes a few queued blits.
+
+The draw_* function in each entity module takes plain values rather than
+the entity, so the live game and snapshot renderers - threaded mode, the
+spectator stream - queue the same blits from the same code.
+"""
+import pygame
+from .constants import *
+from .quality import FULL_QUALITY
+
+# Drawn bottom to top
+LAYERS = ("glows", "towers", "ranges", "enemies", "health_bars", "status", "projectiles", "labels",
+          "particles")
+BLENDED_LAYERS = ("particles",)  # Composited in the order queued, so never regrouped
+
+STAMP_COLORKEY = (255, 0, 255)  # Never used by a shape
+
+_stamps = {}  # key -> Surface
+_fonts = {}  # size -> Font
+
+
+def _surface_key(blit):
+    return id(blit[0])
+
+
+class RenderQueue:
+    """Blits collected for one frame, drawn layer by layer with Surface.blits"""
+
+    def __init__(self, quality=FULL_QUALITY):
+        self.layers = {layer: [] for layer in LAYERS}
+        self.quality = quality  # QualityLevel the draw functions follow
+
+    def add(self, layer, surface, pos):
+        self.layers[layer].append((surface, pos))
+
+    def add_centered(self, layer, surface, x, y):
+        self.layers[layer].append((surface, (x - surface.get_width()//2,
+                                             y - surface.get_height()//2)))
+
+    def add_blended(self, layer, surface, pos):
+        """Queue a stamp with premultiplied alpha, composited over what is already drawn"""
+        self.layers[layer].append((surface, pos, None, pygame.BLEND_PREMULTIPLIED))
+
+    def flush(self, screen):
+        for layer in LAYERS:
+            blits = self.layers[layer]
+            if blits:
+                if layer not in BLENDED_LAYERS:
+                    # Group copies of the same surface.  The sort is stable, so
+                    # copies of one stamp keep their order.
+                    blits.sort(key=_surface_key)
+                screen.blits(blits, doreturn=False)
+                blits.clear()
+
+
+def get_stamp(key, render):
+    """The surface cached under key, made by render() the first time it is asked for"""
+    stamp = _stamps.get(key)
+    if stamp is None:
+        stamp = _stamps[key] = prepare_stamp(render())
+    return stamp
+
+
+def prepare_stamp(surface):
+    """Match the display's pixel format, if there is a display, so blits skip conversion"""
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+def new_stamp(width, height):
+    """Blank stamp for hard-edged shapes.  Transparency is a color key rather
+    than per-pixel alpha, which blits several times faster."""
+    surface = pygame.Surface((width, height))
+    surface.fill(STAMP_COLORKEY)
+    surface.set_colorkey(STAMP_COLORKEY, pygame.RLEACCEL)
+    return surface
+
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+
+def get_text(text, size, color):
+    return get_stamp(("text", text, size, color), lambda: get_font(size).render(text, True, color))
+
+
+def get_circle(color, radius, width=0):
+    """Circle centered in a (2 * radius + 1) square, as pygame.draw.circle would draw it"""
+    def render():
+        surface = new_stamp(radius*2 + 1, radius*2 + 1)
+        pygame.draw.circle(surface, color, (radius, radius), radius, width)
+        return surface
+    return get_stamp(("circle", color, radius, width), render)
+
+
+def get_health_bar(fraction):
+    """30x4 bar, green for the health left over red"""
+    width = max(0, min(30, int(30 * fraction)))
+
+    def render():
+        surface = pygame.Surface((30, 4))
+        surface.fill((255, 0, 0))
+        surface.fill((0, 255, 0), (0, 0, width, 4))
+        return surface
+    return get_stamp(("health_bar", width), render)
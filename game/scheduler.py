@@ -0,0 +1,87 @@
+"""Deferred work spread across frames.
+
+Work that need not finish this frame - warming caches, repainting overlays
+- is written as a generator that yields between small pieces.  The game
+steps these tasks after update() and before draw(), stopping once the
+frame's budget is spent, so a heavy job is spread over several frames
+instead of dropping one.
+
+The most urgent task runs first.  A task that is passed over ages, moving
+up the order a level every AGING_FRAMES frames, so low priority work still
+finishes while more urgent work keeps arriving.
+
+Only simulation-independent work belongs here: anything that changes the
+game has to happen on its tick, the same way on every machine.
+"""
+import time
+
+SCHEDULER_BUDGET = 0.002  # Seconds of deferred work per frame
+AGING_FRAMES = 30  # Frames a waiting task takes to climb one priority level
+
+# Most urgent first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class Task:
+    def __init__(self, steps, priority, key):
+        self.steps = steps  # Generator doing the work
+        self.priority = priority
+        self.key = key
+        self.waited = 0  # Frames since it last ran
+
+    def get_urgency(self):
+        """Lower runs sooner"""
+        return self.priority - self.waited / AGING_FRAMES
+
+
+class Scheduler:
+    def __init__(self, budget=SCHEDULER_BUDGET):
+        self.budget = budget
+        self.tasks = []
+        self.keyed = {}  # key -> queued Task, for work that should only be queued once
+
+    def add(self, steps, priority=PRIORITY_NORMAL, key=None):
+        """Queue a generator.  If a task with the same key is still queued, it is
+        kept and steps is dropped."""
+        if key is not None and key in self.keyed:
+            steps.close()
+            return self.keyed[key]
+        task = Task(steps, priority, key)
+        self.tasks.append(task)
+        if key is not None:
+            self.keyed[key] = task
+        return task
+
+    def is_queued(self, key):
+        """Whether a task with this key is waiting, so callers can skip building another"""
+        return key in self.keyed
+
+    def _finish(self, task):
+        self.tasks.remove(task)
+        if task.key is not None:
+            del self.keyed[task.key]
+
+    def run(self):
+        """Step tasks until the frame's budget is spent.  Returns how many steps ran."""
+        if not self.tasks:
+            return 0
+        deadline = time.perf_counter() + self.budget
+        for task in self.tasks:
+            task.waited += 1
+        steps = 0
+        while self.tasks:
+            task = min(self.tasks, key=Task.get_urgency)
+            task.waited = 0
+            try:
+                next(task.steps)
+            except StopIteration:
+                self._finish(task)
+            except Exception as e:
+                print(f"Deferred task failed: {e}")
+                self._finish(task)
+            steps += 1
+            if time.perf_counter() >= deadline:
+                break
+        return steps
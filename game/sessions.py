@@ -0,0 +1,349 @@
+"""Host many independent headless games in one process.
+
+Every player who connects gets their own Simulation on the host; all of
+them are stepped by one asyncio loop.  Players send commands in the co-op
+wire format and get state back in the spectator stream format, so the
+player's machine only decodes and draws.  The path geometry, the constants
+tables and (for players) the sprite cache are shared, not copied.
+
+    python -m game.sessions host 0.0.0.0:5560
+    python -m game.sessions play 192.168.1.10:5560 --difficulty HARD
+    python -m game.sessions host unix:/tmp/wtd-host.sock --idle 40   # load test
+
+The host prints CPU time per tick and memory for each session every
+REPORT_INTERVAL seconds.
+"""
+import gc
+import os
+import math
+import sys
+import time
+import types
+import asyncio
+import argparse
+import itertools
+import contextlib
+import pygame
+from . import constants
+from .constants import *
+from .clock import SimClock
+from .path import Path
+from .simulation import Simulation
+from .snapshot import draw_snapshot, get_alpha
+from .stream import StateEncoder, StateDecoder, KEYFRAME_INTERVAL, MAX_CLIENT_BACKLOG
+from .net import make_socket
+from .lockstep import HELLO, COMMANDS_BY_CODE, DIFFICULTIES, encode_command, decode_command
+from .ui import UI
+
+STATE_INTERVAL = 2  # Ticks between state messages to a player (30 per second)
+SLICE_SIZE = 8  # Sessions stepped between chances for the event loop to do I/O
+REPORT_INTERVAL = 10.0
+
+# Commands a remote player may send.  The quiz bonus is not one of them -
+# quizzes are answered on the player's machine, so the host cannot check it.
+PLAYER_COMMANDS = ("place", "upgrade", "target", "powerup", "treasure")
+
+# Never counted towards a session's memory
+SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def _walk(roots, seen):
+    """Yield every object reachable from roots that is not already in seen"""
+    todo = list(roots)
+    while todo:
+        obj = todo.pop()
+        if id(obj) in seen or isinstance(obj, SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        yield obj
+        todo.extend(gc.get_referents(obj))
+
+
+class Session:
+    """One player's game on the host"""
+
+    def __init__(self, session_id, difficulty, seed, path):
+        self.id = session_id
+        self.sim = Simulation(difficulty, seed, path)
+        self.sim.particles_enabled = False  # Nobody sees them
+        self.commands = []  # Received since the last tick
+        self.writer = None  # asyncio stream to the player; None for idle sessions
+        self.encoder = StateEncoder()
+        self.last_keyframe = None
+        self.started_at = time.perf_counter()
+        self.cpu_seconds = 0.0
+        self.finished = False
+
+    def step(self):
+        start = time.thread_time()
+        sim = self.sim
+        for command in self.commands:
+            sim.apply_command(command)
+        self.commands.clear()
+        sim.step()
+        if sim.is_lost() or (sim.enemy_manager.wave_complete and sim.current_wave >= MAX_WAVE):
+            self.finished = True
+        if self.writer and (self.finished or sim.clock.tick % STATE_INTERVAL == 0):
+            self._send_state()
+        self.cpu_seconds += time.thread_time() - start
+
+    def _send_state(self):
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG:
+            # Player is not keeping up - skip, and resync with a keyframe once drained
+            self.last_keyframe = None
+            return
+        tick = self.sim.clock.tick
+        keyframe = self.last_keyframe is None or tick - self.last_keyframe >= KEYFRAME_INTERVAL
+        if keyframe:
+            self.last_keyframe = tick
+        self.writer.write(self.encoder.encode(self.sim, keyframe))
+
+    def get_memory(self, shared):
+        """Bytes reachable from this session's simulation, not counting shared objects"""
+        return sum(sys.getsizeof(obj) for obj in _walk([self.sim], set(shared)))
+
+
+class SessionHost:
+    """Steps every session once per tick on one asyncio loop.
+
+    Sessions are stepped in slices of SLICE_SIZE with a yield to the event
+    loop in between, so input and state keep flowing during a heavy tick.
+    The order rotates each tick so no session is always last.  When the host
+    falls behind, the backlog is dropped and every session slows down
+    together rather than some starving.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.path = Path()
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.ticks = 0
+        self.dropped_ticks = 0
+        self.tick_seconds = 0.0  # Wall time spent stepping since the last report
+        self.devnull = open(os.devnull, "w")
+
+        # Objects every session shares - never counted as any one session's memory
+        constant_tables = [value for name, value in vars(constants).items() if name.isupper()]
+        self.shared = set()
+        for _ in _walk([self.path, constant_tables], self.shared):
+            pass
+
+    def add_session(self, difficulty="NORMAL", seed=None):
+        session = Session(next(self.session_ids), difficulty, seed, self.path)
+        self.sessions[session.id] = session
+        print(f"Session {session.id} started on {difficulty} ({len(self.sessions)} running)")
+        return session
+
+    def remove_session(self, session):
+        if self.sessions.pop(session.id, None):
+            print(f"Session {session.id} ended on wave {session.sim.current_wave} "
+                  f"({len(self.sessions)} running)")
+        if session.writer:
+            session.writer.close()
+
+    async def handle_player(self, reader, writer):
+        """A player's connection: hello with difficulty and seed, then commands"""
+        session = None
+        try:
+            _, difficulty, seed = HELLO.unpack(await reader.readexactly(HELLO.size))
+            session = self.add_session(DIFFICULTIES[difficulty], seed)
+            session.writer = writer
+            while not session.finished:
+                code = await reader.readexactly(1)
+                if code[0] not in COMMANDS_BY_CODE:
+                    break  # Not speaking the protocol
+                _, fmt, _ = COMMANDS_BY_CODE[code[0]]
+                command, _ = decode_command(code + await reader.readexactly(fmt.size), 0)
+                if command[0] in PLAYER_COMMANDS:
+                    session.commands.append(command)
+        except (asyncio.IncompleteReadError, ConnectionError, IndexError, ValueError):
+            pass  # Disconnected, or sent something that is not a command
+        finally:
+            if session:
+                self.remove_session(session)
+            else:
+                writer.close()
+
+    async def tick(self):
+        start = time.perf_counter()
+        sessions = list(self.sessions.values())
+        if sessions:
+            first = self.ticks % len(sessions)
+            sessions = sessions[first:] + sessions[:first]
+        for i in range(0, len(sessions), SLICE_SIZE):
+            failures = []
+            with contextlib.redirect_stdout(self.devnull):
+                for session in sessions[i:i + SLICE_SIZE]:
+                    try:
+                        session.step()
+                    except Exception as e:
+                        # End this game only - the rest of the host carries on
+                        session.finished = True
+                        failures.append((session, e))
+            for session, e in failures:
+                print(f"Session {session.id} failed: {e}")
+            self.tick_seconds += time.perf_counter() - start
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+        for session in sessions:
+            if session.finished:
+                self.remove_session(session)
+        self.ticks += 1
+
+    async def tick_loop(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            steps = 0
+            while loop.time() >= next_tick and steps < MAX_SUBSTEPS:
+                await self.tick()
+                next_tick += SIM_STEP
+                steps += 1
+            if loop.time() >= next_tick + SIM_STEP:
+                self.dropped_ticks += int((loop.time() - next_tick) / SIM_STEP)
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def get_stats(self):
+        """(session id, difficulty, wave, CPU ms per tick, memory bytes) for each session"""
+        stats = []
+        for session in self.sessions.values():
+            ticks = max(1, session.sim.clock.tick)
+            stats.append((session.id, session.sim.difficulty, session.sim.current_wave,
+                          session.cpu_seconds / ticks * 1000, session.get_memory(self.shared)))
+        return stats
+
+    async def report_loop(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            busy = self.tick_seconds / REPORT_INTERVAL
+            self.tick_seconds = 0.0
+            print(f"{len(self.sessions)} sessions, {busy:.0%} of the host busy stepping, "
+                  f"{self.dropped_ticks} ticks dropped")
+            for session_id, difficulty, wave, cpu_ms, memory in self.get_stats():
+                print(f"  session {session_id} {difficulty} wave {wave}: "
+                      f"{cpu_ms:.3f} ms CPU/tick, {memory / 1024:.0f} KiB")
+
+    async def serve(self):
+        if self.address.startswith("unix:"):
+            path = self.address[len("unix:"):]
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self.handle_player, path)
+        else:
+            host, port = self.address.rsplit(":", 1)
+            server = await asyncio.start_server(self.handle_player, host or "127.0.0.1", int(port))
+        print(f"Hosting sessions at {self.address}")
+        async with server:
+            await asyncio.gather(self.tick_loop(), self.report_loop())
+
+
+def play(address, difficulty="NORMAL", seed=None):
+    """Play a session on a host: input goes up as commands, state comes back down"""
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "little")
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Winter Tower Defense")
+    sock, connect_address = make_socket(address)
+    sock.connect(connect_address)
+    sock.sendall(HELLO.pack(ord("H"), DIFFICULTIES.index(difficulty), seed))
+    sock.setblocking(False)
+
+    path = Path()
+    ui = UI(SimClock())
+    decoder = StateDecoder()
+    outgoing = bytearray()
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        ui.clock.tick = decoder.tick  # Power-up cooldowns follow the host's clock
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
+                outgoing += encode_command(("treasure",))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                command = _get_click_command(ui, decoder, event.pos)
+                if command:
+                    outgoing += encode_command(command)
+
+        try:
+            if outgoing:
+                del outgoing[:sock.send(outgoing)]
+            data = sock.recv(65536)
+            if not data:
+                print("Host ended the session")
+                running = False
+            decoder.feed(data)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            print(f"Lost the connection to the host: {e}")
+            running = False
+
+        try:
+            screen.fill(BACKGROUND_COLOR)
+            path.draw(screen)
+            snapshot = decoder.to_snapshot()
+            draw_snapshot(screen, snapshot, get_alpha(snapshot, time.perf_counter()))
+            score, money, lives, wave = decoder.hud
+            ui.draw(screen, score, money, lives, wave, quiz_type=None)
+            pygame.display.flip()
+        except pygame.error as e:
+            print(f"Drawing error: {e}")
+        clock.tick(FPS)
+    sock.close()
+    pygame.quit()
+
+
+def _get_click_command(ui, decoder, pos):
+    """The command a click stands for, judged from the last state received"""
+    powerup_type = ui.is_powerup_button_clicked(pos)
+    if powerup_type:
+        if decoder.hud[1] < POWERUP_COSTS[powerup_type]:
+            return None
+        ui.start_powerup_cooldown(powerup_type)
+        return ("powerup", powerup_type, *pos)
+    for tower_type, tower_pos, *_ in decoder.to_snapshot().towers:
+        if math.hypot(tower_pos[0] - pos[0], tower_pos[1] - pos[1]) <= TOWER_CLICK_RADIUS:
+            return ("upgrade", round(tower_pos[0]), round(tower_pos[1]))
+    if ui.is_tower_button_clicked(pos):
+        return None
+    return ("place", *pos, ui.get_selected_tower())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host or play games on a multi-session host")
+    commands = parser.add_subparsers(dest="command", required=True)
+    host_parser = commands.add_parser("host", help="run the host")
+    host_parser.add_argument("address", help="unix:/path/to/socket or host:port")
+    host_parser.add_argument("--idle", type=int, default=0,
+                             help="also run this many sessions with no player, for load testing")
+    play_parser = commands.add_parser("play", help="play a session on a host")
+    play_parser.add_argument("address", help="unix:/path/to/socket or host:port")
+    play_parser.add_argument("--difficulty", default="NORMAL", choices=DIFFICULTIES)
+    play_parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "play":
+        play(args.address, args.difficulty, args.seed)
+        return 0
+
+    host = SessionHost(args.address)
+    for i in range(args.idle):
+        host.add_session(DIFFICULTIES[i % len(DIFFICULTIES)], seed=i)
+    try:
+        asyncio.run(host.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
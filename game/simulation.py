@@ -0,0 +1,270 @@
+import os
+import zlib
+import random
+import struct
+import contextlib
+from .constants import *
+from .clock import SimClock
+from .path import Path
+from .tower import TowerManager
+from .enemy import EnemyManager, Enemy
+from .projectile import ProjectileManager
+from .particle import ParticleSystem
+from .events import TickEvents
+
+
+class Simulation:
+    """Game state and rules for one match, with no drawing or input handling.
+
+    Game wraps one of these for normal play.  With particles disabled it can
+    also be stepped headless, as fast as the CPU allows.  Give a seed to
+    get the same enemies every run.  Path is read-only, so simulations in
+    one process may share a single instance.
+    """
+
+    def __init__(self, difficulty="NORMAL", seed=None, path=None):
+        self.difficulty = difficulty
+        self.seed = seed
+        self.rng = random.Random(seed)
+        settings = DIFFICULTY_SETTINGS[difficulty]
+
+        self.clock = SimClock()  # Fixed-step simulation time shared by all components
+        self.path = path if path is not None else Path()
+        self.projectile_manager = ProjectileManager()
+        self.tower_manager = TowerManager(self.path, self.projectile_manager, self.clock)
+        self.enemy_manager = EnemyManager(self.path, difficulty, self.clock, self.rng)
+        self.particle_system = ParticleSystem(self.clock)
+        self.events = TickEvents()  # What happened this tick, resolved at its end
+        self.particles_enabled = True
+        self.particle_ticks = 0.0  # Fraction of a particle step owed
+        self.particle_step = 1.0  # Particle steps per tick; below 1 when fast-forwarding
+
+        self.money = settings["starting_money"]
+        self.lives = settings["starting_lives"]
+        self.score = 0
+        self.current_wave = 1
+
+        # Running totals, used for wave summaries
+        self.kills = 0
+        self.leaks = 0
+        self.money_earned = 0
+        self.damage_dealt = 0
+
+    def is_lost(self):
+        return self.lives <= 0
+
+    def is_won(self):
+        return self.current_wave > MAX_WAVE
+
+    def set_speed(self, game_speed):
+        """Fewer cosmetic particles the faster the game runs"""
+        self.particle_step = 1 / game_speed
+        self.particle_system.emission_rate = 1 / game_speed
+
+    def place_tower(self, pos, tower_type):
+        if self.money < TOWER_COSTS[tower_type]:
+            return False
+        if not self.tower_manager.place_tower(pos, tower_type):
+            print("Cannot place tower here")
+            return False
+        self.money -= TOWER_COSTS[tower_type]
+        print(f"Tower placed at {pos}")
+        return True
+
+    def upgrade_tower(self, tower):
+        if not tower.can_upgrade():
+            return False
+        upgrade_cost = tower.get_upgrade_cost()
+        if self.money < upgrade_cost:
+            print(f"Not enough money for upgrade (need ${upgrade_cost})")
+            return False
+        if not self.tower_manager.upgrade_tower(tower):
+            return False
+        self.money -= upgrade_cost
+        print(f"Upgraded {tower.type} to level {tower.level + 1}")
+        return True
+
+    def spawn_treasure_chest(self):
+        # Remove cooldown check, spawn immediately when T is pressed
+        difficulty_multipliers = {
+            "health": self.enemy_manager.difficulty_settings["enemy_health_multiplier"],
+            "speed": self.enemy_manager.difficulty_settings["enemy_speed_multiplier"]
+        }
+        enemy = Enemy(self.path, "TREASURE", difficulty_multipliers, self.clock)
+        self.enemy_manager.add_enemy(enemy)
+        print("Spawned a treasure chest!")
+        return True
+
+    def activate_powerup(self, powerup_type, pos):
+        """Apply a power-up.  Returns True if it affected anything and was paid for."""
+        affected_count = 0
+        if powerup_type == "FREEZE_RAY":
+            # Apply freeze to all enemies on screen
+            for enemy in self.enemy_manager.enemies:
+                # Create freeze effect from the power-up button to each enemy
+                if self.particles_enabled:
+                    self.particle_system.create_freeze_ray_effect(
+                        (SCREEN_WIDTH - 60, 50), enemy.pos)
+                enemy.apply_freeze(POWERUP_PROPERTIES["FREEZE_RAY"]["freeze_time"])
+                affected_count += 1
+
+            if affected_count > 0:
+                print(f"Freeze Ray activated, freezing {affected_count} enemies")
+
+        elif powerup_type == "BLIZZARD":
+            # Apply blizzard effect to all enemies in range
+            if self.particles_enabled:
+                self.particle_system.start_effect("BLIZZARD", pos)
+            blizzard_radius = POWERUP_PROPERTIES["BLIZZARD"]["radius"]
+            slow_factor = POWERUP_PROPERTIES["BLIZZARD"]["slow_factor"]
+            duration = POWERUP_PROPERTIES["BLIZZARD"]["duration"]
+
+            for enemy in self.enemy_manager.get_enemies_near(pos, blizzard_radius):
+                enemy.apply_slow(duration, slow_factor)
+                affected_count += 1
+
+            if affected_count > 0:
+                print(f"Blizzard activated, affecting {affected_count} enemies")
+
+        if affected_count > 0:
+            self.money -= POWERUP_COSTS[powerup_type]
+            return True
+        return False
+
+    def apply_command(self, command):
+        """Apply a player action given as a plain tuple.  Returns True if it took effect.
+
+        ("place", x, y, tower_type), ("upgrade", x, y), ("target", x, y),
+        ("powerup", powerup_type, x, y), ("treasure",), ("bonus", correct, total)
+        Towers are found by position, so commands mean the same thing in
+        every copy of a game - that is what co-op lockstep relies on.
+        """
+        kind = command[0]
+        if kind == "place":
+            _, x, y, tower_type = command
+            return self.place_tower((x, y), tower_type)
+        elif kind in ("upgrade", "target"):
+            tower = self.tower_manager.get_tower_at(command[1:3])
+            if tower is None:
+                return False
+            if kind == "upgrade":
+                return self.upgrade_tower(tower)
+            mode = tower.cycle_targeting_mode()
+            print(f"{tower.type} tower now targets {mode}")
+            return True
+        elif kind == "powerup":
+            _, powerup_type, x, y = command
+            if self.money < POWERUP_COSTS[powerup_type]:
+                return False
+            return self.activate_powerup(powerup_type, (x, y))
+        elif kind == "treasure":
+            return self.spawn_treasure_chest()
+        elif kind == "bonus":
+            # Quiz reward: a share of 50% of current money, scaled by answers correct
+            _, correct, total = command
+            if total <= 0 or not 0 <= correct <= total:
+                return False
+            base_bonus = int(self.money * 0.5)
+            bonus = int(base_bonus * correct / total)
+            self.money += bonus
+            print(f"Money bonus: ${bonus} ({int(correct / total * 100)}% of ${base_bonus})")
+            return True
+        return False
+
+    def get_checksum(self):
+        """CRC of the gameplay state, for spotting copies of a game that drifted apart"""
+        values = [self.clock.tick, self.money, self.lives, self.score, self.current_wave]
+        for enemy in self.enemy_manager.enemies:
+            values += [enemy.health, enemy.distance_traveled]
+        for tower in self.tower_manager.towers:
+            values += [tower.pos[0], tower.pos[1], tower.level, tower.last_shot]
+        values.append(len(self.projectile_manager.projectiles))
+        return zlib.crc32(struct.pack(f"<{len(values)}d", *values))
+
+    def step(self):
+        """Advance the simulation by one fixed tick"""
+        self.clock.advance()
+
+        # Update game entities; hits and leaks are collected in self.events
+        events = self.events
+        events.clear()
+        self.enemy_manager.update(self.tower_manager, events)
+        self.tower_manager.update(self.enemy_manager.index, self.enemy_manager.enemies)
+        self.projectile_manager.update(self.enemy_manager.enemies, events)
+
+        if self.particles_enabled:
+            # Particles are cosmetic, so they only step once per real-time tick
+            self.particle_ticks += self.particle_step
+            if self.particle_ticks >= 1:
+                self.particle_ticks -= 1
+                self.particle_system.update()
+
+        self.resolve_events()
+
+        # Sync current wave with enemy manager
+        self.current_wave = self.enemy_manager.wave_number
+
+    def resolve_events(self):
+        """Apply the tick's events in one pass: hits, then kills, then leaks"""
+        events = self.events
+        for enemy, projectile in events.hits:
+            if self.particles_enabled:
+                self.particle_system.create_hit_effect(projectile.pos)
+            if enemy.health <= 0:
+                continue  # Killed earlier this tick; the shot is spent
+            health = enemy.health
+            enemy.take_damage(projectile.damage)
+            projectile.apply_effects(enemy)  # Apply any special effects
+            events.damage += health - enemy.health
+            print(f"Hit confirmed! Damage: {projectile.damage}")
+            if enemy.health <= 0:
+                events.kills.append(enemy)
+
+        # Remove defeated enemies and update score
+        for enemy in events.kills:
+            print(f"Enemy defeated! Score before: {self.score}")
+            self.enemy_manager.remove_enemy(enemy)
+            reward = enemy.properties["reward"]  # Get reward from enemy properties
+            self.money += reward
+            events.reward += reward
+            self.score += 20
+            print(f"Earned ${reward}! New score: {self.score}")
+
+        for enemy in events.leaks:
+            if enemy.health <= 0:
+                continue  # Killed on its way out, so counted as a kill
+            self.enemy_manager.remove_enemy(enemy)
+            events.lives_lost += 1
+
+        self.lives -= events.lives_lost
+        self.kills += len(events.kills)
+        self.leaks += events.lives_lost
+        self.money_earned += events.reward
+        self.damage_dealt += events.damage
+
+    def resolve_next_wave(self):
+        """Run the next wave to completion headless and return a summary.
+
+        Skips what is left of the wave break, then steps with no particles
+        or console output until the wave is cleared or the game is lost.
+        """
+        kills, leaks, money_earned = self.kills, self.leaks, self.money_earned
+        damage_dealt = self.damage_dealt
+        particles_enabled = self.particles_enabled
+        self.particles_enabled = False
+        self.particle_system.active_effects.clear()
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if self.enemy_manager.wave_complete:
+                self.enemy_manager.spawn_wave()
+            while not self.enemy_manager.wave_complete and not self.is_lost():
+                self.step()
+        self.particles_enabled = particles_enabled
+
+        return {
+            "wave": self.current_wave,
+            "kills": self.kills - kills,
+            "leaks": self.leaks - leaks,
+            "money_earned": self.money_earned - money_earned,
+            "damage_dealt": self.damage_dealt - damage_dealt,
+        }
@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+# Names an item in a SlotMap.  The generation goes up each time its slot is
+# reused, so a handle to a removed item never finds the item that replaced it.
+Handle = namedtuple("Handle", ["slot", "generation"])
+
+
+class SlotMap:
+    """Items packed in a list, with O(1) insert and remove and stable handles.
+
+    Removing an item moves the last item into its place, so the list never
+    has holes, but order is not kept.  Iterating is a plain list walk.
+    sweep() iterates while allowing the current item to be removed, which
+    replaces copying the list and calling list.remove on it.
+    """
+
+    def __init__(self):
+        self.items = []  # Packed; read-only outside this class
+        self._handles = []  # Handle of each entry in items
+        self._positions = []  # slot -> index in items, or None if free
+        self._generations = []  # slot -> generation of its current or last item
+        self._free = []  # Slots with no item
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def insert(self, item):
+        """Add item and return its handle"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._positions)
+            self._positions.append(None)
+            self._generations.append(0)
+        handle = Handle(slot, self._generations[slot])
+        self._positions[slot] = len(self.items)
+        self.items.append(item)
+        self._handles.append(handle)
+        return handle
+
+    def get(self, handle):
+        """The item handle names, or None if it has been removed"""
+        # A removed item's slot has moved on a generation, so a matching
+        # generation means the slot still holds this item
+        if handle is None or self._generations[handle[0]] != handle[1]:
+            return None
+        return self.items[self._positions[handle[0]]]
+
+    def remove(self, handle):
+        """Remove the item handle names.  Returns it, or None if it was already gone."""
+        slot, generation = handle
+        if self._generations[slot] != generation:
+            return None
+        positions = self._positions
+        items = self.items
+        position = positions[slot]
+        item = items[position]
+        # Fill the hole with the last item
+        last = items.pop()
+        last_handle = self._handles.pop()
+        if position < len(items):
+            items[position] = last
+            self._handles[position] = last_handle
+            positions[last_handle[0]] = position
+        positions[slot] = None
+        self._generations[slot] = generation + 1
+        self._free.append(slot)
+        return item
+
+    def sweep(self):
+        """Iterate over every item once, last first.  The item just yielded may
+        be removed before the next; the item moved into its place has already
+        been visited.  Removing any other item, or inserting, during the sweep
+        is not safe."""
+        items = self.items
+        for i in range(len(items) - 1, -1, -1):
+            yield items[i]
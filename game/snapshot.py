@@ -0,0 +1,99 @@
+import copy
+import time
+from collections import namedtuple
+from .constants import *
+from .tower import draw_tower
+from .enemy import draw_enemy
+from .projectile import draw_projectile
+from .particle import draw_particle
+from .render import RenderQueue
+from .quality import FULL_QUALITY
+
+# What the renderer needs from one tick, as plain tuples.  Entities carry
+# their previous and current positions so frames between ticks interpolate.
+#   towers:      (type, pos, level, selected, targeting_mode)
+#   enemies:     (type, prev_pos, pos, health_fraction, frozen, slowed)
+#   projectiles: (type, prev_pos, pos, size, color, rotation)
+#   particles:   (prev_pos, pos, rgba, radius)
+# coverage is the tower DPS table from CoverageHeatmap.get_dps, for the overlay.
+FrameSnapshot = namedtuple("FrameSnapshot", [
+    "tick", "captured_at", "lag", "game_speed",
+    "towers", "enemies", "projectiles", "particles", "hud", "coverage"])
+
+Hud = namedtuple("Hud", [
+    "score", "money", "lives", "wave", "game_speed", "can_resolve_wave",
+    "paused", "game_won", "wave_summary", "difficulty", "quiz_type", "quiz"])
+
+
+def capture_hud(game):
+    sim = game.sim
+    # The quiz is copied so the renderer never sees it change mid-draw
+    quiz = copy.copy(game.quiz) if game.quiz.is_active() else None
+    return Hud(sim.score, sim.money, sim.lives, sim.current_wave, game.game_speed,
+               game.can_resolve_wave(), game.paused, game.game_won, game.wave_summary,
+               game.difficulty, game.quiz_type, quiz)
+
+
+def capture(game, lag=0.0):
+    """Snapshot of the game after the latest tick.  lag is simulated time owed since then."""
+    sim = game.sim
+    now = sim.clock.now
+    towers = tuple((t.type, t.pos, t.level, t.selected, t.targeting_mode)
+                   for t in sim.tower_manager.towers)
+    enemies = tuple((e.type, e.prev_pos, (e.pos[0], e.pos[1]), e.health / e.properties["health"],
+                     now < e.frozen_until, now < e.slowed_until)
+                    for e in sim.enemy_manager.enemies)
+    projectiles = tuple((p.projectile_type, p.prev_pos, (p.pos[0], p.pos[1]), p.size, p.color, p.rotation)
+                        for p in sim.projectile_manager.projectiles if p.active and not p.has_hit)
+    particles = tuple((p.prev_pos, (p.pos[0], p.pos[1])) + p.appearance
+                      for p in sim.particle_system.particles)
+    return FrameSnapshot(sim.clock.tick, time.perf_counter(), lag, game.game_speed,
+                         towers, enemies, projectiles, particles, capture_hud(game),
+                         sim.tower_manager.heatmap.get_dps())
+
+
+def get_alpha(snapshot, now):
+    """How far (0-1) real time has moved past the snapshot towards the next tick"""
+    lag = snapshot.lag + (now - snapshot.captured_at) * snapshot.game_speed
+    return min(1.0, lag / SIM_STEP)
+
+
+def _lerp(prev, pos, alpha):
+    return (prev[0] + (pos[0] - prev[0]) * alpha,
+            prev[1] + (pos[1] - prev[1]) * alpha)
+
+
+def draw_snapshot(screen, snapshot, alpha=1.0, quality=FULL_QUALITY):
+    """Draw the world from a snapshot, with the same code the live entities use"""
+    queue = RenderQueue(quality)
+    for tower in snapshot.towers:
+        draw_tower(queue, *tower)
+    for enemy_type, prev, pos, health_fraction, frozen, slowed in snapshot.enemies:
+        x, y = _lerp(prev, pos, alpha)
+        draw_enemy(queue, enemy_type, x, y, health_fraction, frozen, slowed)
+    for projectile_type, prev, pos, size, color, rotation in snapshot.projectiles:
+        x, y = _lerp(prev, pos, alpha)
+        draw_projectile(queue, projectile_type, x, y, size, color, rotation)
+    for prev, pos, color, radius in snapshot.particles:
+        x, y = _lerp(prev, pos, alpha)
+        draw_particle(queue, x, y, color, radius)
+    queue.flush(screen)
+
+
+class SnapshotBuffer:
+    """Hands snapshots from the simulation thread to the renderer.
+
+    The simulation builds each snapshot off to the side while the renderer
+    draws the front one, then publishes it with a single reference swap.
+    Snapshots are immutable, so neither side ever waits on a lock or sees a
+    half-built frame.
+    """
+
+    def __init__(self, snapshot):
+        self.front = snapshot
+
+    def publish(self, snapshot):
+        self.front = snapshot
+
+    def latest(self):
+        return self.front
@@ -0,0 +1,75 @@
+"""Ambient snowfall.
+
+The snow is decoration, so none of it is simulated.  Each layer is a tile
+of flakes rendered once, wrapping seamlessly at its edges, and scrolled
+down and sideways across the screen.  Nearer layers have bigger, brighter
+flakes and move faster.  A frame costs a few dozen blits of RLE-encoded
+tiles, however dense the snow.  The tiles are rendered by render(), a layer
+per step, as deferred work.
+"""
+import math
+import random
+import pygame
+from .constants import *
+
+# Far to near: tile size, flakes per tile at density 1, flake radius,
+# fall and drift speeds (pixels per second), opacity.  The tile sizes
+# differ so the layers' repeats do not line up.
+SNOW_LAYERS = (
+    (224, 6, 1, 24, 4, 120),
+    (288, 4, 2, 42, 8, 170),
+    (352, 2, 3, 75, 14, 230),
+)
+SWAY_DISTANCE = 6  # Pixels each layer sways either side of its drift
+SWAY_PERIOD = 6.0  # Seconds
+
+
+def _render_tile(size, flakes, radius, opacity, rng):
+    """Tile of soft flakes.  A flake over an edge continues on the opposite one."""
+    tile = pygame.Surface((size, size), pygame.SRCALPHA)
+    for _ in range(flakes):
+        cx, cy = rng.uniform(0, size), rng.uniform(0, size)
+        for y in range(int(cy) - radius - 1, int(cy) + radius + 2):
+            for x in range(int(cx) - radius - 1, int(cx) + radius + 2):
+                coverage = radius + 0.5 - math.hypot(x + 0.5 - cx, y + 0.5 - cy)
+                if coverage > 0:
+                    pos = (x % size, y % size)
+                    alpha = max(tile.get_at(pos)[3], int(opacity * min(1.0, coverage)))
+                    tile.set_at(pos, (255, 255, 255, alpha))
+    if pygame.display.get_surface() is not None:
+        tile = tile.convert_alpha()
+    # Run-length encode the empty space between flakes, so blits skip it
+    tile.set_alpha(255, pygame.RLEACCEL)
+    return tile
+
+
+class Snowfall:
+    def __init__(self, density=SNOW_DENSITY):
+        self.rng = random.Random()  # Never the simulation's - snow must not affect the game
+        self.sway_phases = [self.rng.uniform(0, 2 * math.pi) for _ in SNOW_LAYERS]
+        self.density = density
+        self.tiles = []  # Rendered so far, far layer first
+
+    def set_density(self, density):
+        """Use density times the default number of flakes.  The layers need rendering again."""
+        self.density = density
+        self.tiles = []
+
+    def render(self):
+        """Generator rendering the layers not yet rendered, one per step"""
+        while self.density > 0 and len(self.tiles) < len(SNOW_LAYERS):
+            size, flakes, radius, _, _, opacity = SNOW_LAYERS[len(self.tiles)]
+            self.tiles.append(_render_tile(size, round(flakes * self.density), radius, opacity, self.rng))
+            yield
+
+    def draw(self, screen, now):
+        """Draw every layer as it is at time now (seconds)"""
+        blits = []
+        for tile, phase, (size, _, _, fall, drift, _) in zip(self.tiles, self.sway_phases, SNOW_LAYERS):
+            sway = math.sin(now * 2 * math.pi / SWAY_PERIOD + phase) * SWAY_DISTANCE
+            left = int(now * drift + sway) % size - size
+            top = int(now * fall) % size - size
+            for y in range(top, SCREEN_HEIGHT, size):
+                for x in range(left, SCREEN_WIDTH, size):
+                    blits.append((tile, (x, y)))
+        screen.blits(blits, doreturn=False)
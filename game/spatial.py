@@ -0,0 +1,276 @@
+import bisect
+import math
+
+
+def is_targetable(enemy):
+    return enemy.health > 0 and not enemy.reached_end
+
+
+def is_worth_shooting(enemy):
+    # Skip enemies that shots already in flight will kill
+    return is_targetable(enemy) and enemy.health > enemy.pending_damage
+
+
+class EnemyPathIndex:
+    """Enemies kept sorted by distance traveled along the path.
+
+    Enemies rarely overtake each other, so refresh() fixes the order with an
+    insertion pass that is linear when nothing moved out of place.  A max-tree
+    over the sorted order keyed on (health, position) answers "strongest enemy
+    on this stretch of path" in O(log n), and lets the first and last enemy
+    worth shooting be found in O(log n) by skipping doomed ones in bulk.
+
+    Range queries take the path pieces returned by Path.get_covered_intervals.
+    """
+
+    def __init__(self):
+        self.enemies = []    # Sorted by distance_traveled
+        self.progress = []   # distance_traveled for each entry in self.enemies
+        self._pending = []   # Added since the last refresh
+        self._removed = set()
+        self._tree_size = 1
+        self._health_tree = [(-1, -1), (-1, -1)]
+
+    def __len__(self):
+        return len(self.enemies)
+
+    def add(self, enemy):
+        self._pending.append(enemy)
+
+    def remove(self, enemy):
+        self._removed.add(id(enemy))
+
+    def refresh(self):
+        """Re-sort after enemies moved. Call once per tick."""
+        enemies = self.enemies
+        if self._removed:
+            enemies = [e for e in enemies if id(e) not in self._removed]
+            self._pending = [e for e in self._pending if id(e) not in self._removed]
+            self._removed.clear()
+
+        progress = [e.distance_traveled for e in enemies]
+
+        # Insertion pass - O(n) when the order barely changed
+        for i in range(1, len(enemies)):
+            key = progress[i]
+            if key >= progress[i - 1]:
+                continue
+            enemy = enemies[i]
+            j = i - 1
+            while j >= 0 and progress[j] > key:
+                progress[j + 1] = progress[j]
+                enemies[j + 1] = enemies[j]
+                j -= 1
+            progress[j + 1] = key
+            enemies[j + 1] = enemy
+
+        for enemy in self._pending:
+            i = bisect.bisect_right(progress, enemy.distance_traveled)
+            progress.insert(i, enemy.distance_traveled)
+            enemies.insert(i, enemy)
+        self._pending = []
+
+        self.enemies = enemies
+        self.progress = progress
+        self._build_health_tree()
+
+    def _build_health_tree(self):
+        size = 1
+        while size < len(self.enemies):
+            size *= 2
+        tree = [(-1, -1)] * (2 * size)
+        for i, enemy in enumerate(self.enemies):
+            enemy.index_slot = i
+            tree[size + i] = self._health_key(enemy, i)
+        for i in range(size - 1, 0, -1):
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+        self._tree_size = size
+        self._health_tree = tree
+
+    def _health_key(self, enemy, slot):
+        # Keyed on health left after shots in flight; ties go to the enemy further along
+        if not is_worth_shooting(enemy):
+            return (-1, slot)
+        return (enemy.health - enemy.pending_damage, slot)
+
+    def update_health(self, enemy):
+        """Push a health or pending damage change for one enemy into the max-tree"""
+        slot = getattr(enemy, "index_slot", None)
+        if slot is None or slot >= len(self.enemies) or self.enemies[slot] is not enemy:
+            return
+        i = self._tree_size + slot
+        self._health_tree[i] = self._health_key(enemy, slot)
+        i //= 2
+        while i:
+            self._health_tree[i] = max(self._health_tree[2 * i], self._health_tree[2 * i + 1])
+            i //= 2
+
+    def _span(self, start, end):
+        return (bisect.bisect_left(self.progress, start),
+                bisect.bisect_right(self.progress, end))
+
+    def get_first(self, pieces):
+        """Enemy furthest along the path inside the given pieces"""
+        for start, end, _ in reversed(pieces):
+            enemy = self._find_worth_shooting(*self._span(start, end), last=True)
+            if enemy is not None:
+                return enemy
+        return None
+
+    def get_last(self, pieces):
+        """Enemy least far along the path inside the given pieces"""
+        for start, end, _ in pieces:
+            enemy = self._find_worth_shooting(*self._span(start, end), last=False)
+            if enemy is not None:
+                return enemy
+        return None
+
+    def _find_worth_shooting(self, lo, hi, last):
+        """First enemy in slots [lo, hi) worth shooting, or the last one with last.
+
+        The max-tree marks doomed and untargetable enemies with -1, so whole
+        subtrees of them are skipped and the search is O(log n) however many
+        there are.
+        """
+        while True:
+            slot = self._descend(1, 0, self._tree_size, lo, hi, last)
+            if slot is None:
+                return None
+            enemy = self.enemies[slot]
+            if is_worth_shooting(enemy):
+                return enemy
+            self.update_health(enemy)  # Stale leaf - fix it and search again
+
+    def _descend(self, node, node_lo, node_hi, lo, hi, last):
+        tree = self._health_tree
+        if node_hi <= lo or hi <= node_lo or tree[node][0] <= 0:
+            return None
+        if node_hi - node_lo == 1:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        if last:
+            found = self._descend(2 * node + 1, mid, node_hi, lo, hi, last)
+            if found is None:
+                found = self._descend(2 * node, node_lo, mid, lo, hi, last)
+        else:
+            found = self._descend(2 * node, node_lo, mid, lo, hi, last)
+            if found is None:
+                found = self._descend(2 * node + 1, mid, node_hi, lo, hi, last)
+        return found
+
+    def get_strongest(self, pieces):
+        """Enemy with the most health left after pending damage inside the given pieces"""
+        best = (-1, -1)
+        for start, end, _ in pieces:
+            lo, hi = self._span(start, end)
+            best = max(best, self._query_health(lo, hi))
+        if best[0] <= 0:
+            return None
+        return self.enemies[best[1]]
+
+    def _query_health(self, lo, hi):
+        best = (-1, -1)
+        lo += self._tree_size
+        hi += self._tree_size
+        while lo < hi:
+            if lo & 1:
+                best = max(best, self._health_tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = max(best, self._health_tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+    def get_closest(self, pos, pieces):
+        """Enemy nearest to pos inside the given pieces.
+
+        Each piece is a straight run of path, so distance to pos only grows
+        moving away from the piece's closest point.  The nearest enemy is
+        therefore the first valid one on either side of that point.
+        """
+        best = None
+        best_distance = float('inf')
+        for start, end, closest in pieces:
+            lo, hi = self._span(start, end)
+            mid = bisect.bisect_left(self.progress, closest, lo, hi)
+            for i in range(mid, hi):
+                if is_worth_shooting(self.enemies[i]):
+                    best, best_distance = self._nearer(pos, self.enemies[i], best, best_distance)
+                    break
+            for i in range(mid - 1, lo - 1, -1):
+                if is_worth_shooting(self.enemies[i]):
+                    best, best_distance = self._nearer(pos, self.enemies[i], best, best_distance)
+                    break
+        return best
+
+    def _nearer(self, pos, enemy, best, best_distance):
+        distance = math.hypot(enemy.pos[0] - pos[0], enemy.pos[1] - pos[1])
+        if distance < best_distance:
+            return enemy, distance
+        return best, best_distance
+
+    def get_in_range(self, pieces):
+        """All targetable enemies inside the given pieces"""
+        found = []
+        prev_hi = 0
+        for start, end, _ in pieces:
+            lo, hi = self._span(start, end)
+            lo = max(lo, prev_hi)  # Neighbouring pieces share their corner point
+            found.extend(e for e in self.enemies[lo:hi] if is_targetable(e))
+            prev_hi = max(prev_hi, hi)
+        return found
+
+
+class SpatialGrid:
+    """Uniform grid over objects with a .pos, for radius queries.
+
+    Used for towers, which never move, so inserts and removals are the only
+    maintenance.  A query only looks at the cells overlapping the circle.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def _cell(self, pos):
+        return (int(pos[0] // self.cell_size), int(pos[1] // self.cell_size))
+
+    def insert(self, item):
+        self.cells.setdefault(self._cell(item.pos), []).append(item)
+
+    def remove(self, item):
+        key = self._cell(item.pos)
+        bucket = self.cells.get(key)
+        if bucket and item in bucket:
+            bucket.remove(item)
+            if not bucket:
+                del self.cells[key]
+
+    def query(self, pos, radius):
+        """All items within radius of pos"""
+        found = []
+        radius_sq = radius * radius
+        min_x, min_y = self._cell((pos[0] - radius, pos[1] - radius))
+        max_x, max_y = self._cell((pos[0] + radius, pos[1] + radius))
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                for item in self.cells.get((cx, cy), ()):
+                    dx = item.pos[0] - pos[0]
+                    dy = item.pos[1] - pos[1]
+                    if dx * dx + dy * dy <= radius_sq:
+                        found.append(item)
+        return found
+
+    def nearest(self, pos, radius):
+        """Closest item within radius of pos, or None"""
+        best = None
+        best_sq = radius * radius
+        for item in self.query(pos, radius):
+            dx = item.pos[0] - pos[0]
+            dy = item.pos[1] - pos[1]
+            if dx * dx + dy * dy <= best_sq:
+                best = item
+                best_sq = dx * dx + dy * dy
+        return best
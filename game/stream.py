@@ -0,0 +1,371 @@
+"""Stream game state to spectators over a local socket.
+
+The game side encodes each tick once and sends the same bytes to every
+spectator.  Most ticks are deltas: only entities whose quantized fields
+changed, with a bitmask saying which fields follow.  A keyframe with every
+entity is sent every KEYFRAME_INTERVAL ticks; a spectator that connects
+later is sent the latest keyframe and the deltas since, so nothing is
+encoded twice.
+
+    python main.py --spectate unix:/tmp/wtd.sock    # or 127.0.0.1:5555
+    python -m game.stream unix:/tmp/wtd.sock        # watch it
+
+Message layout (little-endian), after a u32 length prefix:
+    u8 frame kind (0 keyframe, 1 delta), u32 tick
+    u8 HUD changed, then i32 score, i32 money, i32 lives, u16 wave if set
+    u16 entity count, then per entity: u32 id, u8 field mask, masked fields
+    u16 removed count, then u32 id each
+Entity fields are kind, type, x, y, value, flags (see collect_state).
+"""
+import os
+import sys
+import math
+import time
+import struct
+import argparse
+import pygame
+from .constants import *
+from .clock import SimClock
+from .path import Path
+from .projectile import PROJECTILE_STYLES
+from .snapshot import FrameSnapshot, draw_snapshot, get_alpha
+from .ui import UI
+from .net import make_socket, listen, set_nonblocking
+
+KEYFRAME_INTERVAL = 120  # Ticks between keyframes
+POSITION_SCALE = 4  # Positions are sent in quarter pixels
+MAX_CLIENT_BACKLOG = 256 * 1024  # Bytes queued for a spectator before it is dropped
+
+KIND_TOWER, KIND_ENEMY, KIND_PROJECTILE = 0, 1, 2
+ENEMY_TYPES = list(ENEMY_PROPERTIES)
+PROJECTILE_TYPES = list(PROJECTILE_STYLES)
+TYPE_NAMES = {KIND_TOWER: TOWER_TYPES, KIND_ENEMY: ENEMY_TYPES, KIND_PROJECTILE: PROJECTILE_TYPES}
+TYPE_CODES = {kind: {name: i for i, name in enumerate(names)} for kind, names in TYPE_NAMES.items()}
+TARGETING_CODES = {mode: i for i, mode in enumerate(TARGETING_MODES)}
+
+FIELDS = "BBhhBB"  # kind, type, x, y, value, flags
+FULL_MASK = (1 << len(FIELDS)) - 1
+FIELD_FORMATS = ["<" + "".join(f for bit, f in enumerate(FIELDS) if mask >> bit & 1)
+                 for mask in range(FULL_MASK + 1)]
+FRAME_HEADER = struct.Struct("<BI")
+HUD = struct.Struct("<iiiH")
+ENTITY_HEADER = struct.Struct("<IB")
+COUNT = struct.Struct("<H")
+ENTITY_ID = struct.Struct("<I")
+LENGTH = struct.Struct("<I")
+
+TWO_PI = 2 * math.pi
+
+
+def _quantize(value):
+    return max(-32768, min(32767, int(round(value * POSITION_SCALE))))
+
+
+def collect_state(sim):
+    """{entity id: (kind, type, x, y, value, flags)} with every field a small int.
+
+    An entity id is its uid * 4 + kind.  Towers, enemies and projectiles
+    each number their instances from a module counter, so unlike id(), an
+    id is never reused for a later entity while spectators are watching.
+
+    value is the tower level, enemy health out of 255, or projectile size.
+    flags is the tower's selection and targeting mode, the enemy's frozen
+    and slowed bits, or the projectile's rotation out of 256.
+    """
+    state = {}
+    now = sim.clock.now
+    codes = TYPE_CODES[KIND_TOWER]
+    for tower in sim.tower_manager.towers:
+        flags = tower.selected | TARGETING_CODES[tower.targeting_mode] << 1
+        state[tower.uid * 4 + KIND_TOWER] = (
+            KIND_TOWER, codes[tower.type], _quantize(tower.pos[0]), _quantize(tower.pos[1]),
+            tower.level, flags)
+
+    codes = TYPE_CODES[KIND_ENEMY]
+    for enemy in sim.enemy_manager.enemies:
+        health = int(255 * enemy.health / enemy.properties["health"])
+        flags = (now < enemy.frozen_until) | (now < enemy.slowed_until) << 1
+        state[enemy.uid * 4 + KIND_ENEMY] = (
+            KIND_ENEMY, codes[enemy.type], _quantize(enemy.pos[0]), _quantize(enemy.pos[1]),
+            max(0, min(255, health)), flags)
+
+    codes = TYPE_CODES[KIND_PROJECTILE]
+    for projectile in sim.projectile_manager.projectiles:
+        if not projectile.active or projectile.has_hit:
+            continue
+        rotation = int(projectile.rotation % TWO_PI / TWO_PI * 256) & 255
+        state[projectile.uid * 4 + KIND_PROJECTILE] = (
+            KIND_PROJECTILE, codes[projectile.projectile_type],
+            _quantize(projectile.pos[0]), _quantize(projectile.pos[1]),
+            min(255, int(projectile.size)), rotation)
+    return state
+
+
+class StateEncoder:
+    """Turns successive simulation states into keyframe and delta messages"""
+
+    def __init__(self):
+        self.entities = {}
+        self.hud = None
+
+    def encode(self, sim, keyframe=False):
+        state = collect_state(sim)
+        hud = (sim.score, sim.money, sim.lives, sim.current_wave)
+        previous = {} if keyframe else self.entities
+
+        parts = [FRAME_HEADER.pack(0 if keyframe else 1, sim.clock.tick)]
+        if keyframe or hud != self.hud:
+            parts.append(b"\x01" + HUD.pack(*hud))
+        else:
+            parts.append(b"\x00")
+
+        updates = []
+        for entity_id, record in state.items():
+            old = previous.get(entity_id)
+            if old is None:
+                mask = FULL_MASK
+                fields = record
+            elif old == record:
+                continue
+            else:
+                mask = 0
+                for bit in range(2, len(FIELDS)):  # Kind and type never change
+                    if old[bit] != record[bit]:
+                        mask |= 1 << bit
+                fields = [record[bit] for bit in range(len(FIELDS)) if mask >> bit & 1]
+            updates.append(ENTITY_HEADER.pack(entity_id, mask))
+            updates.append(struct.pack(FIELD_FORMATS[mask], *fields))
+        parts.append(COUNT.pack(len(updates) // 2))
+        parts.extend(updates)
+
+        removed = [] if keyframe else [i for i in self.entities if i not in state]
+        parts.append(COUNT.pack(len(removed)))
+        parts.extend(ENTITY_ID.pack(i) for i in removed)
+
+        self.entities = state
+        self.hud = hud
+        body = b"".join(parts)
+        return LENGTH.pack(len(body)) + body
+
+
+class StateDecoder:
+    """Rebuilds the streamed state on the spectator side"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.entities = {}  # id -> [kind, type, x, y, value, flags]
+        self.previous = {}  # id -> (x, y) before the latest message, for interpolation
+        self.hud = (0, 0, 0, 0)
+        self.tick = 0
+        self.received_at = time.perf_counter()
+
+    def feed(self, data):
+        """Apply every complete message in data.  Returns how many were applied."""
+        self.buffer += data
+        applied = 0
+        while len(self.buffer) >= LENGTH.size:
+            length, = LENGTH.unpack_from(self.buffer)
+            if len(self.buffer) < LENGTH.size + length:
+                break
+            self._apply(bytes(self.buffer[LENGTH.size:LENGTH.size + length]))
+            del self.buffer[:LENGTH.size + length]
+            applied += 1
+        if applied:
+            self.received_at = time.perf_counter()
+        return applied
+
+    def _apply(self, body):
+        frame_kind, self.tick = FRAME_HEADER.unpack_from(body)
+        offset = FRAME_HEADER.size
+        if body[offset]:
+            self.hud = HUD.unpack_from(body, offset + 1)
+            offset += HUD.size
+        offset += 1
+
+        entities = {} if frame_kind == 0 else self.entities
+        self.previous = {i: (e[2], e[3]) for i, e in self.entities.items()}
+        count, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            entity_id, mask = ENTITY_HEADER.unpack_from(body, offset)
+            offset += ENTITY_HEADER.size
+            fmt = FIELD_FORMATS[mask]
+            fields = struct.unpack_from(fmt, body, offset)
+            offset += struct.calcsize(fmt)
+            if mask == FULL_MASK:
+                entities[entity_id] = list(fields)
+            else:
+                record = entities[entity_id]
+                values = iter(fields)
+                for bit in range(len(FIELDS)):
+                    if mask >> bit & 1:
+                        record[bit] = next(values)
+
+        count, = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            entity_id, = ENTITY_ID.unpack_from(body, offset)
+            offset += ENTITY_ID.size
+            entities.pop(entity_id, None)
+        self.entities = entities
+
+    def to_snapshot(self):
+        """The decoded state as a FrameSnapshot for draw_snapshot"""
+        towers, enemies, projectiles = [], [], []
+        for entity_id, (kind, type_code, qx, qy, value, flags) in self.entities.items():
+            pos = (qx / POSITION_SCALE, qy / POSITION_SCALE)
+            px, py = self.previous.get(entity_id, (qx, qy))
+            prev = (px / POSITION_SCALE, py / POSITION_SCALE)
+            name = TYPE_NAMES[kind][type_code]
+            if kind == KIND_TOWER:
+                towers.append((name, pos, value, bool(flags & 1), TARGETING_MODES[flags >> 1]))
+            elif kind == KIND_ENEMY:
+                enemies.append((name, prev, pos, value / 255, bool(flags & 1), bool(flags & 2)))
+            else:
+                color = PROJECTILE_STYLES[name][2]
+                projectiles.append((name, prev, pos, value, color, flags / 256 * TWO_PI))
+        return FrameSnapshot(self.tick, self.received_at, 0.0, 1,
+                             tuple(towers), tuple(enemies), tuple(projectiles), (), None, None)
+
+
+class SpectatorServer:
+    """Streams one simulation to any number of spectators without blocking it.
+
+    Call publish(sim) once per tick.  Sockets are non-blocking: whatever a
+    spectator cannot take right away is queued, and a spectator that falls
+    MAX_CLIENT_BACKLOG bytes behind is dropped.  Nothing is encoded while
+    nobody is watching.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.listener = listen(address)
+        self.listener.setblocking(False)
+
+        self.clients = []  # [socket, bytearray of unsent data]
+        self.encoder = StateEncoder()
+        self.catch_up = []  # Latest keyframe and the deltas since, for new spectators
+        self.last_keyframe = None
+
+        # Running totals for reporting encode cost and bandwidth
+        self.frames_encoded = 0
+        self.bytes_encoded = 0
+        self.encode_seconds = 0.0
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            set_nonblocking(sock)
+            self.clients.append([sock, bytearray(b"".join(self.catch_up))])
+            print(f"Spectator connected ({len(self.clients)} watching)")
+
+    def _flush(self, client):
+        sock, pending = client
+        try:
+            sent = sock.send(pending)
+            del pending[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            return False
+        return len(pending) <= MAX_CLIENT_BACKLOG
+
+    def publish(self, sim):
+        self._accept()
+        if not self.clients:
+            self.catch_up = []
+            self.last_keyframe = None
+            return
+
+        start = time.perf_counter()
+        tick = sim.clock.tick
+        keyframe = self.last_keyframe is None or tick - self.last_keyframe >= KEYFRAME_INTERVAL
+        message = self.encoder.encode(sim, keyframe)
+        if keyframe:
+            self.last_keyframe = tick
+            self.catch_up = []
+        self.catch_up.append(message)
+        self.encode_seconds += time.perf_counter() - start
+        self.frames_encoded += 1
+        self.bytes_encoded += len(message)
+
+        for client in self.clients[:]:
+            client[1] += message
+            if not self._flush(client):
+                client[0].close()
+                self.clients.remove(client)
+                print(f"Spectator disconnected ({len(self.clients)} watching)")
+
+    def get_stats(self):
+        """Average bytes and encode microseconds per tick"""
+        frames = max(1, self.frames_encoded)
+        return self.bytes_encoded / frames, self.encode_seconds / frames * 1e6
+
+    def close(self):
+        for sock, _ in self.clients:
+            sock.close()
+        self.clients = []
+        self.listener.close()
+        if self.address.startswith("unix:") and os.path.exists(self.address[len("unix:"):]):
+            os.unlink(self.address[len("unix:"):])
+
+
+def watch(address):
+    """Open a window that draws a streamed game"""
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption(f"Winter Tower Defense - watching {address}")
+    sock, connect_address = make_socket(address)
+    sock.connect(connect_address)
+    sock.setblocking(False)
+
+    path = Path()
+    ui = UI(SimClock())
+    decoder = StateDecoder()
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        try:
+            data = sock.recv(65536)
+            if not data:
+                print("Game closed the stream")
+                running = False
+            decoder.feed(data)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            print(f"Lost the stream: {e}")
+            running = False
+
+        try:
+            screen.fill(BACKGROUND_COLOR)
+            path.draw(screen)
+            snapshot = decoder.to_snapshot()
+            draw_snapshot(screen, snapshot, get_alpha(snapshot, time.perf_counter()))
+            score, money, lives, wave = decoder.hud
+            ui.draw(screen, score, money, lives, wave, quiz_type=None)
+            pygame.display.flip()
+        except pygame.error as e:
+            print(f"Drawing error: {e}")
+        clock.tick(FPS)
+    sock.close()
+    pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a game streamed with --spectate")
+    parser.add_argument("address", help="unix:/path/to/socket or host:port")
+    args = parser.parse_args(argv)
+    watch(args.address)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
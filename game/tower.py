@@ -1,16 +1,145 @@
 import pygame
-import math
-import io
-try:
-    from cairosvg import svg2png
-    HAS_CAIROSVG = True
-except (ImportError, OSError):
-    HAS_CAIROSVG = False
-    print("CairoSVG not available - using fallback tower rendering")
+import heapq
+import bisect
+import itertools
 from .constants import *
+from .assets import get_tower_sprite, get_tower_glow
+from .render import get_stamp, get_text, get_circle, new_stamp
+from .spatial import SpatialGrid, is_worth_shooting
+from .heatmap import CoverageHeatmap
+
+_next_uid = itertools.count(1)
+
+
+def get_upgrade_cost(tower_type, level):
+    """Cost of upgrading a tower of this type from level, or None at max level"""
+    if level >= MAX_UPGRADE_LEVEL - 1:
+        return None
+    return int(TOWER_COSTS[tower_type] * (UPGRADE_COST_MULTIPLIER ** (level + 1)))
+
+
+def _render_fallback_tower(tower_type, level):
+    """Shape drawn for a tower when its sprite is unavailable, as a stamp centered on the tower"""
+    # Fallback rendering with level-based size increases
+    base_size = 12 * (1 + level * 0.1)
+    half = int(base_size * 1.6) + 2  # The snowman's head reaches furthest
+    surface = new_stamp(half*2 + 1, half*2 + 1)
+    pos = (half, half)
+
+    if tower_type == "SNOWMAN":
+        pygame.draw.circle(surface, (255, 255, 255), 
+                         (pos[0], pos[1] + base_size*0.6), base_size)
+        pygame.draw.circle(surface, (255, 255, 255), 
+                         (pos[0], pos[1] - base_size*0.3), base_size*0.8)
+        pygame.draw.circle(surface, (255, 255, 255), 
+                         (pos[0], pos[1] - base_size), base_size*0.6)
+    elif tower_type == "IGLOO":
+        # Draw igloo as a dome shape
+        pygame.draw.arc(surface, (200, 220, 255), 
+                      (pos[0] - base_size, pos[1] - base_size, base_size*2, base_size*2),
+                      0, 3.14, 3)
+        pygame.draw.rect(surface, (180, 200, 240),
+                       (pos[0] - base_size, pos[1], base_size*2, base_size*0.5))
+    elif tower_type == "ICE":
+        # Draw ice as a crystal/diamond shape
+        points = [
+            (pos[0], pos[1] - base_size),
+            (pos[0] + base_size*0.7, pos[1]),
+            (pos[0], pos[1] + base_size),
+            (pos[0] - base_size*0.7, pos[1])
+        ]
+        pygame.draw.polygon(surface, (200, 240, 255), points)
+    elif tower_type == "HOPE":
+        # Draw Hope tower as a bright star/beam
+        pygame.draw.circle(surface, (255, 255, 200), pos, base_size)
+        pygame.draw.circle(surface, (255, 255, 100), pos, base_size*0.6)
+    elif tower_type == "BRYCE":
+        # Draw Bryce tower as lightning bolt shape
+        points = [
+            (pos[0], pos[1] - base_size),
+            (pos[0] + base_size*0.4, pos[1] - base_size*0.3),
+            (pos[0] + base_size*0.2, pos[1]),
+            (pos[0] + base_size*0.6, pos[1] + base_size*0.3),
+            (pos[0], pos[1] + base_size),
+            (pos[0] - base_size*0.6, pos[1] + base_size*0.3),
+            (pos[0] - base_size*0.2, pos[1]),
+            (pos[0] - base_size*0.4, pos[1] - base_size*0.3)
+        ]
+        pygame.draw.polygon(surface, (255, 255, 100), points)
+    elif tower_type == "RIVERS":
+        # Draw Rivers tower as mud blob (brown/green blob)
+        pygame.draw.circle(surface, (139, 90, 43), pos, base_size)  # Brown
+        pygame.draw.circle(surface, (101, 67, 33), pos, base_size*0.7)  # Darker brown
+        # Add some green spots for mud effect
+        pygame.draw.circle(surface, (85, 107, 47), 
+                         (pos[0] - base_size*0.3, pos[1] - base_size*0.3), base_size*0.3)
+    elif tower_type == "ANDRII":
+        # Draw Andrii as helicopter (circle with rotor)
+        pygame.draw.circle(surface, (100, 100, 120), pos, base_size)
+        pygame.draw.line(surface, (150, 150, 150), 
+                       (pos[0] - base_size*1.2, pos[1]), 
+                       (pos[0] + base_size*1.2, pos[1]), 2)
+        pygame.draw.line(surface, (150, 150, 150), 
+                       (pos[0], pos[1] - base_size*1.2), 
+                       (pos[0], pos[1] + base_size*1.2), 2)
+    else:
+        # Generic fallback - just a colored circle
+        color_map = {
+            "SNOWMAN": (255, 255, 255),
+            "IGLOO": (200, 220, 255),
+            "ICE": (200, 240, 255),
+            "HOPE": (255, 255, 200),
+            "BRYCE": (255, 255, 100),
+            "RIVERS": (139, 90, 43),
+            "ANDRII": (100, 100, 120)
+        }
+        color = color_map.get(tower_type, (150, 150, 150))
+        pygame.draw.circle(surface, color, pos, base_size)
+    return surface
+
+
+def draw_tower(queue, tower_type, pos, level, selected=False, targeting_mode=None):
+    """Queue a tower's blits"""
+    sprite = None
+    if queue.quality.sprites:
+        sprite = get_tower_sprite(tower_type, level)  # Rasterized on first use, then cached
+    if sprite:
+        # Draw glow effect for upgraded towers
+        if level > 0:
+            queue.add_centered("glows", get_tower_glow(level), pos[0], pos[1])
+
+        queue.add_centered("towers", sprite, pos[0], pos[1])
+
+        # Draw level indicator
+        if level > 0:
+            queue.add("labels", get_text(str(level + 1), 20, (255, 255, 0)),
+                      (pos[0] + sprite.get_width()//2 - 10,
+                       pos[1] - sprite.get_height()//2))
+    else:
+        stamp = get_stamp(("tower", tower_type, level),
+                          lambda: _render_fallback_tower(tower_type, level))
+        queue.add_centered("towers", stamp, pos[0], pos[1])
+
+    # Draw range circle and upgrade indicator when selected
+    if selected:
+        radius = TOWER_PROPERTIES[tower_type]["range"][level]
+        queue.add("ranges", get_circle((200, 200, 255), radius, 2),
+                  (pos[0] - radius, pos[1] - radius))
+
+        # Draw targeting mode
+        mode_text = get_text(f"Target: {targeting_mode} (TAB)", 20, (255, 255, 0))
+        queue.add("labels", mode_text, (pos[0] - mode_text.get_width()//2, pos[1] - 40))
+
+        # Draw upgrade information if available
+        cost = get_upgrade_cost(tower_type, level)
+        if cost is not None:
+            upgrade_text = get_text(f"Upgrade: ${cost}", 24, (255, 255, 0))
+            queue.add("labels", upgrade_text, (pos[0] - upgrade_text.get_width()//2, pos[1] + 30))
+
 
 class Tower:
     def __init__(self, pos, tower_type):
+        self.uid = next(_next_uid)
         self.pos = pos
         self.type = tower_type
         self.level = 0  # Start at level 0 (base level)
@@ -18,12 +147,12 @@ class Tower:
         self._update_properties()
         self.last_shot = 0
         self.selected = False
-        self.sprite = None
         self.frozen_until = 0
-        self.scale = 1.0  # Base scale for the sprite
-
-        # Attempt to load tower sprite
-        self._load_sprite()
+        self.targeting_mode = TARGETING_MODES[0]
+        self.path_coverage = []  # Path pieces inside range, from Path.get_covered_intervals
+        self.coverage_starts = []  # Start of each piece, for bisect lookups
+        self.target = None  # Handle of the enemy shot at, kept until it dies or leaves range
+        self.fire_entry = None  # Sequence number of this tower's live fire-queue entry
 
     def _update_properties(self):
         props = TOWER_PROPERTIES[self.type]
@@ -40,228 +169,147 @@ class Tower:
         return self.level < MAX_UPGRADE_LEVEL - 1
 
     def get_upgrade_cost(self):
-        if not self.can_upgrade():
-            return None
-        base_cost = TOWER_COSTS[self.type]
-        return int(base_cost * (UPGRADE_COST_MULTIPLIER ** (self.level + 1)))
+        return get_upgrade_cost(self.type, self.level)
 
     def upgrade(self):
         if self.can_upgrade():
             self.level += 1
             self._update_properties()
-            self.scale = 1.0 + (self.level * 0.1)  # Increase size by 10% per level
-            self._load_sprite()  # Reload sprite with new scale
             return True
         return False
 
-    def _load_sprite(self):
-        if not HAS_CAIROSVG:
-            self.sprite = None
-            return
-
-        try:
-            filename_map = {
-                "SNOWMAN": "snowman",
-                "IGLOO": "igloo",
-                "ICE": "ice",
-                "HOPE": "hope_tower",
-                "BRYCE": "bryce_tower",
-                "RIVERS": "rivers_tower",
-                "ANDRII": "andrii_helicopter"
-            }
-
-            base_name = filename_map.get(self.type, self.type.lower())
-            svg_filename = f"assets/{base_name}.svg"
-
-            # Calculate size based on level
-            size = int(40 * self.scale)
-
-            with open(svg_filename, "rb") as svg_file:
-                svg_data = svg_file.read()
-                png_data = svg2png(bytestring=svg_data,
-                                 output_width=size,
-                                 output_height=size)
-                png_file = io.BytesIO(png_data)
-                self.sprite = pygame.image.load(png_file)
-
-                # Add visual upgrades based on level
-                if self.level > 0:
-                    # Add glow effect
-                    glow = pygame.Surface((size+4, size+4), pygame.SRCALPHA)
-                    glow_color = (255, 255, 200, 100)  # Yellow glow
-                    pygame.draw.circle(glow, glow_color, (size//2+2, size//2+2), size//2+2)
-                    self.glow = glow
-
-                print(f"Successfully loaded sprite for {self.type} level {self.level}")
-        except Exception as e:
-            print(f"Using fallback rendering for {self.type}: {str(e)}")
-            self.sprite = None
-
     def can_shoot(self, current_time):
         if current_time < self.frozen_until:
             return False
         return current_time - self.last_shot >= 1 / self.fire_rate
 
-    def get_closest_enemy(self, enemies):
-        closest_enemy = None
-        min_distance = float('inf')
-
-        for enemy in enemies:
-            distance = math.sqrt((enemy.pos[0] - self.pos[0])**2 + 
-                               (enemy.pos[1] - self.pos[1])**2)
-            if distance <= self.range and distance < min_distance:
-                closest_enemy = enemy
-                min_distance = distance
-
-        return closest_enemy
-
-    def draw(self, screen):
-        try:
-            if self.sprite:
-                # Draw glow effect for upgraded towers
-                if self.level > 0 and hasattr(self, 'glow'):
-                    screen.blit(self.glow, 
-                              (self.pos[0] - self.glow.get_width()//2,
-                               self.pos[1] - self.glow.get_height()//2))
-
-                screen.blit(self.sprite, 
-                          (self.pos[0] - self.sprite.get_width()//2,
-                           self.pos[1] - self.sprite.get_height()//2))
-
-                # Draw level indicator
-                if self.level > 0:
-                    font = pygame.font.Font(None, 20)
-                    level_text = font.render(str(self.level + 1), True, (255, 255, 0))
-                    screen.blit(level_text, 
-                              (self.pos[0] + self.sprite.get_width()//2 - 10,
-                               self.pos[1] - self.sprite.get_height()//2))
-            else:
-                # Fallback rendering with level-based size increases
-                base_size = 12 * (1 + self.level * 0.1)
-
-                if self.type == "SNOWMAN":
-                    pygame.draw.circle(screen, (255, 255, 255), 
-                                     (self.pos[0], self.pos[1] + base_size*0.6), base_size)
-                    pygame.draw.circle(screen, (255, 255, 255), 
-                                     (self.pos[0], self.pos[1] - base_size*0.3), base_size*0.8)
-                    pygame.draw.circle(screen, (255, 255, 255), 
-                                     (self.pos[0], self.pos[1] - base_size), base_size*0.6)
-                elif self.type == "IGLOO":
-                    # Draw igloo as a dome shape
-                    pygame.draw.arc(screen, (200, 220, 255), 
-                                  (self.pos[0] - base_size, self.pos[1] - base_size, base_size*2, base_size*2),
-                                  0, 3.14, 3)
-                    pygame.draw.rect(screen, (180, 200, 240),
-                                   (self.pos[0] - base_size, self.pos[1], base_size*2, base_size*0.5))
-                elif self.type == "ICE":
-                    # Draw ice as a crystal/diamond shape
-                    points = [
-                        (self.pos[0], self.pos[1] - base_size),
-                        (self.pos[0] + base_size*0.7, self.pos[1]),
-                        (self.pos[0], self.pos[1] + base_size),
-                        (self.pos[0] - base_size*0.7, self.pos[1])
-                    ]
-                    pygame.draw.polygon(screen, (200, 240, 255), points)
-                elif self.type == "HOPE":
-                    # Draw Hope tower as a bright star/beam
-                    pygame.draw.circle(screen, (255, 255, 200), self.pos, base_size)
-                    pygame.draw.circle(screen, (255, 255, 100), self.pos, base_size*0.6)
-                elif self.type == "BRYCE":
-                    # Draw Bryce tower as lightning bolt shape
-                    points = [
-                        (self.pos[0], self.pos[1] - base_size),
-                        (self.pos[0] + base_size*0.4, self.pos[1] - base_size*0.3),
-                        (self.pos[0] + base_size*0.2, self.pos[1]),
-                        (self.pos[0] + base_size*0.6, self.pos[1] + base_size*0.3),
-                        (self.pos[0], self.pos[1] + base_size),
-                        (self.pos[0] - base_size*0.6, self.pos[1] + base_size*0.3),
-                        (self.pos[0] - base_size*0.2, self.pos[1]),
-                        (self.pos[0] - base_size*0.4, self.pos[1] - base_size*0.3)
-                    ]
-                    pygame.draw.polygon(screen, (255, 255, 100), points)
-                elif self.type == "RIVERS":
-                    # Draw Rivers tower as mud blob (brown/green blob)
-                    pygame.draw.circle(screen, (139, 90, 43), self.pos, base_size)  # Brown
-                    pygame.draw.circle(screen, (101, 67, 33), self.pos, base_size*0.7)  # Darker brown
-                    # Add some green spots for mud effect
-                    pygame.draw.circle(screen, (85, 107, 47), 
-                                     (self.pos[0] - base_size*0.3, self.pos[1] - base_size*0.3), base_size*0.3)
-                elif self.type == "ANDRII":
-                    # Draw Andrii as helicopter (circle with rotor)
-                    pygame.draw.circle(screen, (100, 100, 120), self.pos, base_size)
-                    pygame.draw.line(screen, (150, 150, 150), 
-                                   (self.pos[0] - base_size*1.2, self.pos[1]), 
-                                   (self.pos[0] + base_size*1.2, self.pos[1]), 2)
-                    pygame.draw.line(screen, (150, 150, 150), 
-                                   (self.pos[0], self.pos[1] - base_size*1.2), 
-                                   (self.pos[0], self.pos[1] + base_size*1.2), 2)
-                else:
-                    # Generic fallback - just a colored circle
-                    color_map = {
-                        "SNOWMAN": (255, 255, 255),
-                        "IGLOO": (200, 220, 255),
-                        "ICE": (200, 240, 255),
-                        "HOPE": (255, 255, 200),
-                        "BRYCE": (255, 255, 100),
-                        "RIVERS": (139, 90, 43),
-                        "ANDRII": (100, 100, 120)
-                    }
-                    color = color_map.get(self.type, (150, 150, 150))
-                    pygame.draw.circle(screen, color, self.pos, base_size)
-
-            # Draw range circle and upgrade indicator when selected
-            if self.selected:
-                # Draw range circle
-                pygame.draw.circle(screen, (200, 200, 255, 128),
-                                 self.pos, self.range, 2)
-
-                # Draw upgrade information if available
-                if self.can_upgrade():
-                    cost = self.get_upgrade_cost()
-                    font = pygame.font.Font(None, 24)
-                    upgrade_text = font.render(f"Upgrade: ${cost}", True, (255, 255, 0))
-                    screen.blit(upgrade_text, 
-                              (self.pos[0] - upgrade_text.get_width()//2,
-                               self.pos[1] + 30))
-
-        except pygame.error as e:
-            print(f"Error drawing tower {self.type}: {e}")
+    def get_next_fire_time(self):
+        return max(self.last_shot + 1 / self.fire_rate, self.frozen_until)
+
+    def set_path_coverage(self, pieces):
+        """Store the path pieces inside this tower's range (placement and upgrades)"""
+        self.path_coverage = pieces
+        self.coverage_starts = [start for start, _, _ in pieces]
+
+    def covers(self, distance):
+        """Whether a point this far along the path is in range"""
+        i = bisect.bisect_right(self.coverage_starts, distance) - 1
+        return i >= 0 and distance <= self.path_coverage[i][1]
+
+    def get_valid_target(self, enemies):
+        """The cached target if it is still in play and worth shooting, else None.
+        enemies is EnemyManager.enemies; a removed enemy's handle resolves to None."""
+        enemy = enemies.get(self.target)
+        if enemy is None or not is_worth_shooting(enemy):
+            return None
+        return enemy if self.covers(enemy.distance_traveled) else None
+
+    def cycle_targeting_mode(self):
+        i = TARGETING_MODES.index(self.targeting_mode)
+        self.targeting_mode = TARGETING_MODES[(i + 1) % len(TARGETING_MODES)]
+        self.target = None  # Re-pick with the new mode
+        return self.targeting_mode
+
+    def find_target(self, enemy_index):
+        """Pick a target from the path-ordered enemy index using this tower's mode"""
+        if not self.path_coverage:
+            return None
+        if self.targeting_mode == "FIRST":
+            return enemy_index.get_first(self.path_coverage)
+        elif self.targeting_mode == "LAST":
+            return enemy_index.get_last(self.path_coverage)
+        elif self.targeting_mode == "STRONGEST":
+            return enemy_index.get_strongest(self.path_coverage)
+        return enemy_index.get_closest(self.pos, self.path_coverage)
+
+    def draw(self, queue):
+        draw_tower(queue, self.type, self.pos, self.level, self.selected, self.targeting_mode)
 
 class TowerManager:
-    def __init__(self, path, projectile_manager):
+    def __init__(self, path, projectile_manager, clock):
+        self.clock = clock
         self.towers = []
+        self.grid = SpatialGrid(TOWER_GRID_CELL_SIZE)  # Radius queries over towers
         self.path = path
         self.selected_tower = None
         self.projectile_manager = projectile_manager
+        self.heatmap = CoverageHeatmap(path)  # Combined tower DPS, rasterized for the placement preview
+        self.fire_queue = []  # Heap of (next_fire_time, sequence, tower)
+        self._fire_sequence = 0
+
+    def _schedule(self, tower, fire_time):
+        # Older entries for this tower become stale and are skipped when popped
+        tower.fire_entry = self._fire_sequence
+        heapq.heappush(self.fire_queue, (fire_time, self._fire_sequence, tower))
+        self._fire_sequence += 1
+
+    def get_towers_near(self, pos, radius):
+        return self.grid.query(pos, radius)
+
+    def get_tower_at(self, pos):
+        """Tower under a click position, or None"""
+        return self.grid.nearest(pos, TOWER_CLICK_RADIUS)
 
     def place_tower(self, pos, tower_type):
         if not self.path.is_on_path(pos):
-            for tower in self.towers:
-                distance = math.sqrt((tower.pos[0] - pos[0])**2 +
-                                   (tower.pos[1] - pos[1])**2)
-                if distance < 40:  # Minimum distance between towers
-                    return False
+            if self.grid.query(pos, TOWER_MIN_SPACING - 0.001):  # Minimum distance between towers
+                return False
 
             new_tower = Tower(pos, tower_type)
+            new_tower.set_path_coverage(self.path.get_covered_intervals(pos, new_tower.range))
             self.towers.append(new_tower)
+            self.grid.insert(new_tower)
+            self.heatmap.add_tower(new_tower)
+            self._schedule(new_tower, new_tower.get_next_fire_time())
             print(f"Placed {tower_type} tower at {pos}")
             return True
         return False
 
-    def update(self, enemies):
-        current_time = pygame.time.get_ticks() / 1000
-        for tower in self.towers:
-            if tower.can_shoot(current_time):
-                target = tower.get_closest_enemy(enemies)
-                if target:
-                    self.projectile_manager.create_projectile(
-                        tower.pos,
-                        target.pos,
-                        tower.damage,
-                        tower.projectile_type
-                    )
-                    tower.last_shot = current_time
-
-    def draw(self, screen):
+    def upgrade_tower(self, tower):
+        if not tower.can_upgrade():
+            return False
+        self.heatmap.remove_tower(tower)
+        tower.upgrade()
+        # Range grew, so recompute which stretches of path the tower covers
+        tower.set_path_coverage(self.path.get_covered_intervals(tower.pos, tower.range))
+        self.heatmap.add_tower(tower)
+        # Fire rate changed, so move the tower's slot in the fire queue
+        self._schedule(tower, tower.get_next_fire_time())
+        return True
+
+    def update(self, enemy_index, enemies):
+        """Fire every tower that is due.  Cost scales with shots, not tower count."""
+        current_time = self.clock.now
+        while self.fire_queue and self.fire_queue[0][0] <= current_time:
+            _, sequence, tower = heapq.heappop(self.fire_queue)
+            if sequence != tower.fire_entry:
+                continue  # Superseded by a later schedule
+
+            ready_at = tower.get_next_fire_time()
+            if ready_at > current_time:
+                # Frozen since it was scheduled - wake it when the freeze ends
+                self._schedule(tower, ready_at)
+                continue
+
+            target = tower.get_valid_target(enemies)
+            if target is None:
+                target = tower.find_target(enemy_index)
+                tower.target = target.handle if target else None
+            if target:
+                self.projectile_manager.create_projectile(
+                    tower.pos,
+                    target.pos,
+                    tower.damage,
+                    tower.projectile_type,
+                    target,
+                    tower.projectile_size
+                )
+                enemy_index.update_health(target)  # Pending damage changed
+                tower.last_shot = current_time
+                self._schedule(tower, tower.get_next_fire_time())
+            else:
+                self._schedule(tower, current_time + TARGET_RETRY_DELAY)
+
+    def draw(self, queue):
         for tower in self.towers:
-            tower.draw(screen)
\ No newline at end of file
+            tower.draw(queue)
\ No newline at end of file
@@ -1,27 +1,21 @@
 import pygame
-import io
-try:
-    from cairosvg import svg2png
-    HAS_CAIROSVG = True
-except (ImportError, OSError):
-    HAS_CAIROSVG = False
 from .constants import *
+from .assets import AVATAR_SPRITES, get_sprite_nowait
 
 class UI:
-    def __init__(self):
+    def __init__(self, clock):
+        self.clock = clock  # Cooldowns run on simulation time
         self.font = pygame.font.Font(None, 32)
         self.large_font = pygame.font.Font(None, 64)  # Even larger font for score
         self.small_font = pygame.font.Font(None, 24)
         self.selected_tower = "SNOWMAN"
         self.tower_buttons = self._create_tower_buttons()
         self.powerup_buttons = self._create_powerup_buttons()
+        self.speed_button = pygame.Rect(SCREEN_WIDTH - 110, 50 + 70 * len(POWERUP_TYPES), 100, 40)
+        self.resolve_button = pygame.Rect(SCREEN_WIDTH - 110, self.speed_button.bottom + 10, 100, 40)
         self.last_score = 0  # Track score changes for visual feedback
         self.powerup_cooldowns = {type: 0 for type in POWERUP_TYPES}
 
-        # Load player avatars
-        self.player_avatars = {}
-        self._load_player_avatars()
-
     def _create_tower_buttons(self):
         buttons = {}
         y = 50
@@ -39,26 +33,6 @@ class UI:
             y += 70
         return buttons
 
-    def _load_player_avatars(self):
-        """Load Hope and Bryce avatars from SVG files"""
-        players = {"HOPE": "hope_tower.svg", "BRYCE": "bryce_tower.svg"}
-
-        if HAS_CAIROSVG:
-            for player, filename in players.items():
-                try:
-                    with open(f"assets/{filename}", "rb") as svg_file:
-                        svg_data = svg_file.read()
-                    # Make avatars bigger - 80x80 pixels
-                    png_data = svg2png(bytestring=svg_data, output_width=80, output_height=80)
-                    png_file = io.BytesIO(png_data)
-                    self.player_avatars[player] = pygame.image.load(png_file)
-                    print(f"Loaded {player} avatar")
-                except Exception as e:
-                    print(f"Error loading {player} avatar: {e}")
-                    self.player_avatars[player] = None
-        else:
-            print("CairoSVG not available - player avatars will not be shown")
-
     def is_tower_button_clicked(self, pos):
         for tower_type, rect in self.tower_buttons.items():
             if rect.collidepoint(pos):
@@ -67,33 +41,43 @@ class UI:
         return False
 
     def is_powerup_button_clicked(self, pos):
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         for powerup_type, rect in self.powerup_buttons.items():
             if rect.collidepoint(pos):
                 if current_time >= self.powerup_cooldowns[powerup_type]:
                     return powerup_type
         return None
 
+    def is_speed_button_clicked(self, pos):
+        return self.speed_button.collidepoint(pos)
+
+    def is_resolve_button_clicked(self, pos):
+        return self.resolve_button.collidepoint(pos)
+
     def get_selected_tower(self):
         return self.selected_tower
 
     def start_powerup_cooldown(self, powerup_type):
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.clock.now
         cooldown = POWERUP_PROPERTIES[powerup_type]["cooldown"]
         self.powerup_cooldowns[powerup_type] = current_time + cooldown
 
-    def draw(self, screen, score, money, lives, wave_number, quiz_type="BRYCE"):
+    def draw(self, screen, score, money, lives, wave_number, quiz_type="BRYCE", game_speed=1,
+             can_resolve_wave=False):
         try:
             # Draw tower selection menu background
             pygame.draw.rect(screen, UI_COLOR, (0, 0, 120, SCREEN_HEIGHT))
             # Draw power-up menu background
             pygame.draw.rect(screen, UI_COLOR, (SCREEN_WIDTH - 120, 0, 120, SCREEN_HEIGHT))
 
-            # Draw player avatar at the bottom of the left panel
-            if quiz_type in self.player_avatars and self.player_avatars[quiz_type]:
+            # Draw player avatar at the bottom of the left panel, once it has loaded
+            avatar = None
+            if quiz_type in AVATAR_SPRITES:
+                avatar = get_sprite_nowait(AVATAR_SPRITES[quiz_type], 80)
+            if avatar:
                 avatar_y = SCREEN_HEIGHT - 120  # Position near bottom
                 avatar_x = 20  # Centered in left panel
-                screen.blit(self.player_avatars[quiz_type], (avatar_x, avatar_y))
+                screen.blit(avatar, (avatar_x, avatar_y))
 
                 # Draw player name below avatar
                 player_text = self.small_font.render(quiz_type, True, TEXT_COLOR)
@@ -135,7 +119,7 @@ class UI:
                 screen.blit(cost, (rect.x + 5, rect.y + 35))
 
             # Draw power-up buttons with cooldown indicators
-            current_time = pygame.time.get_ticks() / 1000
+            current_time = self.clock.now
             for powerup_type, rect in self.powerup_buttons.items():
                 # Check cooldown status
                 cooldown_remaining = max(0, self.powerup_cooldowns[powerup_type] - current_time)
@@ -158,9 +142,48 @@ class UI:
                         f"{int(cooldown_remaining)}s", True, TEXT_COLOR)
                     screen.blit(cooldown_text, (rect.x + 5, rect.y + 45))
 
+            # Draw fast-forward control
+            color = (180, 200, 255) if game_speed > 1 else UI_COLOR
+            pygame.draw.rect(screen, color, self.speed_button)
+            speed_text = self.small_font.render(f"Speed: {game_speed}x", True, TEXT_COLOR)
+            screen.blit(speed_text, (self.speed_button.x + 5, self.speed_button.y + 5))
+            hint_text = self.small_font.render("(F)", True, TEXT_COLOR)
+            screen.blit(hint_text, (self.speed_button.x + 5, self.speed_button.y + 22))
+
+            # Offer instant resolution of the next wave during the break
+            if can_resolve_wave:
+                pygame.draw.rect(screen, (180, 200, 255), self.resolve_button)
+                resolve_text = self.small_font.render("Skip wave", True, TEXT_COLOR)
+                screen.blit(resolve_text, (self.resolve_button.x + 5, self.resolve_button.y + 5))
+                hint_text = self.small_font.render("(R)", True, TEXT_COLOR)
+                screen.blit(hint_text, (self.resolve_button.x + 5, self.resolve_button.y + 22))
+
         except pygame.error as e:
             print(f"Error drawing UI: {e}")
 
+    def draw_wave_summary(self, screen, summary):
+        try:
+            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            overlay.fill((0, 0, 0))
+            overlay.set_alpha(128)
+            screen.blit(overlay, (0, 0))
+
+            lines = [
+                (self.font, f"Wave {summary['wave']} resolved"),
+                (self.small_font, f"Enemies defeated: {summary['kills']}"),
+                (self.small_font, f"Enemies leaked: {summary['leaks']}"),
+                (self.small_font, f"Money earned: ${summary['money_earned']}"),
+                (self.small_font, f"Damage dealt: {summary['damage_dealt']}"),
+                (self.small_font, "Press any key to continue"),
+            ]
+            y = SCREEN_HEIGHT//2 - 75
+            for font, line in lines:
+                text = font.render(line, True, (255, 255, 255))
+                screen.blit(text, text.get_rect(center=(SCREEN_WIDTH//2, y)))
+                y += 30
+        except pygame.error as e:
+            print(f"Error drawing wave summary: {e}")
+
     def draw_pause_menu(self, screen):
         try:
             # Draw semi-transparent overlay
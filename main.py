@@ -1,19 +1,31 @@
-import os
+import time
+START_TIME = time.perf_counter()  # Taken before the other imports so startup timing includes them
 import pygame
 import sys
-import math
+import queue
+import argparse
+import threading
 from game.constants import *
-from game.tower import TowerManager
-from game.enemy import EnemyManager, Enemy #Import Enemy class here
-from game.projectile import ProjectileManager
-from game.particle import ParticleSystem
-from game.path import Path
+from game.simulation import Simulation
+from game.snapshot import SnapshotBuffer, capture, capture_hud, draw_snapshot, get_alpha
+from game.assets import get_startup_sprites, warm_sprites
+from game.heatmap import HeatmapOverlay
+from game.render import RenderQueue
+from game.snowfall import Snowfall
+from game.quality import QualityGovernor
+from game.scheduler import Scheduler, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from game.projectile import warm_projectile_stamps
 from game.ui import UI
 from game.quiz import MathQuiz
 
+STARTUP_BUDGET = 0.3  # Seconds from launch to the first frame, checked by --benchmark-startup
+
 class Game:
     def __init__(self):
-        pygame.init()
+        # Only the subsystems the game uses - pygame.init() would also start
+        # audio and joysticks, which can take longer than everything else
+        pygame.display.init()
+        pygame.font.init()
         pygame.display.set_caption("Winter Tower Defense")
 
         try:
@@ -23,6 +35,9 @@ class Game:
             print(f"Failed to initialize display: {e}")
             sys.exit(1)
 
+        # Rasterize sprites in the background while the player is in the menus
+        warm_sprites(get_startup_sprites())
+
         self.clock = pygame.time.Clock()
         self.running = True
         self.paused = False
@@ -30,22 +45,33 @@ class Game:
         self.show_player_menu = True  # Show player selection first
         self.show_difficulty_menu = False
         self.game_started = False
+        self.show_coverage = True  # Coverage heatmap and placement preview (H toggles)
+        self.game_speed = 1  # Fast-forward multiplier from GAME_SPEEDS
+        self.wave_summary = None  # Result of an instantly resolved wave, shown until dismissed
+        self.accumulator = 0.0  # Simulated time owed but not yet stepped
+        self.commands = None  # Input queue for the simulation thread, when threaded
+        self.snapshots = None  # Frames published by the simulation thread, when threaded
+        self.spectators = None  # SpectatorServer streaming this game, if enabled
+        self.lockstep = None  # Lockstep link to a co-op partner, if playing co-op
+        self.quality = QualityGovernor()  # Lowers the drawing quality on slow machines
+        self.scheduler = Scheduler()  # Work spread over frames, run between update and draw
+        self.profiler = None  # AllocationProfiler, with --profile-alloc
+
+        # Render these while the player is in the menus, a little each frame
+        self.snowfall = Snowfall()
+        self.scheduler.add(self.snowfall.render(), PRIORITY_NORMAL, key=self.snowfall)
+        self.scheduler.add(warm_projectile_stamps(), PRIORITY_LOW)
+
+        # Initialize game state (will be reset when difficulty is selected)
+        self.sim = Simulation(self.difficulty)
+        self.ui = UI(self.sim.clock)
+        # Draws the coverage heatmap; every game's path is the same, so one serves them all
+        self.heatmap_overlay = HeatmapOverlay(self.sim.tower_manager.heatmap)
 
-        # Initialize game components (will be reset when difficulty is selected)
-        self.path = Path()
-        self.projectile_manager = ProjectileManager()
-        self.tower_manager = TowerManager(self.path, self.projectile_manager)
-        self.enemy_manager = EnemyManager(self.path, self.difficulty)
-        self.particle_system = ParticleSystem()
-        self.ui = UI()
-
-        self.score = 0
-        self.money = STARTING_MONEY
-        self.lives = STARTING_LIVES
         self.game_won = False
         self.quiz = MathQuiz()
         self.quiz_type = "BRYCE"  # Multiplication problems
-        self.current_wave = 1
+        self.quiz_wave = 0  # Last wave a quiz was given for
 
 
     def start_game_with_difficulty(self, difficulty):
@@ -54,25 +80,20 @@ class Game:
         self.show_difficulty_menu = False
         self.game_started = True
 
-        # Get difficulty settings
-        settings = DIFFICULTY_SETTINGS[difficulty]
-
         # Reset game with difficulty settings
-        self.money = settings["starting_money"]
-        self.lives = settings["starting_lives"]
-        self.score = 0
-        self.current_wave = 1
         self.game_won = False
-
-        # Reinitialize game components
-        self.path = Path()
-        self.projectile_manager = ProjectileManager()
-        self.tower_manager = TowerManager(self.path, self.projectile_manager)
-        self.enemy_manager = EnemyManager(self.path, difficulty)
-        self.particle_system = ParticleSystem()
+        self.game_speed = 1
+        self.quiz_wave = 0
+        self.wave_summary = None
+        seed = self.lockstep.seed if self.lockstep else None
+        self.sim = Simulation(difficulty, seed)
+        self.ui.clock = self.sim.clock
+        self.apply_quality()
+        if self.profiler:
+            self.profiler.instrument(self)  # The new simulation's managers are not measured yet
 
         print(f"Game started on {difficulty} difficulty!")
-        print(f"Starting money: ${self.money}, Lives: {self.lives}")
+        print(f"Starting money: ${self.sim.money}, Lives: {self.sim.lives}")
 
     def draw_player_menu(self):
         """Draw the player selection menu"""
@@ -179,230 +200,237 @@ class Game:
 
         pygame.display.flip()
 
-    def spawn_treasure_chest(self):
-        # Remove cooldown check, spawn immediately when T is pressed
-        difficulty_multipliers = {
-            "health": self.enemy_manager.difficulty_settings["enemy_health_multiplier"],
-            "speed": self.enemy_manager.difficulty_settings["enemy_speed_multiplier"]
-        }
-        enemy = Enemy(self.path, "TREASURE", difficulty_multipliers)
-        self.enemy_manager.enemies.append(enemy)
-        print("Spawned a treasure chest!")
-        return True
 
     def handle_events(self):
+        """Turn input into commands.  Only view state is changed here."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
 
-            # Handle player selection menu
-            if self.show_player_menu:
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-                    for button_rect, player in self.player_buttons:
-                        if button_rect.collidepoint(mouse_pos):
-                            self.quiz_type = player
-                            self.show_player_menu = False
+            elif event.type == pygame.KEYDOWN:
+                in_game = self.game_started and not self.wave_summary and not self.quiz.is_active()
+                if event.key == pygame.K_h and in_game:
+                    self.show_coverage = not self.show_coverage
+                    if not self.show_coverage:
+                        self.heatmap_overlay.clear_preview()
+                else:
+                    self.submit(("key", event.key, event.unicode))
+
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.submit(("click", event.pos))
+
+            elif event.type == pygame.MOUSEMOTION and self.game_started and not self.wave_summary:
+                # Preview coverage of the selected tower type at the cursor
+                mouse_pos = event.pos
+                overlay = self.heatmap_overlay
+                in_play_area = 120 < mouse_pos[0] < SCREEN_WIDTH - 120
+                if self.show_coverage and in_play_area and not self.paused:
+                    overlay.set_preview(mouse_pos, self.ui.get_selected_tower())
+                else:
+                    overlay.clear_preview()
+
+    def submit(self, command):
+        """Apply a command now, or queue it for the simulation thread"""
+        if self.commands is None:
+            self.apply_command(command)
+        else:
+            self.commands.put(command)
+
+    def apply_command(self, command):
+        """Apply one ("key", key, unicode) or ("click", pos) command to the game"""
+        sim = self.sim
+        kind = command[0]
+
+        # Handle player selection menu
+        if self.show_player_menu:
+            if kind == "click":
+                for button_rect, player in self.player_buttons:
+                    if button_rect.collidepoint(command[1]):
+                        self.quiz_type = player
+                        self.show_player_menu = False
+                        print(f"{player} selected!")
+                        if self.lockstep:
+                            # The host chose the difficulty for both players
+                            self.start_game_with_difficulty(self.lockstep.difficulty)
+                        else:
                             self.show_difficulty_menu = True
-                            print(f"{player} selected!")
-                            break
-                continue
+                        break
+            return
 
-            # Handle difficulty menu
-            if self.show_difficulty_menu:
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-                    for button_rect, difficulty in self.difficulty_buttons:
-                        if button_rect.collidepoint(mouse_pos):
-                            self.start_game_with_difficulty(difficulty)
-                            break
-                continue
-
-            # Game events (only when game is started)
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    if not self.quiz.is_active():  # Only allow pause toggle if quiz is not active
-                        self.paused = not self.paused
-                        if not self.paused:
-                            print(f"Starting Wave {self.current_wave}!")
-                elif event.key == pygame.K_t and not self.paused and not self.quiz.is_active():
-                    self.spawn_treasure_chest()
-                    print("Spawned a treasure chest!")
-                elif self.quiz.is_active():
-                    # Handle quiz input - returns True when quiz is complete
-                    quiz_finished = self.quiz.handle_input(event)
-
-                    # If current question answered but more remain, show next question after delay
-                    if not self.quiz.active and not self.quiz.quiz_complete:
-                        # Will show next question after result display
-                        pass
-
-                    # If entire quiz is complete, award bonuses
-                    if quiz_finished and self.quiz.quiz_complete:
-                        # Calculate bonus based on percentage of correct answers
-                        percentage_correct = self.quiz.correct_count / self.quiz.total_questions
-                        base_bonus = int(self.money * 0.5)  # 50% of current money as base
-                        bonus = int(base_bonus * percentage_correct)  # Scale by performance
-
-                        self.money += bonus
-                        print(f"Quiz complete! {self.quiz.correct_count}/{self.quiz.total_questions} correct")
-                        print(f"Money bonus: ${bonus} ({int(percentage_correct*100)}% of ${base_bonus})")
-                        self.paused = False  # Unpause after quiz completion
-                        print(f"Starting Wave {self.current_wave}!")
-
-            elif event.type == pygame.MOUSEBUTTONDOWN and not self.paused and not self.quiz.is_active():
-                mouse_pos = pygame.mouse.get_pos()
-
-                # Check for power-up activation first
-                powerup_type = self.ui.is_powerup_button_clicked(mouse_pos)
-                if powerup_type and self.money >= POWERUP_COSTS[powerup_type]:
-                    self.activate_powerup(powerup_type, mouse_pos)
-                    continue
-
-                # Check if clicking on existing tower for upgrade
-                clicked_tower = None
-                for tower in self.tower_manager.towers:
-                    distance = math.sqrt((tower.pos[0] - mouse_pos[0])**2 + 
-                                          (tower.pos[1] - mouse_pos[1])**2)
-                    if distance < 20:  # Click radius for towers
-                        clicked_tower = tower
+        # Handle difficulty menu
+        if self.show_difficulty_menu:
+            if kind == "click":
+                for button_rect, difficulty in self.difficulty_buttons:
+                    if button_rect.collidepoint(command[1]):
+                        self.start_game_with_difficulty(difficulty)
                         break
+            return
 
-                if clicked_tower:
-                    # Deselect previously selected tower
-                    for tower in self.tower_manager.towers:
-                        if tower != clicked_tower:
-                            tower.selected = False
-
-                    # Toggle selection of clicked tower
-                    clicked_tower.selected = not clicked_tower.selected
-
-                    # If tower is selected and can be upgraded
-                    if clicked_tower.selected and clicked_tower.can_upgrade():
-                        upgrade_cost = clicked_tower.get_upgrade_cost()
-                        if self.money >= upgrade_cost:
-                            if clicked_tower.upgrade():
-                                self.money -= upgrade_cost
-                                print(f"Upgraded {clicked_tower.type} to level {clicked_tower.level + 1}")
-                        else:
-                            print(f"Not enough money for upgrade (need ${upgrade_cost})")
-                else:
-                    # If not clicking on existing tower, handle new tower placement
-                    if not self.ui.is_tower_button_clicked(mouse_pos):
-                        selected_tower = self.ui.get_selected_tower()
-                        if self.money >= TOWER_COSTS[selected_tower]:
-                            if self.tower_manager.place_tower(mouse_pos, selected_tower):
-                                self.money -= TOWER_COSTS[selected_tower]
-                                print(f"Tower placed at {mouse_pos}")
-                            else:
-                                print("Cannot place tower here")
-
-    def activate_powerup(self, powerup_type, mouse_pos):
-        if powerup_type == "FREEZE_RAY":
-            # Apply freeze to all enemies on screen
-            affected_count = 0
-            for enemy in self.enemy_manager.enemies:
-                # Create freeze effect from the power-up button to each enemy
-                self.particle_system.create_freeze_ray_effect(
-                    (SCREEN_WIDTH - 60, 50), enemy.pos)
-                enemy.apply_freeze(POWERUP_PROPERTIES["FREEZE_RAY"]["freeze_time"])
-                affected_count += 1
-
-            if affected_count > 0:
-                self.money -= POWERUP_COSTS["FREEZE_RAY"]
-                self.ui.start_powerup_cooldown("FREEZE_RAY")
-                print(f"Freeze Ray activated, freezing {affected_count} enemies")
-
-        elif powerup_type == "BLIZZARD":
-            # Apply blizzard effect to all enemies in range
-            self.particle_system.start_effect("BLIZZARD", mouse_pos)
-            blizzard_radius = POWERUP_PROPERTIES["BLIZZARD"]["radius"]
-            slow_factor = POWERUP_PROPERTIES["BLIZZARD"]["slow_factor"]
-            duration = POWERUP_PROPERTIES["BLIZZARD"]["duration"]
-
-            affected_count = 0
-            for enemy in self.enemy_manager.enemies:
-                distance = math.sqrt((enemy.pos[0] - mouse_pos[0])**2 +
-                                      (enemy.pos[1] - mouse_pos[1])**2)
-                if distance <= blizzard_radius:
-                    enemy.apply_slow(duration, slow_factor)
-                    affected_count += 1
-
-            if affected_count > 0:
-                self.money -= POWERUP_COSTS["BLIZZARD"]
-                self.ui.start_powerup_cooldown("BLIZZARD")
-                print(f"Blizzard activated, affecting {affected_count} enemies")
+        # Dismiss the instant wave summary, then continue to the quiz
+        if self.wave_summary:
+            self.wave_summary = None
+            self.paused = False
+            self.check_wave_complete()
+            return
+
+        # Game events (only when game is started)
+        if kind == "key":
+            _, key, unicode = command
+            if key == pygame.K_ESCAPE:
+                if not self.quiz.is_active():  # Only allow pause toggle if quiz is not active
+                    self.paused = not self.paused
+                    if not self.paused:
+                        print(f"Starting Wave {sim.current_wave}!")
+            elif key == pygame.K_t and not self.paused and not self.quiz.is_active():
+                self.send(("treasure",))
+            elif key == pygame.K_r and not self.quiz.is_active():
+                if self.can_resolve_wave():
+                    self.resolve_wave_instantly()
+            elif key == pygame.K_f and not self.quiz.is_active():
+                self.cycle_game_speed()
+            elif key == pygame.K_TAB and not self.quiz.is_active():
+                # Cycle targeting mode of the selected tower
+                for tower in sim.tower_manager.towers:
+                    if tower.selected:
+                        self.send(("target", *tower.pos))
+            elif self.quiz.is_active():
+                # Handle quiz input - returns True when quiz is complete
+                event = pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode)
+                quiz_finished = self.quiz.handle_input(event)
+
+                # If entire quiz is complete, award bonuses
+                if quiz_finished and self.quiz.quiz_complete:
+                    print(f"Quiz complete! {self.quiz.correct_count}/{self.quiz.total_questions} correct")
+                    self.send(("bonus", self.quiz.correct_count, self.quiz.total_questions))
+                    self.paused = False  # Unpause after quiz completion
+                    print(f"Starting Wave {sim.current_wave}!")
+
+        elif kind == "click" and not self.paused and not self.quiz.is_active():
+            mouse_pos = command[1]
+
+            if self.ui.is_speed_button_clicked(mouse_pos):
+                self.cycle_game_speed()
+                return
+
+            if self.can_resolve_wave() and self.ui.is_resolve_button_clicked(mouse_pos):
+                self.resolve_wave_instantly()
+                return
+
+            # Check for power-up activation first
+            powerup_type = self.ui.is_powerup_button_clicked(mouse_pos)
+            if powerup_type and sim.money >= POWERUP_COSTS[powerup_type]:
+                if self.send(("powerup", powerup_type, *mouse_pos)):
+                    self.ui.start_powerup_cooldown(powerup_type)
+                return
+
+            # Check if clicking on existing tower for upgrade
+            clicked_tower = sim.tower_manager.get_tower_at(mouse_pos)
+
+            if clicked_tower:
+                # Deselect previously selected tower
+                for tower in sim.tower_manager.towers:
+                    if tower != clicked_tower:
+                        tower.selected = False
+
+                # Toggle selection of clicked tower
+                clicked_tower.selected = not clicked_tower.selected
+
+                # If tower is selected and can be upgraded
+                if clicked_tower.selected and clicked_tower.can_upgrade():
+                    self.send(("upgrade", *clicked_tower.pos))
+            else:
+                # If not clicking on existing tower, handle new tower placement
+                if not self.ui.is_tower_button_clicked(mouse_pos):
+                    self.send(("place", *mouse_pos, self.ui.get_selected_tower()))
+
+    def send(self, command):
+        """Pass a gameplay command to the simulation, through the co-op link if there is one.
+
+        In co-op the command runs a few ticks later on both machines, so
+        this returns True as long as it was sent.
+        """
+        if self.lockstep:
+            self.lockstep.submit(command)
+            return True
+        return self.sim.apply_command(command)
+
+    def cycle_game_speed(self):
+        i = GAME_SPEEDS.index(self.game_speed)
+        self.game_speed = GAME_SPEEDS[(i + 1) % len(GAME_SPEEDS)]
+        self.sim.set_speed(self.game_speed)
+        print(f"Game speed: {self.game_speed}x")
+
+    def can_resolve_wave(self):
+        """Instant resolution is offered during the break before the next wave, except in co-op"""
+        return (self.game_started and not self.lockstep and not self.paused and not self.game_won
+                and not self.quiz.is_active() and self.quiz_wave == self.sim.current_wave
+                and self.sim.enemy_manager.wave_complete)
+
+    def resolve_wave_instantly(self):
+        start = time.perf_counter()
+        self.wave_summary = self.sim.resolve_next_wave()
+        self.wave_summary["seconds"] = time.perf_counter() - start
+        self.paused = True  # Hold on the summary until it is dismissed
+        print(f"Wave {self.wave_summary['wave']} resolved instantly: {self.wave_summary}")
+        if self.sim.is_lost():
+            print(f"Game Over! Final Score: {self.sim.score}")
+            self.running = False
+
+    def check_wave_complete(self):
+        """Start the quiz once per completed wave, or declare victory after the last one"""
+        sim = self.sim
+
+        # Check for victory condition (completed wave 20)
+        if sim.is_won() and not self.game_won:
+            print(f"Victory! Completed all {MAX_WAVE} waves on {self.difficulty} difficulty!")
+            self.game_won = True
+
+        # Check if wave is complete and start quiz.  Pause game during quiz
+        if sim.enemy_manager.wave_complete and not self.quiz.is_active():
+            # Check if player won before starting next wave
+            if sim.current_wave >= MAX_WAVE:
+                if not self.game_won:
+                    print(f"Victory! Completed all {MAX_WAVE} waves on {self.difficulty} difficulty!")
+                    self.game_won = True
+            elif self.quiz_wave != sim.current_wave:
+                self.quiz_wave = sim.current_wave
+                self.paused = True #Pause the game while quiz is active.
+                # Start quiz with 2 questions per wave
+                self.quiz.start_quiz(self.quiz_type, 2)
+                print(f"Wave {sim.current_wave} complete! Answer 2 math questions!")
+        elif self.quiz.is_active() and not self.quiz.quiz_complete and sim.enemy_manager.wave_complete == False:
+            self.paused = True #Keep game paused until quiz is finished.
 
     def update(self):
         # Don't update game if showing player or difficulty menu
         if self.show_player_menu or self.show_difficulty_menu:
             return
 
+        self.quiz.update()
         if not self.paused and not self.game_won:
-            # Update game entities
-            self.enemy_manager.update()
-            self.tower_manager.update(self.enemy_manager.enemies)
-            self.projectile_manager.update(self.enemy_manager.enemies)
-            self.particle_system.update()
-
-            # Handle collisions
-            for projectile in self.projectile_manager.projectiles[:]:
-                if not projectile.active or projectile.has_hit:
-                    continue
-
-                for enemy in self.enemy_manager.enemies[:]:
-                    if projectile.collides_with(enemy):
-                        enemy.take_damage(projectile.damage)
-                        print(f"Hit confirmed! Damage: {projectile.damage}")
-                        self.particle_system.create_hit_effect(projectile.pos)
-                        projectile.active = False
-                        projectile.has_hit = True
-                        break
-
-            # Remove defeated enemies and update score
-            for enemy in self.enemy_manager.enemies[:]:
-                if enemy.health <= 0:
-                    print(f"Enemy defeated! Score before: {self.score}")
-                    self.enemy_manager.enemies.remove(enemy)
-                    reward = enemy.properties["reward"]  # Get reward from enemy properties
-                    self.money += reward
-                    self.score += 20
-                    print(f"Earned ${reward}! New score: {self.score}")
-
-                elif enemy.reached_end:
-                    self.enemy_manager.enemies.remove(enemy)
-                    self.lives -= 1
+            if self.lockstep:
+                if not self.lockstep.step(self.sim):
+                    return  # Waiting for the partner's inputs
+            else:
+                self.sim.step()
 
             # Check game over condition
-            if self.lives <= 0:
-                print(f"Game Over! Final Score: {self.score}")
+            if self.sim.is_lost():
+                print(f"Game Over! Final Score: {self.sim.score}")
                 self.running = False
 
-            # Sync current wave with enemy manager
-            self.current_wave = self.enemy_manager.wave_number
-
-            # Check for victory condition (completed wave 20)
-            if self.current_wave > MAX_WAVE and not self.game_won:
-                print(f"Victory! Completed all {MAX_WAVE} waves on {self.difficulty} difficulty!")
-                self.game_won = True
-
-            # Check if wave is complete and start quiz.  Pause game during quiz
-            if self.enemy_manager.wave_complete and not self.quiz.is_active():
-                # Check if player won before starting next wave
-                if self.current_wave >= MAX_WAVE:
-                    if not self.game_won:
-                        print(f"Victory! Completed all {MAX_WAVE} waves on {self.difficulty} difficulty!")
-                        self.game_won = True
-                else:
-                    self.paused = True #Pause the game while quiz is active.
-                    # Start quiz with 2 questions per wave
-                    self.quiz.start_quiz(self.quiz_type, 2)
-                    print(f"Wave {self.current_wave} complete! Answer 2 math questions!")
-            elif self.quiz.is_active() and self.enemy_manager.wave_complete == False:
-                self.paused = True #Keep game paused until quiz is finished.
+            self.check_wave_complete()
+
+        if self.spectators:
+            self.spectators.publish(self.sim)
 
+    def is_simulating(self):
+        """Whether update() currently advances the simulation"""
+        return not (self.show_player_menu or self.show_difficulty_menu
+                    or self.paused or self.game_won)
 
-    def draw(self):
+    def draw(self, alpha=1.0):
+        """Draw a frame.  alpha is how far (0-1) real time is between the last two ticks."""
         try:
             # Show player menu first
             if self.show_player_menu:
@@ -418,18 +446,37 @@ class Game:
             self.screen.fill(BACKGROUND_COLOR)
 
             # Draw game elements
-            self.path.draw(self.screen)
-            self.tower_manager.draw(self.screen)
-            self.enemy_manager.draw(self.screen)
-            self.projectile_manager.draw(self.screen)
-            self.particle_system.draw(self.screen)
+            sim = self.sim
+            sim.path.draw(self.screen)
+            overlay = self.heatmap_overlay
+            if self.show_coverage and overlay.preview_pos is not None:
+                overlay.draw(self.screen)
+                overlay.draw_preview(self.screen)
+            if self.snapshots is None:
+                queue = RenderQueue(self.quality.level)
+                sim.tower_manager.draw(queue)
+                sim.enemy_manager.draw(queue, alpha)
+                sim.projectile_manager.draw(queue, alpha)
+                sim.particle_system.draw(queue, alpha)
+                queue.flush(self.screen)
+                hud = capture_hud(self)
+            else:
+                # Threaded - draw the newest frame the simulation published
+                snapshot = self.snapshots.latest()
+                draw_snapshot(self.screen, snapshot, get_alpha(snapshot, time.perf_counter()),
+                              self.quality.level)
+                hud = snapshot.hud
+            self.snowfall.draw(self.screen, time.perf_counter())
 
             # Draw UI with updated score display and wave number
-            self.ui.draw(self.screen, self.score, self.money, self.lives, self.current_wave, self.quiz_type)
+            self.ui.draw(self.screen, hud.score, hud.money, hud.lives, hud.wave,
+                         hud.quiz_type, hud.game_speed, hud.can_resolve_wave)
 
-            if self.paused:
+            if hud.wave_summary:
+                self.ui.draw_wave_summary(self.screen, hud.wave_summary)
+            elif hud.paused:
                 self.ui.draw_pause_menu(self.screen)
-            elif self.game_won:
+            elif hud.game_won:
                 # Draw victory message
                 font = pygame.font.Font(None, 64)
                 text = font.render("Victory!", True, (50, 200, 50))
@@ -438,11 +485,11 @@ class Game:
 
                 # Draw difficulty and score
                 small_font = pygame.font.Font(None, 36)
-                difficulty_text = small_font.render(f"{self.difficulty.replace('_', ' ').title()} Mode", True, (50, 200, 50))
+                difficulty_text = small_font.render(f"{hud.difficulty.replace('_', ' ').title()} Mode", True, (50, 200, 50))
                 difficulty_rect = difficulty_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 10))
                 self.screen.blit(difficulty_text, difficulty_rect)
 
-                score_text = small_font.render(f"Final Score: {self.score}", True, (50, 200, 50))
+                score_text = small_font.render(f"Final Score: {hud.score}", True, (50, 200, 50))
                 score_rect = score_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 50))
                 self.screen.blit(score_text, score_rect)
 
@@ -453,31 +500,241 @@ class Game:
                 self.screen.blit(subtext, subtext_rect)
 
             # Draw quiz if active
-            self.quiz.draw(self.screen)
+            if hud.quiz:
+                hud.quiz.draw(self.screen)
+
+            if self.lockstep:
+                self.draw_coop_status()
 
             pygame.display.flip()
         except pygame.error as e:
             print(f"Drawing error: {e}")
 
-    def run(self):
+    def draw_coop_status(self):
+        """Banner while waiting on the co-op partner, or if the games drifted apart"""
+        lockstep = self.lockstep
+        if not lockstep.connected:
+            message, color = "Partner disconnected", (200, 50, 50)
+        elif lockstep.desynced_at is not None:
+            message, color = f"Out of sync with partner since tick {lockstep.desynced_at}", (200, 50, 50)
+        elif lockstep.waiting and self.is_simulating():
+            message, color = "Waiting for partner...", TEXT_COLOR
+        else:
+            return
+        font = pygame.font.Font(None, 32)
+        text = font.render(message, True, color)
+        text_rect = text.get_rect(center=(SCREEN_WIDTH//2, 30))
+        pygame.draw.rect(self.screen, UI_COLOR, text_rect.inflate(20, 10))
+        self.screen.blit(text, text_rect)
+
+    def advance(self, elapsed):
+        """Run the fixed ticks owed for elapsed real seconds.  Returns how many ran."""
+        # Fast-forward runs several ticks per call
+        self.accumulator += elapsed * self.game_speed
+        steps = 0
+        max_steps = MAX_SUBSTEPS * self.game_speed
+        while self.accumulator >= SIM_STEP and steps < max_steps:
+            self.update()
+            self.accumulator -= SIM_STEP
+            steps += 1
+        if steps == max_steps:
+            self.accumulator = min(self.accumulator, SIM_STEP)
+        return steps
+
+    def get_alpha(self):
+        """How far real time is between the last two ticks, for interpolation"""
+        if not self.is_simulating():
+            return 1.0
+        return self.accumulator / SIM_STEP
+
+    def run(self, threaded=False):
         print("Game started! Place towers to defend against incoming monsters!")
         try:
-            while self.running:
-                self.handle_events()
-                self.update()
-                self.draw()
-                self.clock.tick(FPS)
+            if threaded:
+                self.run_threaded()
+            else:
+                # Fixed-step simulation with interpolated rendering, all on this thread
+                previous = time.perf_counter()
+                while self.running:
+                    now = time.perf_counter()
+                    elapsed = now - previous
+                    previous = now
+
+                    self.handle_events()
+                    self.advance(elapsed)
+                    self.run_deferred_work()
+                    self.draw(self.get_alpha())
+                    if START_TIME is not None:
+                        self.report_startup()
+                    self.clock.tick(FPS)
+                    self.update_quality()
+                    if self.profiler:
+                        self.profiler.end_frame(self.clock.get_rawtime() / 1000)
         except Exception as e:
             print(f"Game error: {e}")
         finally:
+            self.running = False
+            if self.spectators:
+                self.spectators.close()
+            if self.lockstep:
+                self.lockstep.close()
+            if self.profiler:
+                self.profiler.stop()
+                print(self.profiler.report())
             pygame.quit()
             sys.exit()
 
+    def run_deferred_work(self):
+        """Queue work that has come up, then spend this frame's share of time on it"""
+        overlay = self.heatmap_overlay
+        if self.snapshots is None:
+            overlay.set_dps(self.sim.tower_manager.heatmap.get_dps())
+        else:
+            # Threaded - the heatmap belongs to the simulation thread, which
+            # copies its table into each snapshot
+            overlay.set_dps(self.snapshots.latest().coverage)
+        if overlay.needs_repaint() and not self.scheduler.is_queued(overlay):
+            # A queued repaint picks up cells dirtied since it started
+            self.scheduler.add(overlay.repaint(), PRIORITY_HIGH, key=overlay)
+        snow_density = SNOW_DENSITY * self.quality.level.particle_density
+        if self.snowfall.density != snow_density:
+            self.snowfall.set_density(snow_density)
+            self.scheduler.add(self.snowfall.render(), PRIORITY_NORMAL, key=self.snowfall)
+        self.scheduler.run()
+
+    def update_quality(self):
+        """Feed the last frame's time (less the frame cap's wait) to the quality governor"""
+        if self.game_started and self.quality.record(self.clock.get_rawtime() / 1000):
+            self.apply_quality()
+
+    def apply_quality(self):
+        """Pass the quality level to the particle system.  Drawing reads it each frame."""
+        level = self.quality.level
+        particles = self.sim.particle_system
+        particles.density = level.particle_density
+        particles.hit_particles = level.hit_particles
+
+    def report_startup(self):
+        """Print the time to the first frame, once.  Returns it in seconds."""
+        global START_TIME
+        startup = time.perf_counter() - START_TIME
+        START_TIME = None
+        print(f"First frame {startup * 1000:.0f} ms after launch")
+        return startup
+
+    def run_threaded(self):
+        """Simulate on a worker thread while this thread handles input and draws.
+
+        Input goes to the worker as commands.  The worker publishes a snapshot
+        after each tick and drawing only reads the newest one, so slow frames
+        never hold up the simulation and heavy waves never hold up input.
+        """
+        self.commands = queue.Queue()
+        self.snapshots = SnapshotBuffer(capture(self))
+        worker = threading.Thread(target=self.simulation_loop, name="simulation", daemon=True)
+        worker.start()
+        try:
+            while self.running:
+                self.handle_events()
+                self.run_deferred_work()
+                self.draw()
+                if START_TIME is not None:
+                    self.report_startup()
+                self.clock.tick(FPS)
+                self.update_quality()
+                if self.profiler:
+                    self.profiler.end_frame(self.clock.get_rawtime() / 1000)
+        finally:
+            self.running = False
+            worker.join()
+
+    def simulation_loop(self):
+        """Body of the simulation thread started by run_threaded"""
+        try:
+            previous = time.perf_counter()
+            while self.running:
+                # Wait for input until the next tick is due
+                changed = False
+                timeout = max(0.0, SIM_STEP - self.accumulator) / self.game_speed
+                try:
+                    command = self.commands.get(timeout=timeout)
+                    while True:
+                        self.apply_command(command)
+                        changed = True
+                        command = self.commands.get_nowait()
+                except queue.Empty:
+                    pass
+
+                now = time.perf_counter()
+                if self.advance(now - previous):
+                    changed = True
+                previous = now
+
+                if changed:
+                    lag = self.accumulator if self.is_simulating() else SIM_STEP
+                    self.snapshots.publish(capture(self, lag))
+        except Exception as e:
+            print(f"Simulation error: {e}")
+            self.running = False
+
     def set_quiz_type(self, quiz_type):
         """Set the quiz type based on who's playing (HOPE or BRYCE)"""
         self.quiz_type = quiz_type
         print(f"Quiz type set to: {quiz_type}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Winter Tower Defense")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run the simulation on its own thread, separate from drawing")
+    parser.add_argument("--spectate", metavar="ADDRESS",
+                        help="stream the game to spectators at unix:/path or host:port")
+    parser.add_argument("--coop-host", metavar="ADDRESS",
+                        help="host a two-player co-op game at unix:/path or host:port")
+    parser.add_argument("--coop-join", metavar="ADDRESS",
+                        help="join the co-op game hosted at ADDRESS")
+    parser.add_argument("--difficulty", default="NORMAL", choices=list(DIFFICULTY_SETTINGS),
+                        help="difficulty of a hosted co-op game")
+    parser.add_argument("--seed", type=int, default=None, help="seed of a hosted co-op game")
+    parser.add_argument("--benchmark-startup", action="store_true",
+                        help=f"draw the first frame, then exit with an error if it took over {STARTUP_BUDGET}s")
+    parser.add_argument("--profile-alloc", action="store_true",
+                        help="trace allocations and garbage collection per frame, and report on exit")
+    parser.add_argument("--gc-threshold", type=int, nargs="+", metavar="N",
+                        help="garbage collector thresholds, youngest generation first")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="move objects created while loading out of garbage collection")
+    args = parser.parse_args()
+    if (args.coop_host or args.coop_join) and args.threaded:
+        parser.error("co-op does not support --threaded")
+    if args.gc_threshold and len(args.gc_threshold) > 3:
+        parser.error("--gc-threshold takes at most 3 values")
+
+    # Connect before opening the window, which would not respond while waiting
+    # Networking is imported only when it is used, to keep startup short
+    lockstep = None
+    if args.coop_host or args.coop_join:
+        from game.lockstep import Lockstep
+        if args.coop_host:
+            lockstep = Lockstep.host(args.coop_host, args.difficulty, args.seed)
+        else:
+            lockstep = Lockstep.join(args.coop_join)
+
     game = Game()
-    game.run()
\ No newline at end of file
+    game.lockstep = lockstep
+    if args.benchmark_startup:
+        game.draw()
+        startup = game.report_startup()
+        pygame.quit()
+        sys.exit(0 if startup <= STARTUP_BUDGET else 1)
+    if args.spectate:
+        from game.stream import SpectatorServer
+        game.spectators = SpectatorServer(args.spectate)
+        print(f"Streaming to spectators at {args.spectate}")
+    if args.gc_threshold or args.gc_freeze or args.profile_alloc:
+        from game.allocprofile import AllocationProfiler, tune_gc
+        tune_gc(args.gc_threshold, args.gc_freeze)
+        if args.profile_alloc:
+            game.profiler = AllocationProfiler()
+            game.profiler.instrument(game)
+            game.profiler.start()
+    game.run(threaded=args.threaded)
\ No newline at end of file